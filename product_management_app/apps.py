@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ProductManagementAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'product_management_app'
+
+    def ready(self):
+        # Connect the category/subcategory cache invalidation, upload processing and revenue rollup signals
+        from . import resolvers, derivatives, svg_parts, rollups  # noqa: F401
+        # Retire the cached counts of the paginated lists (see prosix/pagination.py)
+        from prosix.pagination import track_counts
+        from . import models
+        track_counts(
+            models.ShirtCategory, models.ShirtSubCategory, models.Shirt, models.Customizer, models.Pattern,
+            models.Color, models.Font, models.Order, models.Invoice, models.RevenueReport,
+            models.ProductSalesReport, models.CustomerAnalysisReport, models.GrowthTrendReport,
+            models.ShirtDraft, models.SubCategory,
+        )
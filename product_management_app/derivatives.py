@@ -0,0 +1,207 @@
+"""
+Resized / WebP derivatives of the Customizer layer images.
+
+For every raster layer (the black and white layers of each side) we store,
+next to the original:
+
+- one copy per width in CUSTOMIZER_DERIVATIVE_WIDTHS, in the original format
+  and as WebP (<name>__w<width>.<ext> / <name>__w<width>.webp), never upscaled;
+- a combined preview sprite: the four sides side by side at
+  CUSTOMIZER_SPRITE_HEIGHT pixels high, as WebP.
+
+What exists is recorded in Customizer.image_derivatives, so serializers pick
+URLs without touching storage. SVG layers are vector and are served as-is.
+
+build_derivatives() only touches storage (no database access), so the
+backfill command can run it in worker processes.
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image
+
+from .models import Customizer
+
+
+SIDES = ('front', 'back', 'left', 'right')
+RASTER_LAYERS = tuple(f'{side}_{tone}_layer' for side in SIDES for tone in ('black', 'white'))
+SPRITE_DIR = 'customizer/sprites/'
+
+
+def derivative_widths():
+    return tuple(sorted(getattr(settings, 'CUSTOMIZER_DERIVATIVE_WIDTHS', (160, 480, 1024))))
+
+
+def sprite_height():
+    return getattr(settings, 'CUSTOMIZER_SPRITE_HEIGHT', 96)
+
+
+def layer_sources(customizer):
+    """{field name: stored file name} for the raster layers a customizer has"""
+    sources = {}
+    for name in RASTER_LAYERS:
+        value = getattr(customizer, name)
+        if value:
+            sources[name] = value.name
+    return sources
+
+
+def _save_image(image, name, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    options = {'quality': 85} if fmt in ('JPEG', 'WEBP') else {'optimize': True}
+    image.save(buffer, fmt, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _build_layer(source):
+    """Resize one layer; returns {width: {'src': name, 'webp': name}}"""
+    root, ext = os.path.splitext(source)
+    with default_storage.open(source, 'rb') as handle:
+        image = Image.open(handle)
+        image.load()
+    fmt = image.format or 'PNG'
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA')
+
+    sizes = {}
+    for width in derivative_widths():
+        if width >= image.width:
+            break
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        sizes[str(width)] = {
+            'src': _save_image(resized, f'{root}__w{width}{ext}', fmt),
+            'webp': _save_image(resized, f'{root}__w{width}.webp', 'WEBP'),
+        }
+    return sizes
+
+
+def _sprite_sources(sources):
+    """The layer used for each side in the sprite: black, else white"""
+    chosen = []
+    for side in SIDES:
+        for tone in ('black', 'white'):
+            name = sources.get(f'{side}_{tone}_layer')
+            if name:
+                chosen.append((side, name))
+                break
+    return chosen
+
+
+def _build_sprite(chosen):
+    height = sprite_height()
+    frames = []
+    for side, name in chosen:
+        with default_storage.open(name, 'rb') as handle:
+            image = Image.open(handle)
+            image.load()
+        width = max(1, round(image.width * height / image.height))
+        frames.append((side, image.convert('RGBA').resize((width, height), Image.LANCZOS)))
+
+    sheet = Image.new('RGBA', (sum(frame.width for _, frame in frames), height), (0, 0, 0, 0))
+    layout = []
+    x = 0
+    for side, frame in frames:
+        sheet.paste(frame, (x, 0))
+        layout.append({'side': side, 'x': x, 'width': frame.width})
+        x += frame.width
+
+    digest = hashlib.sha1('|'.join(name for _, name in chosen).encode()).hexdigest()[:16]
+    path = _save_image(sheet, f'{SPRITE_DIR}customizer_{digest}.webp', 'WEBP')
+    return {'source': [name for _, name in chosen], 'path': path, 'height': height, 'frames': layout}
+
+
+def _delete(names):
+    for name in names:
+        if name and default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def build_derivatives(sources, manifest=None, force=False):
+    """
+    Bring a derivative manifest up to date with `sources` ({field: file name}).
+
+    Layers whose source file is unchanged are kept unless `force`; outdated
+    derivative files are deleted. Returns the new manifest.
+    """
+    manifest = manifest or {}
+    old_layers = manifest.get('layers', {})
+    layers = {}
+    for field, source in sources.items():
+        previous = old_layers.get(field)
+        if previous and previous.get('source') == source and not force:
+            layers[field] = previous
+            continue
+        try:
+            layers[field] = {'source': source, 'sizes': _build_layer(source)}
+        except (OSError, ValueError):
+            # Missing or unreadable file: serve the original
+            layers[field] = {'source': source, 'sizes': {}}
+
+    for field, previous in old_layers.items():
+        if layers.get(field) is not previous:
+            stale = [name for size in previous.get('sizes', {}).values() for name in size.values()]
+            fresh = {name for size in layers.get(field, {}).get('sizes', {}).values() for name in size.values()}
+            _delete(name for name in stale if name not in fresh)
+
+    sprite = manifest.get('sprite')
+    chosen = _sprite_sources(sources)
+    if sprite and sprite.get('source') == [name for _, name in chosen] and not force:
+        new_sprite = sprite
+    elif chosen:
+        try:
+            new_sprite = _build_sprite(chosen)
+        except (OSError, ValueError):
+            new_sprite = None
+    else:
+        new_sprite = None
+    if sprite and sprite is not new_sprite and (not new_sprite or new_sprite['path'] != sprite['path']):
+        _delete([sprite.get('path')])
+
+    return {'layers': layers, 'sprite': new_sprite}
+
+
+def is_current(customizer):
+    """True when the stored manifest matches the customizer's layer files"""
+    manifest = customizer.image_derivatives or {}
+    sources = layer_sources(customizer)
+    layers = manifest.get('layers', {})
+    if set(layers) != set(sources):
+        return False
+    if any(layers[field].get('source') != source for field, source in sources.items()):
+        return False
+    sprite = manifest.get('sprite') or {}
+    return sprite.get('source', []) == [name for _, name in _sprite_sources(sources)]
+
+
+def store_manifest(customizer_id, manifest):
+    # update() skips save() and its signals; bump updated_at so ETags change
+    Customizer.objects.filter(pk=customizer_id).update(image_derivatives=manifest, updated_at=timezone.now())
+
+
+def refresh_derivatives(customizer, force=False):
+    """Regenerate what is out of date for one customizer and store the manifest"""
+    if not force and is_current(customizer):
+        return customizer.image_derivatives
+    manifest = build_derivatives(layer_sources(customizer), customizer.image_derivatives, force=force)
+    store_manifest(customizer.pk, manifest)
+    customizer.image_derivatives = manifest
+    return manifest
+
+
+@receiver(post_save, sender=Customizer)
+def _derivatives_on_upload(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(settings, 'CUSTOMIZER_DERIVATIVES_ON_SAVE', True):
+        return
+    refresh_derivatives(instance)
@@ -0,0 +1,108 @@
+"""
+Order and invoice numbers.
+
+IDs look like ORD-20261018-000042: a prefix, the local date and a per-day
+sequence number. The sequences live in IdSequence, one row per prefix and
+day. A worker reserves ORDER_ID_BLOCK_SIZE numbers with a single UPDATE and
+hands them out from memory, so most creates need no extra query.
+
+Numbers are never handed out twice: a reservation made inside a transaction
+that is rolled back is rolled back with it, and the worker then drops the
+block instead of reusing it. A block is confirmed by an on_commit callback;
+until then it is only used while the callback is still queued, which the
+worker sees through a weak reference (Django drops the callback, and with it
+the last reference, when the transaction or savepoint is rolled back). Within a worker the numbers of a day only
+increase; across workers they are unique but interleave by block. Unused
+numbers (a worker exiting mid-block) leave gaps.
+"""
+import os
+import threading
+import weakref
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import IdSequence
+
+
+_local = threading.local()
+
+
+def block_size():
+    return getattr(settings, 'ORDER_ID_BLOCK_SIZE', 50)
+
+
+@dataclass(eq=False)
+class _Block:
+    using: str
+    day: object
+    next: int
+    last: int
+    confirmed: bool = field(default=False)
+    pid: int = field(default_factory=os.getpid)
+    # Weak reference to the queued _Confirmation while the reservation is uncommitted
+    pending: object = field(default=None, repr=False)
+
+    def usable(self, day):
+        if day != self.day or self.next > self.last:
+            return False
+        if self.pid != os.getpid():
+            return False  # inherited through fork: the parent may still use it
+        if self.confirmed:
+            return True
+        # Reserved inside a transaction that is still open, as long as the
+        # confirmation is still queued to run on commit
+        return transaction.get_connection(self.using).in_atomic_block and self.pending() is not None
+
+
+class _Confirmation:
+    """on_commit callback marking a block as committed; only Django's commit hooks hold it"""
+
+    def __init__(self, block):
+        self.block = block
+
+    def __call__(self):
+        self.block.confirmed = True
+
+
+def _reserve(prefix, day, using):
+    size = block_size()
+    sequences = IdSequence.objects.using(using)
+    while True:
+        try:
+            with transaction.atomic(using=using):
+                # UPDATE first: it takes the row (or database) write lock before we read
+                if not sequences.filter(prefix=prefix, day=day).update(next_value=F('next_value') + size):
+                    sequences.create(prefix=prefix, day=day, next_value=1 + size)
+                end = sequences.filter(prefix=prefix, day=day).values_list('next_value', flat=True).get()
+            break
+        except IntegrityError:
+            continue  # another worker created the day's row first
+    block = _Block(using=using, day=day, next=end - size, last=end - 1)
+    confirmation = _Confirmation(block)
+    block.pending = weakref.ref(confirmation)
+    transaction.on_commit(confirmation, using=using)
+    return block
+
+
+def allocate_id(prefix, using=None):
+    """Next unique '<prefix>-YYYYMMDD-NNNNNN' number"""
+    using = using or DEFAULT_DB_ALIAS
+    blocks = getattr(_local, 'blocks', None)
+    if blocks is None:
+        blocks = _local.blocks = {}
+    day = timezone.localdate()
+    block = blocks.get((prefix, using))
+    if block is None or not block.usable(day):
+        block = blocks[(prefix, using)] = _reserve(prefix, day, using)
+    value = block.next
+    block.next += 1
+    return f'{prefix}-{day:%Y%m%d}-{value:06d}'
+
+
+def forget_blocks():
+    """Drop this thread's reserved blocks"""
+    _local.blocks = {}
@@ -0,0 +1,61 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from product_management_app import view_counts
+from product_management_app.models import Customizer
+from product_management_app.views import CustomizerRetrieveUpdateDestroyView
+
+
+class Command(BaseCommand):
+    help = 'Compare customizer retrieve latency without view counting, with a write per GET and with buffered counting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='Requests per strategy')
+        parser.add_argument('--id', type=int, help='Customizer to request (default: the first one)')
+
+    def handle(self, *args, **options):
+        customizer = Customizer.objects.filter(pk=options['id']) if options['id'] else Customizer.objects.order_by('id')
+        customizer = customizer.first()
+        user = User.objects.order_by('id').first()
+        if customizer is None or user is None:
+            raise CommandError('Needs at least one customizer and one user.')
+
+        view = CustomizerRetrieveUpdateDestroyView.as_view()
+        factory = APIRequestFactory()
+
+        def request():
+            req = factory.get(f'/api/customizers/{customizer.id}/')
+            force_authenticate(req, user=user)
+            return view(req, id=customizer.id)
+
+        def write_per_get(customizer_id):
+            Customizer.objects.filter(pk=customizer_id).update(views=F('views') + 1)
+
+        strategies = [
+            ('no counting', lambda customizer_id: None),
+            ('write per GET', write_per_get),
+            ('buffered', view_counts.record),
+        ]
+        before = Customizer.objects.get(pk=customizer.pk).views
+        self.stdout.write(f'{"strategy":<16}{"us/request":>12}{"queries/request":>17}')
+        for name, record in strategies:
+            with mock.patch.object(view_counts, 'record', record):
+                request()  # warm up
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    for _ in range(options['iterations']):
+                        request()
+                    elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{name:<16}{elapsed / options["iterations"] * 1e6:>12.1f}{len(ctx) / options["iterations"]:>17.2f}'
+            )
+        view_counts.flush()
+        added = Customizer.objects.get(pk=customizer.pk).views - before
+        self.stdout.write(f'Views added to customizer {customizer.id} by this run: {added}')
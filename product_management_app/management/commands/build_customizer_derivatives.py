@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from product_management_app.derivatives import build_derivatives, is_current, layer_sources, store_manifest
+from product_management_app.models import Customizer
+
+
+def _build(job):
+    """Runs in a worker process: image work only, the parent writes the results"""
+    customizer_id, sources, manifest, force = job
+    return customizer_id, build_derivatives(sources, manifest, force=force)
+
+
+class Command(BaseCommand):
+    help = 'Generate resized/WebP layer images and preview sprites for existing customizers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (1 runs inline)')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are already up to date')
+        parser.add_argument('--ids', type=int, nargs='*', help='Only these customizer ids')
+
+    def handle(self, *args, **options):
+        force = options['force']
+        queryset = Customizer.objects.order_by('id')
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+
+        jobs = [
+            (customizer.id, layer_sources(customizer), customizer.image_derivatives, force)
+            for customizer in queryset.iterator()
+            if force or not is_current(customizer)
+        ]
+        if not jobs:
+            self.stdout.write('All customizer derivatives are up to date.')
+            return
+
+        done = 0
+        if options['workers'] <= 1:
+            results = map(_build, jobs)
+        else:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=options['workers'])
+            results = (future.result() for future in as_completed([pool.submit(_build, job) for job in jobs]))
+        try:
+            for customizer_id, manifest in results:
+                store_manifest(customizer_id, manifest)
+                done += 1
+                self.stdout.write(f'Customizer {customizer_id}: {len(manifest["layers"])} layers')
+        finally:
+            if options['workers'] > 1:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {done} customizer(s).'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from product_management_app.models import Customizer
+from product_management_app.svg_parts import refresh_svg_index
+
+
+class Command(BaseCommand):
+    help = 'Minify customizer SVG layers and build their paintable part index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Reprocess layers that are already indexed')
+        parser.add_argument('--ids', type=int, nargs='*', help='Only these customizer ids')
+
+    def handle(self, *args, **options):
+        queryset = Customizer.objects.order_by('id')
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+
+        for customizer in queryset.iterator():
+            index = refresh_svg_index(customizer, force=options['force'])
+            parts = ', '.join(f'{side}: {entry["count"]}' for side, entry in index.items()) or 'no SVG layers'
+            self.stdout.write(f'Customizer {customizer.id}: {parts}')
+
+        self.stdout.write(self.style.SUCCESS('SVG part indexes are up to date.'))
@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from product_management_app.reports import materialize_reports
+
+
+class Command(BaseCommand):
+    help = "Store today's revenue, product sales, customer analysis and growth trend report snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, storing a snapshot every interval')
+        parser.add_argument('--interval', type=int, help='Seconds between snapshots with --loop (default: REPORT_SNAPSHOT_INTERVAL)')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'REPORT_SNAPSHOT_INTERVAL', 15 * 60)
+        while True:
+            started = time.monotonic()
+            stored = materialize_reports()
+            summary = ', '.join(f'{name} #{snapshot.id}' for name, snapshot in stored.items())
+            self.stdout.write(self.style.SUCCESS(f'Report snapshots stored: {summary}'))
+            if not options['loop']:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from product_management_app.rollups import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-customer order aggregates from the Order table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild')
+
+    def handle(self, *args, **options):
+        rows = rebuild_customer_stats(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Customer order stats rebuilt: {rows} customers.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from product_management_app.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily revenue rollup from the Order and Invoice tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild')
+
+    def handle(self, *args, **options):
+        rows = rebuild(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Daily revenue rollup rebuilt: {rows} rows.'))
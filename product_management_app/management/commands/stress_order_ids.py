@@ -0,0 +1,97 @@
+import multiprocessing
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, connections
+
+from product_management_app.ids import allocate_id, forget_blocks
+from product_management_app.models import Order
+
+
+STRESS_USERNAME = 'order-id-stress-test'
+
+
+def _create_orders(customer_id, count, batch):
+    """Insert `count` orders with allocated IDs; returns (created, collisions, (lowest, highest number))"""
+    forget_blocks()
+    created = collisions = 0
+    numbers = []
+    while created + collisions < count:
+        size = min(batch, count - created - collisions)
+        orders = [Order(order_id=allocate_id('ORD'), customer_id=customer_id, total=1) for _ in range(size)]
+        numbers.extend(int(order.order_id.rsplit('-', 1)[1]) for order in orders)
+        try:
+            Order.objects.bulk_create(orders)
+            created += size
+        except IntegrityError:
+            collisions += size
+    return created, collisions, (min(numbers), max(numbers)) if numbers else None
+
+
+def _overlapping(spans):
+    """Whether the number ranges of some two processes overlap, i.e. their blocks interleave"""
+    spans = sorted(span for span in spans if span)
+    return any(later[0] < earlier[1] for earlier, later in zip(spans, spans[1:]))
+
+
+def _worker(args):
+    # A forked child must not reuse the parent's database connection
+    connections.close_all()
+    try:
+        return _create_orders(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Create many orders from several processes with allocated IDs and check that none collide. '
+        'Writes to the configured database: run it against a scratch or staging copy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100000, help='Orders to create in total')
+        parser.add_argument('--processes', type=int, default=4, help='Worker processes')
+        parser.add_argument('--batch', type=int, default=500, help='Orders per bulk insert')
+        parser.add_argument('--keep', action='store_true', help='Keep the created orders')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        customer, _ = User.objects.get_or_create(username=STRESS_USERNAME)
+        if customer.orders.exists():
+            raise CommandError(f'User "{STRESS_USERNAME}" already has orders; remove them first.')
+
+        shares = [options['orders'] // processes + (1 if i < options['orders'] % processes else 0) for i in range(processes)]
+        jobs = [(customer.id, share, options['batch']) for share in shares if share]
+
+        start = time.perf_counter()
+        if processes == 1:
+            results = [_create_orders(*jobs[0])] if jobs else []
+        else:
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(len(jobs)) as pool:
+                results = pool.map(_worker, jobs)
+        elapsed = time.perf_counter() - start
+
+        created = sum(result[0] for result in results)
+        collisions = sum(result[1] for result in results)
+        stored = customer.orders.count()
+        distinct = customer.orders.values('order_id').distinct().count()
+        self.stdout.write(
+            f'{created} orders from {len(jobs)} processes in {elapsed:.1f}s '
+            f'({created / elapsed if elapsed else 0:.0f}/s); '
+            f'{collisions} in batches that collided; {stored} stored, {distinct} distinct IDs'
+        )
+        if _overlapping(result[2] for result in results):
+            self.stdout.write('Processes drew interleaved blocks from the same sequence.')
+
+        if not options['keep']:
+            # Inserted with bulk_create (no signals), so remove them the same way
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {Order._meta.db_table} WHERE customer_id = %s', [customer.id])
+            customer.delete()
+
+        if collisions or stored != created or distinct != stored:
+            raise CommandError('Order ID collisions detected.')
+        self.stdout.write(self.style.SUCCESS('No collisions.'))
@@ -0,0 +1,42 @@
+# Generated manually - restores FavoriteShirt timestamp columns dropped by 0029/0030
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def add_missing_timestamps(apps, schema_editor):
+    """0029/0030 recreated the favorite shirt table without created_at/updated_at; add them back if missing"""
+    FavoriteShirt = apps.get_model('product_management_app', 'FavoriteShirt')
+    table = FavoriteShirt._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        columns = {
+            column.name
+            for column in schema_editor.connection.introspection.get_table_description(cursor, table)
+        }
+
+    for name in ('created_at', 'updated_at'):
+        if name in columns:
+            continue
+        # Existing rows get the migration time; the model fills these in from now on
+        field = models.DateTimeField(default=timezone.now)
+        field.set_attributes_from_name(name)
+        schema_editor.add_field(FavoriteShirt, field)
+
+
+def reverse_add_missing_timestamps(apps, schema_editor):
+    """Reverse operation - nothing to do"""
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0036_patternimage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_missing_timestamps,
+            reverse_add_missing_timestamps,
+        ),
+    ]
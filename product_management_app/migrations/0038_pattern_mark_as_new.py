@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0037_restore_favoriteshirt_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pattern',
+            name='mark_as_new',
+            field=models.BooleanField(default=False, help_text='True if this pattern is new'),
+        ),
+    ]
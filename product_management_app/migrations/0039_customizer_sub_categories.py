@@ -0,0 +1,60 @@
+# Generated manually - moves Customizer.sub_category (JSON list of ids) to an indexed many-to-many relation
+
+from django.db import migrations, models
+
+
+def copy_sub_category_ids(apps, schema_editor):
+    """Backfill customizer/subcategory rows from the JSON id lists, skipping ids that no longer exist"""
+    Customizer = apps.get_model('product_management_app', 'Customizer')
+    SubCategory = apps.get_model('product_management_app', 'SubCategory')
+    Through = Customizer.sub_categories.through
+
+    existing = set(SubCategory.objects.values_list('id', flat=True))
+    rows = []
+    for customizer_id, value in Customizer.objects.values_list('id', 'sub_category').iterator():
+        if isinstance(value, (int, str)):
+            value = [value]
+        ids = set()
+        for item in value or []:
+            if isinstance(item, str) and item.isdigit():
+                item = int(item)
+            if isinstance(item, int) and item in existing:
+                ids.add(item)
+        rows.extend(Through(customizer_id=customizer_id, subcategory_id=pk) for pk in ids)
+    Through.objects.bulk_create(rows, batch_size=1000)
+
+
+def copy_sub_categories_back(apps, schema_editor):
+    """Rebuild the JSON id lists from the relation"""
+    Customizer = apps.get_model('product_management_app', 'Customizer')
+    Through = Customizer.sub_categories.through
+
+    ids_by_customizer = {}
+    for customizer_id, subcategory_id in Through.objects.values_list('customizer_id', 'subcategory_id').order_by('subcategory_id'):
+        ids_by_customizer.setdefault(customizer_id, []).append(subcategory_id)
+    for customizer in Customizer.objects.all():
+        customizer.sub_category = ids_by_customizer.get(customizer.id, [])
+        customizer.save(update_fields=['sub_category'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0038_pattern_mark_as_new'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizer',
+            name='sub_categories',
+            field=models.ManyToManyField(blank=True, help_text='Optional sub-categories for customizer', related_name='customizers', to='product_management_app.subcategory'),
+        ),
+        migrations.RunPython(
+            copy_sub_category_ids,
+            copy_sub_categories_back,
+        ),
+        migrations.RemoveField(
+            model_name='customizer',
+            name='sub_category',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0041_customizer_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customizer',
+            name='svg_parts',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Paintable part index of the SVG layers'),
+        ),
+    ]
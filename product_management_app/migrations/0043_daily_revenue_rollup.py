@@ -0,0 +1,50 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:41
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    """Seed the rollup from the existing orders and invoices (same as rebuild_revenue_rollup)"""
+    DailyRevenue = apps.get_model('product_management_app', 'DailyRevenue')
+    rows = []
+    for model_name, source, field in (('Order', 'order', 'total'), ('Invoice', 'invoice', 'amount')):
+        model = apps.get_model('product_management_app', model_name)
+        buckets = model.objects.annotate(day=TruncDate('date')).values('day', 'status').annotate(total=Sum(field), count=Count('id')).order_by()
+        rows.extend(
+            DailyRevenue(source=source, day=row['day'], status=row['status'], total=row['total'] or 0, count=row['count'])
+            for row in buckets
+        )
+    DailyRevenue.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0042_customizer_svg_parts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('source', models.CharField(choices=[('order', 'Order'), ('invoice', 'Invoice')], max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, help_text='Sum of order totals / invoice amounts', max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Revenue',
+                'verbose_name_plural': 'Daily Revenue',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenue',
+            constraint=models.UniqueConstraint(fields=('source', 'status', 'day'), name='daily_revenue_bucket_unique'),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
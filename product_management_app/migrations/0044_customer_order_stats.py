@@ -0,0 +1,52 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def backfill_stats(apps, schema_editor):
+    """Seed the per-customer aggregates from the existing orders (same as rebuild_customer_stats)"""
+    Order = apps.get_model('product_management_app', 'Order')
+    CustomerOrderStats = apps.get_model('product_management_app', 'CustomerOrderStats')
+    completed = Q(status='completed')
+    rows = []
+    for values in Order.objects.values('customer_id').annotate(
+        first_order_at=Min('date'),
+        last_order_at=Max('date'),
+        order_count=Count('id'),
+        completed_count=Count('id', filter=completed),
+        total_spent=Sum('total', filter=completed),
+    ).order_by():
+        values['total_spent'] = values['total_spent'] or 0
+        rows.append(CustomerOrderStats(**values))
+    CustomerOrderStats.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('product_management_app', '0043_daily_revenue_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerOrderStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('first_order_at', models.DateTimeField()),
+                ('last_order_at', models.DateTimeField()),
+                ('order_count', models.IntegerField(default=0, help_text='Orders in any status')),
+                ('completed_count', models.IntegerField(default=0, help_text='Completed orders')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, help_text='Sum of completed order totals', max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Customer Order Stats',
+                'verbose_name_plural': 'Customer Order Stats',
+                'indexes': [models.Index(fields=['first_order_at'], name='customer_stats_first_idx'), models.Index(fields=['order_count'], name='customer_stats_count_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
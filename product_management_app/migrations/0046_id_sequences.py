@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0045_order_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10)),
+                ('day', models.DateField()),
+                ('next_value', models.BigIntegerField(default=1, help_text='First number not yet reserved')),
+            ],
+            options={
+                'verbose_name': 'ID Sequence',
+                'verbose_name_plural': 'ID Sequences',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='idsequence',
+            constraint=models.UniqueConstraint(fields=('prefix', 'day'), name='id_sequence_prefix_day_unique'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0046_id_sequences'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoriteshirt',
+            index=models.Index(fields=['user', 'shirt'], name='favorite_user_shirt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favoriteshirt',
+            index=models.Index(fields=['user', 'user_shirt'], name='favorite_user_usershirt_idx'),
+        ),
+    ]
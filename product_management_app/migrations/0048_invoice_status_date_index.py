@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0047_query_plan_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'date'], name='invoice_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.27 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management_app', '0048_invoice_status_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customeranalysisreport',
+            name='materialized',
+            field=models.BooleanField(default=False, editable=False, help_text='Daily snapshot written by reports.materialize_reports()'),
+        ),
+        migrations.AddField(
+            model_name='growthtrendreport',
+            name='materialized',
+            field=models.BooleanField(default=False, editable=False, help_text='Daily snapshot written by reports.materialize_reports()'),
+        ),
+        migrations.AddField(
+            model_name='productsalesreport',
+            name='materialized',
+            field=models.BooleanField(default=False, editable=False, help_text='Daily snapshot written by reports.materialize_reports()'),
+        ),
+        migrations.AddField(
+            model_name='revenuereport',
+            name='materialized',
+            field=models.BooleanField(default=False, editable=False, help_text='Daily snapshot written by reports.materialize_reports()'),
+        ),
+        migrations.AddConstraint(
+            model_name='customeranalysisreport',
+            constraint=models.UniqueConstraint(condition=models.Q(('materialized', True)), fields=('report_date',), name='customer_analysis_report_snapshot_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='growthtrendreport',
+            constraint=models.UniqueConstraint(condition=models.Q(('materialized', True)), fields=('report_date',), name='growth_trend_report_snapshot_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='productsalesreport',
+            constraint=models.UniqueConstraint(condition=models.Q(('materialized', True)), fields=('report_date',), name='product_sales_report_snapshot_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='revenuereport',
+            constraint=models.UniqueConstraint(condition=models.Q(('materialized', True)), fields=('report_date',), name='revenue_report_snapshot_day'),
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from website_management_app.models import Category
 # Create your models here.
 
@@ -101,6 +102,13 @@ class FavoriteShirt(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # "Is this shirt a favorite of this user" lookups (FavoriteShirtAPIView, serializers)
+            models.Index(fields=['user', 'shirt'], name='favorite_user_shirt_idx'),
+            models.Index(fields=['user', 'user_shirt'], name='favorite_user_usershirt_idx'),
+        ]
+
     def __str__(self):
         if self.user_shirt:
             return f"{self.user.username} - User Shirt-{self.user_shirt.id}"
@@ -140,7 +148,7 @@ CATEGORY_CHOICES = [
 class Customizer(models.Model):
     title = models.CharField(max_length=255)
     category = models.ForeignKey('website_management_app.Category', related_name='customizers_category', on_delete=models.CASCADE, null=True, blank=True)
-    sub_category = models.JSONField(blank=True, null=True, default=list, help_text="Optional list of sub-categories for customizer")
+    sub_categories = models.ManyToManyField('SubCategory', related_name='customizers', blank=True, help_text="Optional sub-categories for customizer")
     size = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Price of the customizer")
     sku = models.CharField(max_length=100, unique=True, blank=True, null=True, help_text="Stock Keeping Unit")
@@ -167,6 +175,11 @@ class Customizer(models.Model):
     right_white_layer = models.ImageField(upload_to='customizer/right/', blank=True, null=True)
     right_svg_layer = models.FileField(upload_to='customizer/right/', blank=True, null=True)
     
+    # Resized/WebP copies of the layers and the preview sprite (see derivatives.py)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text="Generated image derivatives")
+    # Minified SVG layers and their paintable part index (see svg_parts.py)
+    svg_parts = models.JSONField(default=dict, blank=True, editable=False, help_text="Paintable part index of the SVG layers")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -190,6 +203,17 @@ class UserCustomizer(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.customizer.title}"
     
+    def clean(self):
+        """Check the part colors in customization_data against the customizer's SVG part index"""
+        from .svg_parts import validate_part_colors
+        data = self.customization_data or {}
+        colors = data.get('svgPartColors', data.get('svg_part_colors')) if isinstance(data, dict) else None
+        if colors is not None and self.customizer_id:
+            try:
+                validate_part_colors(self.customizer, colors)
+            except ValidationError as exc:
+                raise ValidationError({'customization_data': exc.messages})
+    
     class Meta:
         verbose_name = 'User Customizer'
         verbose_name_plural = 'User Customizers'
@@ -331,6 +355,12 @@ class Order(models.Model):
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see prosix/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # Completed orders in a date range (top products, see product_management_app/reports.py)
+            models.Index(fields=['status', 'date'], name='order_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.order_id} - {self.customer.username} ({self.get_status_display()})"
@@ -338,13 +368,62 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         """Auto-generate order_id if not set"""
         if not self.order_id:
-            # Generate order_id: ORD-YYYYMMDD-HHMMSS-XXXX
-            from datetime import datetime
-            import random
-            timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-            random_suffix = random.randint(1000, 9999)
-            self.order_id = f"ORD-{timestamp}-{random_suffix}"
-        super().save(*args, **kwargs)
+            # Generate order_id: ORD-YYYYMMDD-NNNNNN (see ids.py)
+            from .ids import allocate_id
+            self.order_id = allocate_id('ORD', using=kwargs.get('using'))
+        # The DailyRevenue rollup is updated from the save signals; commit both together
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class OrderItem(models.Model):
+    """One line of an order: a shirt or a customizer, with quantity and unit price"""
+    order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
+    # Deleting a product keeps the line (and the order's history) without it
+    shirt = models.ForeignKey(Shirt, related_name='order_items', on_delete=models.SET_NULL, null=True, blank=True)
+    customizer = models.ForeignKey(Customizer, related_name='order_items', on_delete=models.SET_NULL, null=True, blank=True)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Price of one unit when ordered")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Order Item'
+        verbose_name_plural = 'Order Items'
+        ordering = ['id']
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(shirt__isnull=True) | models.Q(customizer__isnull=True),
+                name='order_item_one_product',
+            ),
+        ]
+        indexes = [
+            # Per-product sales grouped over an order range
+            models.Index(fields=['shirt', 'order'], name='order_item_shirt_idx'),
+            models.Index(fields=['customizer', 'order'], name='order_item_customizer_idx'),
+        ]
+
+    def __str__(self):
+        product = self.shirt or self.customizer
+        product = product.title if product else 'Deleted product'
+        return f"{self.quantity} x {product} ({self.order.order_id})"
+
+
+class IdSequence(models.Model):
+    """Per-day counter behind the ORD-/INV- numbers; workers reserve blocks of it (see ids.py)"""
+    prefix = models.CharField(max_length=10)
+    day = models.DateField()
+    next_value = models.BigIntegerField(default=1, help_text="First number not yet reserved")
+
+    class Meta:
+        verbose_name = 'ID Sequence'
+        verbose_name_plural = 'ID Sequences'
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'day'], name='id_sequence_prefix_day_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix} {self.day}: next {self.next_value}"
 
 
 # Invoice Model Choices
@@ -369,6 +448,12 @@ class Invoice(models.Model):
         verbose_name = 'Invoice'
         verbose_name_plural = 'Invoices'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see prosix/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='invoice_created_id_idx'),
+            # Invoices with a status in a date range (export, see ExportAPIView)
+            models.Index(fields=['status', 'date'], name='invoice_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"Invoice {self.invoice_id} - {self.customer.username} ({self.get_status_display()})"
@@ -376,13 +461,12 @@ class Invoice(models.Model):
     def save(self, *args, **kwargs):
         """Auto-generate invoice_id if not set"""
         if not self.invoice_id:
-            # Generate invoice_id: INV-YYYYMMDD-HHMMSS-XXXX
-            from datetime import datetime
-            import random
-            timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-            random_suffix = random.randint(1000, 9999)
-            self.invoice_id = f"INV-{timestamp}-{random_suffix}"
-        super().save(*args, **kwargs)
+            # Generate invoice_id: INV-YYYYMMDD-NNNNNN (see ids.py)
+            from .ids import allocate_id
+            self.invoice_id = allocate_id('INV', using=kwargs.get('using'))
+        # The DailyRevenue rollup is updated from the save signals; commit both together
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
 
 # Report Models
@@ -393,6 +477,7 @@ class RevenueReport(models.Model):
     growth_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Growth percentage like +20% or -5%")
     total_orders = models.IntegerField(default=0)
     report_date = models.DateField(auto_now_add=True, help_text="Date when report was generated")
+    materialized = models.BooleanField(default=False, editable=False, help_text="Daily snapshot written by reports.materialize_reports()")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -400,6 +485,10 @@ class RevenueReport(models.Model):
         verbose_name = 'Revenue Report'
         verbose_name_plural = 'Revenue Reports'
         ordering = ['-report_date']
+        constraints = [
+            # One snapshot per day; reports created through the API are not snapshots
+            models.UniqueConstraint(fields=['report_date'], condition=models.Q(materialized=True), name='revenue_report_snapshot_day'),
+        ]
     
     def __str__(self):
         return f"Revenue Report - {self.report_date}"
@@ -412,6 +501,7 @@ class ProductSalesReport(models.Model):
     top_product_units_sold = models.IntegerField(default=0)
     top_category = models.CharField(max_length=255, blank=True, null=True)
     report_date = models.DateField(auto_now_add=True, help_text="Date when report was generated")
+    materialized = models.BooleanField(default=False, editable=False, help_text="Daily snapshot written by reports.materialize_reports()")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -419,6 +509,10 @@ class ProductSalesReport(models.Model):
         verbose_name = 'Product Sales Report'
         verbose_name_plural = 'Product Sales Reports'
         ordering = ['-report_date']
+        constraints = [
+            # One snapshot per day; reports created through the API are not snapshots
+            models.UniqueConstraint(fields=['report_date'], condition=models.Q(materialized=True), name='product_sales_report_snapshot_day'),
+        ]
     
     def __str__(self):
         return f"Product Sales Report - {self.report_date}"
@@ -431,6 +525,7 @@ class CustomerAnalysisReport(models.Model):
     returning_customers = models.IntegerField(default=0)
     average_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     report_date = models.DateField(auto_now_add=True, help_text="Date when report was generated")
+    materialized = models.BooleanField(default=False, editable=False, help_text="Daily snapshot written by reports.materialize_reports()")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -438,6 +533,10 @@ class CustomerAnalysisReport(models.Model):
         verbose_name = 'Customer Analysis Report'
         verbose_name_plural = 'Customer Analysis Reports'
         ordering = ['-report_date']
+        constraints = [
+            # One snapshot per day; reports created through the API are not snapshots
+            models.UniqueConstraint(fields=['report_date'], condition=models.Q(materialized=True), name='customer_analysis_report_snapshot_day'),
+        ]
     
     def __str__(self):
         return f"Customer Analysis Report - {self.report_date}"
@@ -450,6 +549,7 @@ class GrowthTrendReport(models.Model):
     quarterly_growth = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Quarterly growth percentage")
     market_share = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Market share percentage")
     report_date = models.DateField(auto_now_add=True, help_text="Date when report was generated")
+    materialized = models.BooleanField(default=False, editable=False, help_text="Daily snapshot written by reports.materialize_reports()")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -457,10 +557,61 @@ class GrowthTrendReport(models.Model):
         verbose_name = 'Growth Trend Report'
         verbose_name_plural = 'Growth Trend Reports'
         ordering = ['-report_date']
+        constraints = [
+            # One snapshot per day; reports created through the API are not snapshots
+            models.UniqueConstraint(fields=['report_date'], condition=models.Q(materialized=True), name='growth_trend_report_snapshot_day'),
+        ]
     
     def __str__(self):
         return f"Growth Trend Report - {self.report_date}"
 
+
+ROLLUP_SOURCE_CHOICES = [
+    ('order', 'Order'),
+    ('invoice', 'Invoice'),
+]
+
+
+class DailyRevenue(models.Model):
+    """Per-day totals of orders and invoices by status, maintained by product_management_app/rollups.py"""
+    day = models.DateField()
+    source = models.CharField(max_length=10, choices=ROLLUP_SOURCE_CHOICES)
+    status = models.CharField(max_length=20)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum of order totals / invoice amounts")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Daily Revenue'
+        verbose_name_plural = 'Daily Revenue'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'status', 'day'], name='daily_revenue_bucket_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.source}/{self.status}: {self.total} ({self.count})"
+
+
+class CustomerOrderStats(models.Model):
+    """Per-customer order aggregates, maintained by product_management_app/rollups.py"""
+    customer = models.OneToOneField(User, related_name='order_stats', on_delete=models.CASCADE, primary_key=True)
+    first_order_at = models.DateTimeField()
+    last_order_at = models.DateTimeField()
+    order_count = models.IntegerField(default=0, help_text="Orders in any status")
+    completed_count = models.IntegerField(default=0, help_text="Completed orders")
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum of completed order totals")
+
+    class Meta:
+        verbose_name = 'Customer Order Stats'
+        verbose_name_plural = 'Customer Order Stats'
+        indexes = [
+            models.Index(fields=['first_order_at'], name='customer_stats_first_idx'),
+            models.Index(fields=['order_count'], name='customer_stats_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.order_count} orders, {self.total_spent} spent"
+
 class SubCategory(models.Model):
     category = models.ForeignKey('website_management_app.Category', on_delete=models.CASCADE, related_name='subcategories')
     name = models.CharField(max_length=255)
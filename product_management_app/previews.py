@@ -0,0 +1,510 @@
+"""
+Server-side PNG previews of a customizer view with recolored parts.
+
+A preview stacks, at the requested width:
+
+1. the white layer (base),
+2. each paintable SVG part (see svg_parts.py) filled with its color from the
+   color map, rasterized to a mask with Pillow,
+3. the black layer (lines and shading) on top.
+
+SVG parts are flattened to polygons here (paths incl. curves and arcs, rect,
+circle, ellipse, polygon, polyline, with transforms), which covers what the
+layer files use; strokes, gradients and filters are not rendered.
+
+Rendered PNGs are cached on disk under a hash of (customizer, its updated_at,
+view, width, normalized color map). Hits refresh the file's mtime; when the
+directory grows past PREVIEW_CACHE_MAX_BYTES the least recently used files
+are evicted. Each process keeps a running total of the directory size (the
+last scan plus what it has written since), so the directory is only scanned
+when that total crosses the limit; files written by other workers are picked
+up at the next scan.
+"""
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from PIL import Image, ImageChops, ImageColor, ImageDraw
+
+from .svg_parts import PART_KEY, SIDES, SHAPES, NON_RENDERED, validate_part_colors
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTH = 512
+MAX_WIDTH = 1024
+CURVE_STEPS = 16
+ELLIPSE_STEPS = 64
+
+
+def cache_dir():
+    return getattr(settings, 'PREVIEW_CACHE_DIR', os.path.join(settings.BASE_DIR, '.cache', 'previews'))
+
+
+def cache_max_bytes():
+    return getattr(settings, 'PREVIEW_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+
+# -- color maps -------------------------------------------------------------
+
+def normalize_colors(customizer, view, colors):
+    """
+    Validate a part color map and reduce it to the parts of `view`, with colors
+    in canonical #rrggbb / #rrggbbaa form, so equivalent maps share a cache entry.
+    Raises ValidationError.
+    """
+    validate_part_colors(customizer, colors)
+    normalized = {}
+    for key, color in colors.items():
+        match = PART_KEY.match(key)
+        if match is None or match.group(1) != view:
+            continue
+        try:
+            rgba = ImageColor.getcolor(color, 'RGBA')
+        except (ValueError, AttributeError):
+            raise ValidationError(f'"{key}": "{color}" is not a color.')
+        normalized[int(match.group(2))] = '#' + ''.join(f'{channel:02x}' for channel in (rgba if rgba[3] < 255 else rgba[:3]))
+    return dict(sorted(normalized.items()))
+
+
+def preview_key(customizer, view, width, colors):
+    source = json.dumps([customizer.pk, customizer.updated_at.isoformat(), view, width, colors])
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+# -- SVG geometry -----------------------------------------------------------
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+NUMBER = re.compile(r'[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?')
+TRANSFORM = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+PATH_TOKEN = re.compile(r'([MmLlHhVvCcSsQqTtAaZz])|([-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?)')
+
+
+def _multiply(m, n):
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a * a2 + c * b2, b * a2 + d * b2,
+        a * c2 + c * d2, b * c2 + d * d2,
+        a * e2 + c * f2 + e, b * e2 + d * f2 + f,
+    )
+
+
+def parse_transform(value):
+    matrix = IDENTITY
+    for name, args in TRANSFORM.findall(value or ''):
+        values = [float(v) for v in NUMBER.findall(args)]
+        if name == 'matrix' and len(values) == 6:
+            step = tuple(values)
+        elif name == 'translate' and values:
+            step = (1, 0, 0, 1, values[0], values[1] if len(values) > 1 else 0)
+        elif name == 'scale' and values:
+            step = (values[0], 0, 0, values[1] if len(values) > 1 else values[0], 0, 0)
+        elif name == 'rotate' and values:
+            angle = math.radians(values[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0, 0)
+            if len(values) == 3:
+                cx, cy = values[1], values[2]
+                step = _multiply(_multiply((1, 0, 0, 1, cx, cy), step), (1, 0, 0, 1, -cx, -cy))
+        elif name == 'skewX' and values:
+            step = (1, 0, math.tan(math.radians(values[0])), 1, 0, 0)
+        elif name == 'skewY' and values:
+            step = (1, math.tan(math.radians(values[0])), 0, 1, 0, 0)
+        else:
+            continue
+        matrix = _multiply(matrix, step)
+    return matrix
+
+
+def _apply(matrix, points):
+    a, b, c, d, e, f = matrix
+    return [(a * x + c * y + e, b * x + d * y + f) for x, y in points]
+
+
+def _cubic(p0, p1, p2, p3):
+    points = []
+    for i in range(1, CURVE_STEPS + 1):
+        t = i / CURVE_STEPS
+        u = 1 - t
+        points.append((
+            u ** 3 * p0[0] + 3 * u * u * t * p1[0] + 3 * u * t * t * p2[0] + t ** 3 * p3[0],
+            u ** 3 * p0[1] + 3 * u * u * t * p1[1] + 3 * u * t * t * p2[1] + t ** 3 * p3[1],
+        ))
+    return points
+
+
+def _quadratic(p0, p1, p2):
+    points = []
+    for i in range(1, CURVE_STEPS + 1):
+        t = i / CURVE_STEPS
+        u = 1 - t
+        points.append((
+            u * u * p0[0] + 2 * u * t * p1[0] + t * t * p2[0],
+            u * u * p0[1] + 2 * u * t * p1[1] + t * t * p2[1],
+        ))
+    return points
+
+
+def _arc(p0, rx, ry, rotation, large, sweep, p1):
+    """Endpoint arc to points (SVG implementation notes, F.6.5)"""
+    if rx == 0 or ry == 0 or p0 == p1:
+        return [p1]
+    phi = math.radians(rotation)
+    cos, sin = math.cos(phi), math.sin(phi)
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1, y1 = cos * dx + sin * dy, -sin * dx + cos * dy
+    rx, ry = abs(rx), abs(ry)
+    scale = (x1 * x1) / (rx * rx) + (y1 * y1) / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    numerator = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+    denominator = rx * rx * y1 * y1 + ry * ry * x1 * x1
+    factor = math.sqrt(max(0.0, numerator / denominator)) if denominator else 0.0
+    if large == sweep:
+        factor = -factor
+    cx1, cy1 = factor * rx * y1 / ry, -factor * ry * x1 / rx
+    cx = cos * cx1 - sin * cy1 + (p0[0] + p1[0]) / 2
+    cy = sin * cx1 + cos * cy1 + (p0[1] + p1[1]) / 2
+    start = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    end = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx)
+    delta = end - start
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+    steps = max(2, int(abs(delta) / (2 * math.pi) * ELLIPSE_STEPS))
+    points = []
+    for i in range(1, steps + 1):
+        angle = start + delta * i / steps
+        x, y = rx * math.cos(angle), ry * math.sin(angle)
+        points.append((cos * x - sin * y + cx, sin * x + cos * y + cy))
+    return points
+
+
+def path_polygons(d):
+    """Flatten SVG path data to a list of polygons (one per subpath)"""
+    tokens = PATH_TOKEN.findall(d or '')
+    polygons, current = [], []
+    x = y = start_x = start_y = 0.0
+    last_control = None
+    command = None
+    i = 0
+
+    def numbers(count):
+        nonlocal i
+        values = []
+        while len(values) < count:
+            if i >= len(tokens) or tokens[i][0]:
+                raise ValueError('Truncated path data')
+            values.append(float(tokens[i][1]))
+            i += 1
+        return values
+
+    while i < len(tokens):
+        if tokens[i][0]:
+            command = tokens[i][0]
+            i += 1
+        elif command is None:
+            raise ValueError('Path data must start with a command')
+        relative = command.islower()
+        op = command.upper()
+        ox, oy = (x, y) if relative else (0.0, 0.0)
+
+        if op == 'Z':
+            if current:
+                polygons.append(current)
+            current = []
+            x, y = start_x, start_y
+            last_control = None
+            continue
+        if op == 'M':
+            if current:
+                polygons.append(current)
+            nx, ny = numbers(2)
+            x, y = ox + nx, oy + ny
+            start_x, start_y = x, y
+            current = [(x, y)]
+            command = 'l' if relative else 'L'
+            last_control = None
+            continue
+        if not current:
+            current = [(x, y)]
+        if op == 'L':
+            nx, ny = numbers(2)
+            x, y = ox + nx, oy + ny
+            current.append((x, y))
+            last_control = None
+        elif op == 'H':
+            (nx,) = numbers(1)
+            x = ox + nx
+            current.append((x, y))
+            last_control = None
+        elif op == 'V':
+            (ny,) = numbers(1)
+            y = oy + ny
+            current.append((x, y))
+            last_control = None
+        elif op in ('C', 'S'):
+            if op == 'C':
+                x1, y1, x2, y2, nx, ny = numbers(6)
+                c1 = (ox + x1, oy + y1)
+            else:
+                x2, y2, nx, ny = numbers(4)
+                c1 = (2 * x - last_control[0], 2 * y - last_control[1]) if last_control and last_control[2] == 'C' else (x, y)
+            c2 = (ox + x2, oy + y2)
+            end = (ox + nx, oy + ny)
+            current.extend(_cubic((x, y), c1, c2, end))
+            last_control = (c2[0], c2[1], 'C')
+            x, y = end
+        elif op in ('Q', 'T'):
+            if op == 'Q':
+                x1, y1, nx, ny = numbers(4)
+                c1 = (ox + x1, oy + y1)
+            else:
+                nx, ny = numbers(2)
+                c1 = (2 * x - last_control[0], 2 * y - last_control[1]) if last_control and last_control[2] == 'Q' else (x, y)
+            end = (ox + nx, oy + ny)
+            current.extend(_quadratic((x, y), c1, end))
+            last_control = (c1[0], c1[1], 'Q')
+            x, y = end
+        elif op == 'A':
+            rx, ry, rotation, large, sweep, nx, ny = numbers(7)
+            end = (ox + nx, oy + ny)
+            current.extend(_arc((x, y), rx, ry, rotation, bool(large), bool(sweep), end))
+            x, y = end
+            last_control = None
+    if current:
+        polygons.append(current)
+    return [polygon for polygon in polygons if len(polygon) > 2]
+
+
+def _float(element, name, default=0.0):
+    match = NUMBER.match(element.get(name, '') or '')
+    return float(match.group()) if match else default
+
+
+def _ellipse(cx, cy, rx, ry):
+    return [
+        (cx + rx * math.cos(2 * math.pi * i / ELLIPSE_STEPS), cy + ry * math.sin(2 * math.pi * i / ELLIPSE_STEPS))
+        for i in range(ELLIPSE_STEPS)
+    ]
+
+
+def shape_polygons(element):
+    name = element.tag.rsplit('}', 1)[-1]
+    if name == 'path':
+        return path_polygons(element.get('d'))
+    if name == 'rect':
+        x, y = _float(element, 'x'), _float(element, 'y')
+        w, h = _float(element, 'width'), _float(element, 'height')
+        return [[(x, y), (x + w, y), (x + w, y + h), (x, y + h)]] if w > 0 and h > 0 else []
+    if name == 'circle':
+        r = _float(element, 'r')
+        return [_ellipse(_float(element, 'cx'), _float(element, 'cy'), r, r)] if r > 0 else []
+    if name == 'ellipse':
+        rx, ry = _float(element, 'rx'), _float(element, 'ry')
+        return [_ellipse(_float(element, 'cx'), _float(element, 'cy'), rx, ry)] if rx > 0 and ry > 0 else []
+    if name in ('polygon', 'polyline'):
+        values = [float(v) for v in NUMBER.findall(element.get('points', ''))]
+        points = list(zip(values[0::2], values[1::2]))
+        return [points] if len(points) > 2 else []
+    return []
+
+
+def part_geometry(svg_content):
+    """({part number: [polygons in user space]}, (viewBox x, y, width, height))"""
+    root = ET.fromstring(svg_content)
+    view_box = [float(v) for v in NUMBER.findall(root.get('viewBox', ''))]
+    if len(view_box) != 4:
+        view_box = [0.0, 0.0, _float(root, 'width', 0.0), _float(root, 'height', 0.0)]
+    parts = {}
+
+    def walk(element, matrix):
+        for child in element:
+            name = child.tag.rsplit('}', 1)[-1] if isinstance(child.tag, str) else ''
+            if name in NON_RENDERED:
+                continue
+            child_matrix = _multiply(matrix, parse_transform(child.get('transform')))
+            part = child.get('data-part')
+            if part and name in SHAPES:
+                try:
+                    polygons = shape_polygons(child)
+                except ValueError:
+                    polygons = []
+                parts[int(part.rsplit('_', 1)[1])] = [_apply(child_matrix, polygon) for polygon in polygons]
+            walk(child, child_matrix)
+
+    walk(root, parse_transform(root.get('transform')))
+    return parts, tuple(view_box)
+
+
+# -- rendering --------------------------------------------------------------
+
+def _layer_image(customizer, field, width):
+    """A raster layer at `width` px, from the smallest derivative that is wide enough"""
+    value = getattr(customizer, field)
+    if not value:
+        return None
+    name = value.name
+    layer = (customizer.image_derivatives or {}).get('layers', {}).get(field, {})
+    if layer.get('source') == name:
+        for size in sorted(layer.get('sizes', {}), key=int):
+            if int(size) >= width:
+                name = layer['sizes'][size]['src']
+                break
+    with default_storage.open(name, 'rb') as handle:
+        image = Image.open(handle)
+        image.load()
+    image = image.convert('RGBA')
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def render_preview(customizer, view, width, colors):
+    """Composite one view of a customizer as PNG bytes"""
+    white = _layer_image(customizer, f'{view}_white_layer', width)
+    black = _layer_image(customizer, f'{view}_black_layer', width)
+
+    parts, view_box = {}, None
+    entry = (customizer.svg_parts or {}).get(view, {})
+    if entry.get('file'):
+        with default_storage.open(entry['file'], 'rb') as handle:
+            parts, view_box = part_geometry(handle.read())
+
+    reference = white or black
+    if reference is not None:
+        height = reference.height
+    elif view_box and view_box[2] > 0 and view_box[3] > 0:
+        height = max(1, round(width * view_box[3] / view_box[2]))
+    else:
+        height = width
+    canvas = white if white is not None else Image.new('RGBA', (width, height), (0, 0, 0, 0))
+
+    if parts and view_box and view_box[2] > 0 and view_box[3] > 0:
+        sx, sy = width / view_box[2], height / view_box[3]
+        to_pixels = (sx, 0, 0, sy, -view_box[0] * sx, -view_box[1] * sy)
+        for number, color in colors.items():
+            polygons = parts.get(number)
+            if not polygons:
+                continue
+            mask = Image.new('L', (width, height), 0)
+            for polygon in polygons:
+                # Each subpath toggles coverage, so holes stay empty (even-odd fill)
+                subpath = Image.new('L', (width, height), 0)
+                ImageDraw.Draw(subpath).polygon(_apply(to_pixels, polygon), fill=255)
+                mask = ImageChops.logical_xor(mask.convert('1'), subpath.convert('1')).convert('L')
+            rgba = ImageColor.getcolor(color, 'RGBA')
+            if rgba[3] < 255:
+                mask = mask.point(lambda value: value * rgba[3] // 255)
+            canvas.paste(Image.new('RGBA', (width, height), rgba[:3] + (255,)), (0, 0), mask)
+
+    if black is not None:
+        canvas = Image.alpha_composite(canvas, black.resize(canvas.size))
+
+    buffer = io.BytesIO()
+    canvas.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+# -- disk cache -------------------------------------------------------------
+
+def _cache_path(key):
+    return os.path.join(cache_dir(), f'{key}.png')
+
+
+def read_cached(key):
+    """Cached preview bytes, marking the file as recently used; None on a miss"""
+    path = _cache_path(key)
+    try:
+        with open(path, 'rb') as handle:
+            content = handle.read()
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return content
+
+
+# Cache directory: bytes in it, as of the last scan plus this process's writes since
+_sizes = {}
+_sizes_lock = threading.Lock()
+
+
+def evict(limit=None, keep=None):
+    """
+    Delete least recently used previews until the cache fits in `limit`
+    bytes; returns the bytes left
+    """
+    limit = cache_max_bytes() if limit is None else limit
+    directory = cache_dir()
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.is_file() and entry.name.endswith('.png')]
+    except FileNotFoundError:
+        entries = []
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    with _sizes_lock:
+        _sizes[directory] = total
+    return total
+
+
+def store_preview(key, content):
+    """Write a preview atomically, then trim the cache once it is past the limit"""
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'wb') as output:
+        output.write(content)
+    path = _cache_path(key)
+    os.replace(temporary, path)
+    with _sizes_lock:
+        total = _sizes.get(directory)
+        if total is not None:
+            total = _sizes[directory] = total + len(content)
+    if total is None or total > cache_max_bytes():
+        evict(keep=path)
+
+
+def get_preview(customizer, view, width, colors):
+    """
+    (PNG bytes, cache key) for a normalized color map, rendering on a miss;
+    raises OSError when a layer file cannot be read
+    """
+    if view not in SIDES:
+        raise ValidationError(f'View must be one of: {", ".join(SIDES)}.')
+    key = preview_key(customizer, view, width, colors)
+    content = read_cached(key)
+    if content is None:
+        content = render_preview(customizer, view, width, colors)
+        try:
+            store_preview(key, content)
+        except OSError:
+            # The preview is still good; it is rendered again on the next request
+            logger.warning('Could not cache preview %s', key, exc_info=True)
+    return content, key
@@ -0,0 +1,221 @@
+"""
+Report figures and their stored snapshots.
+
+compute_reports() derives the four reports (revenue, product sales,
+customer analysis, growth trend) from one pass over the rollups: a single
+conditional-aggregate query over DailyRevenue for every period any report
+needs, one over CustomerOrderStats and one grouped query over OrderItem
+for the top product.
+
+materialize_reports() stores the result as the day's RevenueReport,
+ProductSalesReport, CustomerAnalysisReport and GrowthTrendReport rows
+(materialized=True, unique per report_date), updating them in place when run
+again on the same day, also from concurrent runs. The generate/ endpoints
+serve the newest of those snapshots when it is fresh enough for the caller's
+?max_age=; reports created through the CRUD endpoints are never served as
+snapshots.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import CustomerAnalysisReport, GrowthTrendReport, OrderItem, ProductSalesReport, RevenueReport
+from .rollups import REVENUE_STATUS, customer_totals, month_start, previous_month, revenue_totals
+
+
+REPORT_MODELS = {
+    'revenue': RevenueReport,
+    'product_sales': ProductSalesReport,
+    'customer_analysis': CustomerAnalysisReport,
+    'growth_trend': GrowthTrendReport,
+}
+
+
+def growth_percentage(current, previous):
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return Decimal('100.00') if current > 0 else Decimal('0.00')
+
+
+def report_periods(today):
+    """Every (first day, last day) range the reports compare"""
+    current_quarter_start = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+    last_quarter_end = current_quarter_start - timedelta(days=1)
+    current_year_start = today.replace(month=1, day=1)
+    return {
+        'this_month': (month_start(today), today),
+        'last_month': previous_month(today),
+        'this_quarter': (current_quarter_start, today),
+        'last_quarter': (last_quarter_end.replace(month=(last_quarter_end.month - 1) // 3 * 3 + 1, day=1), last_quarter_end),
+        'this_year': (current_year_start, today),
+        'last_year': (current_year_start.replace(year=current_year_start.year - 1), current_year_start - timedelta(days=1)),
+    }
+
+
+TOP_PRODUCT_ORDERINGS = {
+    'revenue': ('-revenue', '-units'),
+    'units': ('-units', '-revenue'),
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(timezone.datetime.combine(day, timezone.datetime.min.time()))
+
+
+def top_products(start=None, end=None, category=None, by='revenue', limit=10):
+    """
+    Best-selling shirts and customizers from completed orders' line items,
+    in one grouped query.
+
+    `start`/`end` are inclusive dates, `category` a website Category id and
+    `by` either 'revenue' or 'units'. Rows: product_type, product_id, name,
+    category, units, revenue.
+    """
+    items = OrderItem.objects.filter(order__status=REVENUE_STATUS['order']).filter(
+        Q(shirt__isnull=False) | Q(customizer__isnull=False)
+    )
+    if start:
+        items = items.filter(order__date__gte=_day_start(start))
+    if end:
+        items = items.filter(order__date__lt=_day_start(end + timedelta(days=1)))
+    if category:
+        items = items.filter(Q(shirt__category_id=category) | Q(customizer__category_id=category))
+
+    line_total = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    rows = (
+        items.values(
+            'shirt_id', 'shirt__title', 'shirt__category__category_name',
+            'customizer_id', 'customizer__title', 'customizer__category__category_name',
+        )
+        .annotate(units=Sum('quantity'), revenue=Sum(line_total))
+        .order_by(*TOP_PRODUCT_ORDERINGS[by], 'shirt_id', 'customizer_id')[:limit]
+    )
+    products = []
+    for row in rows:
+        product_type = 'shirt' if row['shirt_id'] else 'customizer'
+        products.append({
+            'product_type': product_type,
+            'product_id': row[f'{product_type}_id'],
+            'name': row[f'{product_type}__title'],
+            'category': row[f'{product_type}__category__category_name'],
+            'units': row['units'],
+            'revenue': row['revenue'] or Decimal('0.00'),
+        })
+    return products
+
+
+def compute_reports(now=None, only=None):
+    """
+    Figures for the reports named in `only` (default: all four), keyed like
+    REPORT_MODELS, each a dict of the report model's field values.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    only = set(only or REPORT_MODELS)
+    reports = {}
+
+    if only & {'revenue', 'growth_trend'}:
+        periods = report_periods(today)
+        if 'growth_trend' not in only:
+            periods = {name: periods[name] for name in ('this_month', 'last_month')}
+        totals = revenue_totals(periods)
+
+    if 'revenue' in only:
+        this_month, last_month = totals['this_month']['revenue'], totals['last_month']['revenue']
+        reports['revenue'] = {
+            'this_month_revenue': this_month,
+            'last_month_revenue': last_month,
+            'growth_percentage': growth_percentage(this_month, last_month),
+            'total_orders': totals['this_month']['orders'],
+        }
+
+    if 'product_sales' in only:
+        # Best seller by revenue from this month's completed order lines
+        top = top_products(month_start(today), today, limit=1)
+        top = top[0] if top else None
+        reports['product_sales'] = {
+            'top_product_name': top['name'] if top else None,
+            'top_product_revenue': top['revenue'] if top else Decimal('0.00'),
+            'top_product_units_sold': top['units'] if top else 0,
+            'top_category': (top['category'] or 'N/A') if top else None,
+        }
+
+    if 'customer_analysis' in only:
+        customers = customer_totals(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+        reports['customer_analysis'] = {
+            'total_customers': customers['total'],
+            'new_customers': customers['new'],
+            'returning_customers': customers['returning'],
+            'average_order_value': customers['average_order_value'],
+        }
+
+    if 'growth_trend' in only:
+        revenue = {name: value['revenue'] for name, value in totals.items()}
+        reports['growth_trend'] = {
+            'monthly_growth': growth_percentage(revenue['this_month'], revenue['last_month']),
+            'yearly_growth': growth_percentage(revenue['this_year'], revenue['last_year']),
+            'quarterly_growth': growth_percentage(revenue['this_quarter'], revenue['last_quarter']),
+            'market_share': Decimal('100.00'),  # Placeholder - would need industry data for real calculation
+        }
+
+    return reports
+
+
+def _fit(model, values):
+    """Round/clamp Decimal values to the snapshot columns (percentages are DECIMAL(5, 2))"""
+    fitted = {}
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if isinstance(value, Decimal) and getattr(field, 'max_digits', None):
+            limit = Decimal(10) ** (field.max_digits - field.decimal_places) - Decimal(1).scaleb(-field.decimal_places)
+            value = max(-limit, min(limit, value.quantize(Decimal(1).scaleb(-field.decimal_places))))
+        fitted[name] = value
+    return fitted
+
+
+def materialize_reports(now=None):
+    """Store today's snapshot of every report, replacing one stored earlier the same day"""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    reports = compute_reports(now)
+    stored = {}
+    with transaction.atomic():
+        for name, model in REPORT_MODELS.items():
+            # A run that loses the race to create the row updates the winner's
+            # (update_or_create retries the read on IntegrityError)
+            stored[name], _ = model.objects.update_or_create(
+                report_date=today, materialized=True, defaults=_fit(model, reports[name]),
+            )
+    return stored
+
+
+def fresh_snapshot(name, max_age):
+    """The newest daily snapshot if updated within `max_age` seconds, else None"""
+    snapshot = REPORT_MODELS[name].objects.filter(materialized=True).order_by('-report_date').first()
+    if snapshot and snapshot.updated_at >= timezone.now() - timedelta(seconds=max_age):
+        return snapshot
+    return None
+
+
+def report_fields(name):
+    """Figure fields of a report model (everything but id, report_date and timestamps)"""
+    skip = {'id', 'report_date', 'created_at', 'updated_at'}
+    return [field.name for field in REPORT_MODELS[name]._meta.concrete_fields if field.name not in skip]
+
+
+def report_data(values, report_date, generated_at):
+    """API representation shared by live and stored reports"""
+    data = {key: float(value) if isinstance(value, Decimal) else value for key, value in values.items()}
+    data['report_date'] = report_date
+    data['generated_at'] = generated_at.isoformat()
+    return data
+
+
+def snapshot_data(name, snapshot):
+    values = {field: getattr(snapshot, field) for field in report_fields(name)}
+    data = report_data(values, snapshot.report_date, snapshot.updated_at)
+    data['snapshot_id'] = snapshot.id
+    return data
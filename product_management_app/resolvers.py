@@ -0,0 +1,150 @@
+"""
+Category / SubCategory resolution for serializers.
+
+Customizer, Shirt and SubCategory payloads embed the full Category and
+SubCategory objects they reference. Resolving those one row at a time costs a
+query per row, so serializers go through a CategoryResolver instead:
+
+- a request-scoped identity map (one resolver per serializer context),
+- backed by a process-level cache (Django's cache framework) holding the
+  serialized representations,
+- batch-loaded with one query per model for everything a page references.
+
+The cached entries are keyed by a version stamp kept in the shared cache
+(TAXONOMY_CACHE_ALIAS), read once per resolver. Saving or deleting a
+Category or SubCategory replaces the stamp, which retires every cached entry
+in every worker at once.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import router, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from website_management_app.models import Category
+from .models import SubCategory
+
+
+VERSION_KEY = 'taxonomy:version'
+CONTEXT_KEY = 'category_resolver'
+
+
+def _cache_timeout():
+    return getattr(settings, 'TAXONOMY_CACHE_TIMEOUT', 300)
+
+
+def _stamps():
+    return caches[getattr(settings, 'TAXONOMY_CACHE_ALIAS', 'default')]
+
+
+def _current_version():
+    version = _stamps().get(VERSION_KEY)
+    if version is None:
+        _stamps().add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = _stamps().get(VERSION_KEY)
+    return version
+
+
+def invalidate_taxonomy_cache():
+    """Retire every cached category/subcategory representation, in every worker"""
+    _stamps().set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def normalize_subcategory_ids(value):
+    """Return the list of subcategory ids in a sub_category value (ids, id list or objects)"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [int(item) if isinstance(item, str) else item for item in value
+                if isinstance(item, int) or (isinstance(item, str) and item.isdigit())]
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, str) and value.isdigit():
+        return [int(value)]
+    if hasattr(value, 'id'):
+        return [value.id]
+    return []
+
+
+class CategoryResolver:
+    """Identity map of serialized categories and subcategories for one request"""
+
+    def __init__(self):
+        self.version = _current_version()
+        self._categories = {}
+        self._subcategories = {}
+
+    def _key(self, kind, pk):
+        return f'taxonomy:{self.version}:{kind}:{pk}'
+
+    def _load(self, kind, ids, store, fetch):
+        """Fill `store` for `ids` from the process cache, then from the database"""
+        missing = {pk for pk in ids if pk is not None and pk not in store}
+        if not missing:
+            return
+        keys = {self._key(kind, pk): pk for pk in missing}
+        for key, data in cache.get_many(keys.keys()).items():
+            store[keys[key]] = data
+            missing.discard(keys[key])
+        if not missing:
+            return
+        loaded = fetch(missing)
+        store.update(loaded)
+        # Remember misses too so deleted ids are not looked up again on every row
+        for pk in missing - loaded.keys():
+            store[pk] = None
+        cache.set_many({self._key(kind, pk): data for pk, data in loaded.items()}, _cache_timeout())
+
+    def _fetch_categories(self, ids):
+        from website_management_app.serializers import CategorySerializer as FullCategorySerializer
+        return {
+            category.id: dict(FullCategorySerializer(category).data)
+            for category in Category.objects.filter(id__in=ids)
+        }
+
+    def _fetch_subcategories(self, ids):
+        from .serializers import SubCategorySerializer
+        subcategories = list(SubCategory.objects.filter(id__in=ids))
+        self.prime(category_ids=[sub.category_id for sub in subcategories])
+        context = {CONTEXT_KEY: self}
+        return {
+            sub.id: dict(SubCategorySerializer(sub, context=context).data)
+            for sub in subcategories
+        }
+
+    def prime(self, category_ids=(), subcategory_ids=()):
+        """Batch-load everything a page references: at most one query per model"""
+        self._load('subcategory', set(subcategory_ids), self._subcategories, self._fetch_subcategories)
+        self._load('category', set(category_ids), self._categories, self._fetch_categories)
+
+    def category(self, category_id):
+        """Serialized Category for an id, or None if it does not exist"""
+        if category_id not in self._categories:
+            self.prime(category_ids=[category_id])
+        return self._categories.get(category_id)
+
+    def subcategories(self, subcategory_ids):
+        """Serialized SubCategory objects for a list of ids, ordered by id; unknown ids are skipped"""
+        ids = sorted(set(subcategory_ids))
+        self.prime(subcategory_ids=ids)
+        return [self._subcategories[pk] for pk in ids if self._subcategories.get(pk) is not None]
+
+
+def get_resolver(context):
+    """Return the resolver stored in a serializer context, creating it on first use"""
+    resolver = context.get(CONTEXT_KEY)
+    if resolver is None:
+        resolver = CategoryResolver()
+        context[CONTEXT_KEY] = resolver
+    return resolver
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SubCategory)
+def _invalidate_on_change(sender, **kwargs):
+    invalidate_taxonomy_cache()
+    # Again once committed, so a worker that cached the old rows while
+    # this transaction was open does not keep them
+    transaction.on_commit(invalidate_taxonomy_cache, using=kwargs.get('using') or router.db_for_write(sender))
@@ -0,0 +1,379 @@
+"""
+Daily revenue and per-customer order rollups.
+
+DailyRevenue keeps one row per (source, status, day) with the summed order
+totals / invoice amounts and the number of rows. The save/delete signals of
+Order and Invoice move each row's amount between buckets inside the same
+transaction as the write (Order.save/Invoice.save run atomically, deletes
+already do), so the report generators can sum a handful of day rows instead
+of scanning every order.
+
+CustomerOrderStats keeps first/last order date, order counts and completed
+spend per customer. A first/last date cannot be decremented, so each order
+write re-aggregates the affected customer's orders (one query on the
+indexed customer_id) instead of applying a delta.
+
+revenue_series() groups the daily rows into day/week/month/quarter buckets.
+Buckets that ended before today are cached without expiry; a change to a
+past day (an old order edited or deleted) drops the buckets containing that
+day, and a rebuild drops them all.
+
+Writes that skip signals (queryset.update(), bulk_create(), raw SQL) are not
+tracked; run `manage.py rebuild_revenue_rollup` and
+`manage.py rebuild_customer_stats` after those.
+"""
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncQuarter, TruncWeek
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CustomerOrderStats, DailyRevenue, Invoice, Order
+
+
+# sender: (rollup source, amount field)
+TRACKED = {
+    Order: ('order', 'total'),
+    Invoice: ('invoice', 'amount'),
+}
+# Statuses that count as revenue
+REVENUE_STATUS = {
+    'order': 'completed',
+    'invoice': 'paid',
+}
+
+
+def _bucket(instance):
+    """(day, status, amount) an instance contributes to"""
+    source, field = TRACKED[type(instance)]
+    # Unsaved values may still be str/int/float as assigned by the caller
+    return timezone.localdate(instance.date), instance.status, Decimal(str(getattr(instance, field) or 0))
+
+
+def apply_delta(source, day, status, amount, count, using=None):
+    """Add `amount`/`count` (either may be negative) to one rollup bucket"""
+    if not amount and not count:
+        return
+    if day < timezone.localdate():
+        forget_series(day, using=using)
+    manager = DailyRevenue.objects.db_manager(using)
+    with transaction.atomic(using=using):
+        updated = manager.filter(source=source, status=status, day=day).update(
+            total=F('total') + amount, count=F('count') + count,
+        )
+        if not updated:
+            # get_or_create settles a concurrent insert of the same bucket
+            manager.get_or_create(source=source, status=status, day=day)
+            manager.filter(source=source, status=status, day=day).update(
+                total=F('total') + amount, count=F('count') + count,
+            )
+
+
+def rebuild(using=None):
+    """Recompute the whole rollup from the Order and Invoice tables; returns the row count"""
+    rows = []
+    tz = timezone.get_current_timezone()
+    for model, (source, field) in TRACKED.items():
+        buckets = (
+            model.objects.using(using)
+            .annotate(day=TruncDate('date', tzinfo=tz))
+            .values('day', 'status')
+            .annotate(total=Sum(field), count=Count('id'))
+            .order_by()
+        )
+        rows.extend(
+            DailyRevenue(source=source, day=row['day'], status=row['status'], total=row['total'] or 0, count=row['count'])
+            for row in buckets
+        )
+    with transaction.atomic(using=using):
+        DailyRevenue.objects.using(using).all().delete()
+        DailyRevenue.objects.using(using).bulk_create(rows, batch_size=500)
+    _series_cache().set(SERIES_GENERATION_KEY, uuid.uuid4().hex, None)
+    return len(rows)
+
+
+def revenue_totals(periods, using=None):
+    """
+    Revenue (completed orders + paid invoices) and completed order count for
+    several inclusive day ranges in one query.
+
+    `periods` is {name: (first day or None, last day or None)}; returns
+    {name: {'revenue': Decimal, 'order_revenue': Decimal, 'orders': int}}.
+    """
+    revenue = Q(source='order', status=REVENUE_STATUS['order']) | Q(source='invoice', status=REVENUE_STATUS['invoice'])
+    completed_orders = Q(source='order', status=REVENUE_STATUS['order'])
+    aggregates = {}
+    for name, (first, last) in periods.items():
+        within = Q()
+        if first:
+            within &= Q(day__gte=first)
+        if last:
+            within &= Q(day__lte=last)
+        aggregates[f'{name}__revenue'] = Sum('total', filter=revenue & within)
+        aggregates[f'{name}__order_revenue'] = Sum('total', filter=completed_orders & within)
+        aggregates[f'{name}__orders'] = Sum('count', filter=completed_orders & within)
+    result = DailyRevenue.objects.using(using).filter(revenue).aggregate(**aggregates)
+    return {
+        name: {
+            'revenue': result[f'{name}__revenue'] or Decimal('0.00'),
+            'order_revenue': result[f'{name}__order_revenue'] or Decimal('0.00'),
+            'orders': result[f'{name}__orders'] or 0,
+        }
+        for name in periods
+    }
+
+
+def _customer_aggregates():
+    completed = Q(status=REVENUE_STATUS['order'])
+    return {
+        'first_order_at': Min('date'),
+        'last_order_at': Max('date'),
+        'order_count': Count('id'),
+        'completed_count': Count('id', filter=completed),
+        'total_spent': Sum('total', filter=completed),
+    }
+
+
+def refresh_customer_stats(customer_id, using=None):
+    """Re-aggregate one customer's orders into CustomerOrderStats"""
+    with transaction.atomic(using=using):
+        values = Order.objects.using(using).filter(customer_id=customer_id).aggregate(**_customer_aggregates())
+        stats = CustomerOrderStats.objects.using(using).filter(customer_id=customer_id)
+        if not values['order_count']:
+            stats.delete()
+            return
+        values['total_spent'] = values['total_spent'] or 0
+        if not stats.update(**values):
+            CustomerOrderStats.objects.using(using).update_or_create(customer_id=customer_id, defaults=values)
+
+
+def rebuild_customer_stats(using=None):
+    """Recompute CustomerOrderStats for every customer; returns the row count"""
+    rows = []
+    for values in Order.objects.using(using).values('customer_id').annotate(**_customer_aggregates()).order_by():
+        values['total_spent'] = values['total_spent'] or 0
+        rows.append(CustomerOrderStats(**values))
+    with transaction.atomic(using=using):
+        CustomerOrderStats.objects.using(using).all().delete()
+        CustomerOrderStats.objects.using(using).bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def customer_totals(since, using=None):
+    """
+    Customer counts and average completed order value in one query.
+
+    Returns {'total', 'new' (first order on/after `since`), 'returning'
+    (more than one order), 'average_order_value'}.
+    """
+    result = CustomerOrderStats.objects.using(using).aggregate(
+        total=Count('pk'),
+        new=Count('pk', filter=Q(first_order_at__gte=since)),
+        returning=Count('pk', filter=Q(order_count__gt=1)),
+        spent=Sum('total_spent'),
+        completed=Sum('completed_count'),
+    )
+    completed = result['completed'] or 0
+    return {
+        'total': result['total'],
+        'new': result['new'],
+        'returning': result['returning'],
+        'average_order_value': (result['spent'] or Decimal('0.00')) / completed if completed else Decimal('0.00'),
+    }
+
+
+SERIES_BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+SERIES_GENERATION_KEY = 'revenue_series:generation'
+MAX_SERIES_BUCKETS = 1000
+
+
+def _series_cache():
+    return caches[getattr(settings, 'REPORT_CACHE_ALIAS', 'default')]
+
+
+def bucket_start(day, size):
+    """First day of the `size` bucket containing `day` (weeks start on Monday)"""
+    if size == 'day':
+        return day
+    if size == 'week':
+        return day - timedelta(days=day.weekday())
+    if size == 'month':
+        return day.replace(day=1)
+    return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+
+
+def next_bucket(start, size):
+    """First day of the bucket after the one starting at `start`"""
+    if size == 'day':
+        return start + timedelta(days=1)
+    if size == 'week':
+        return start + timedelta(days=7)
+    months = 1 if size == 'month' else 3
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def _series_key(generation, size, start):
+    return f'revenue_series:{generation}:{size}:{start.isoformat()}'
+
+
+def _series_generation():
+    cache = _series_cache()
+    generation = cache.get(SERIES_GENERATION_KEY)
+    if generation is None:
+        cache.add(SERIES_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(SERIES_GENERATION_KEY)
+    return generation
+
+
+def forget_series(day, using=None):
+    """Drop the cached buckets containing `day`, now and again once committed"""
+    def forget():
+        generation = _series_generation()
+        _series_cache().delete_many([_series_key(generation, size, bucket_start(day, size)) for size in SERIES_BUCKETS])
+    forget()
+    transaction.on_commit(forget, using=using)
+
+
+def _empty_bucket(start, end):
+    return {
+        'period_start': start,
+        'period_end': end,
+        'order_revenue': Decimal('0.00'),
+        'invoice_revenue': Decimal('0.00'),
+        'revenue': Decimal('0.00'),
+        'orders': 0,
+        'invoices': 0,
+    }
+
+
+def revenue_series(start, end, size, using=None):
+    """
+    Revenue per bucket for the buckets overlapping [start, end].
+
+    Each bucket has period_start/period_end (inclusive), order_revenue /
+    orders (completed orders), invoice_revenue / invoices (paid invoices)
+    and revenue. Past buckets come from the cache when present; the rest
+    are computed with one grouped query over the daily rollup.
+    """
+    today = timezone.localdate()
+    buckets = []
+    current = bucket_start(start, size)
+    while current <= end:
+        following = next_bucket(current, size)
+        buckets.append(_empty_bucket(current, following - timedelta(days=1)))
+        current = following
+        if len(buckets) > MAX_SERIES_BUCKETS:
+            raise ValueError(f'At most {MAX_SERIES_BUCKETS} buckets can be requested at once.')
+
+    cache = _series_cache()
+    generation = _series_generation()
+    keys = {bucket['period_start']: _series_key(generation, size, bucket['period_start']) for bucket in buckets}
+    cached = cache.get_many([keys[bucket['period_start']] for bucket in buckets if bucket['period_end'] < today])
+
+    missing = [bucket for bucket in buckets if keys[bucket['period_start']] not in cached and bucket['period_start'] <= today]
+    if missing:
+        by_start = {bucket['period_start']: bucket for bucket in missing}
+        revenue = Q(source='order', status=REVENUE_STATUS['order']) | Q(source='invoice', status=REVENUE_STATUS['invoice'])
+        rows = (
+            DailyRevenue.objects.using(using)
+            .filter(revenue, day__gte=missing[0]['period_start'], day__lte=missing[-1]['period_end'])
+            .annotate(bucket=SERIES_BUCKETS[size]('day'))
+            .values('bucket', 'source')
+            .annotate(total=Sum('total'), count=Sum('count'))
+            .order_by()
+        )
+        for row in rows:
+            bucket = by_start.get(row['bucket'])
+            if bucket is None:
+                continue  # already cached
+            prefix = 'order' if row['source'] == 'order' else 'invoice'
+            bucket[f'{prefix}_revenue'] = row['total'] or Decimal('0.00')
+            bucket[f'{prefix}s'] = row['count'] or 0
+        for bucket in missing:
+            bucket['revenue'] = bucket['order_revenue'] + bucket['invoice_revenue']
+        # Buckets that ended before today cannot gain new orders
+        cache.set_many({keys[bucket['period_start']]: bucket for bucket in missing if bucket['period_end'] < today}, None)
+
+    return [cached.get(keys[bucket['period_start']], bucket) for bucket in buckets]
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def previous_month(day):
+    """(first, last) day of the month before `day`'s month"""
+    last = month_start(day) - timedelta(days=1)
+    return month_start(last), last
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=Invoice)
+def _remember_bucket(sender, instance, raw=False, using=None, **kwargs):
+    # Read the stored row: the instance may carry stale or partial values
+    instance._rollup_previous = None
+    instance._rollup_previous_customer = None
+    if raw or instance.pk is None:
+        return
+    _, field = TRACKED[sender]
+    previous = sender.objects.using(using).filter(pk=instance.pk).values('date', 'status', field, 'customer_id').first()
+    if previous:
+        instance._rollup_previous = (
+            timezone.localdate(previous['date']), previous['status'], Decimal(str(previous[field] or 0)),
+        )
+        instance._rollup_previous_customer = previous['customer_id']
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Invoice)
+def _move_bucket(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    source, _ = TRACKED[sender]
+    previous = getattr(instance, '_rollup_previous', None)
+    current = _bucket(instance)
+    if previous == current:
+        return
+    if previous:
+        day, status, amount = previous
+        apply_delta(source, day, status, -amount, -1, using=using)
+    day, status, amount = current
+    apply_delta(source, day, status, amount, 1, using=using)
+    instance._rollup_previous = current
+
+
+@receiver(post_save, sender=Order)
+def _refresh_customer_on_save(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous_customer', None)
+    if previous and previous != instance.customer_id:
+        refresh_customer_stats(previous, using=using)
+    refresh_customer_stats(instance.customer_id, using=using)
+    instance._rollup_previous_customer = instance.customer_id
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Invoice)
+def _remove_bucket(sender, instance, using=None, **kwargs):
+    source, _ = TRACKED[sender]
+    day, status, amount = _bucket(instance)
+    apply_delta(source, day, status, -amount, -1, using=using)
+
+
+@receiver(post_delete, sender=Order)
+def _refresh_customer_on_delete(sender, instance, using=None, **kwargs):
+    refresh_customer_stats(instance.customer_id, using=using)
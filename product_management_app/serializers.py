@@ -1,6 +1,31 @@
 from rest_framework import serializers
+from django.db import models, transaction
+from django.db.models import prefetch_related_objects
+from django.core.files.storage import default_storage
 from website_management_app.models import Category
-from .models import SubCategory
+from .models import SubCategory, Customizer
+from .resolvers import get_resolver, normalize_subcategory_ids
+
+
+class TaxonomyListSerializer(serializers.ListSerializer):
+    """
+    Batch-loads the categories and subcategories referenced by a page before
+    the rows are serialized, so each row resolves them from the request's
+    CategoryResolver instead of querying on its own.
+    """
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        # One query for the whole page's customizer/subcategory links (no-op if already prefetched)
+        prefetch_related_objects([item for item in items if isinstance(item, Customizer)], 'sub_categories')
+        category_ids = set()
+        subcategory_ids = set()
+        for item in items:
+            category_ids.add(getattr(item, 'category_id', None))
+            if isinstance(item, Customizer):
+                subcategory_ids.update(sub.id for sub in item.sub_categories.all())
+        get_resolver(self.context).prime(category_ids=category_ids, subcategory_ids=subcategory_ids)
+        return super().to_representation(items)
+
 
 class SubCategorySerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
@@ -10,16 +35,16 @@ class SubCategorySerializer(serializers.ModelSerializer):
         model = SubCategory
         fields = ['id', 'category', 'name', 'show_in', 'password', 'have_password', 'created_at', 'updated_at']
         read_only_fields = ('id', 'have_password', 'created_at', 'updated_at')
+        list_serializer_class = TaxonomyListSerializer
     
     def to_representation(self, instance):
         """Override to return full Category object instead of just ID"""
         representation = super().to_representation(instance)
         # Replace category ID with full Category object
-        if instance.category:
-            from website_management_app.serializers import CategorySerializer as FullCategorySerializer
-            representation['category'] = FullCategorySerializer(instance.category).data
+        if instance.category_id:
+            representation['category'] = get_resolver(self.context).category(instance.category_id)
         return representation
-from .models import Shirt, ShirtCategory, ShirtSubCategory, MainShirtImage, ShirtImage, UserShirt, FavoriteShirt, Customizer, UserCustomizer, Pattern, Color, Font, Order, Invoice, RevenueReport, ProductSalesReport, CustomerAnalysisReport, GrowthTrendReport, ShirtDraft
+from .models import Shirt, ShirtCategory, ShirtSubCategory, MainShirtImage, ShirtImage, UserShirt, FavoriteShirt, Customizer, UserCustomizer, Pattern, Color, Font, Order, OrderItem, Invoice, RevenueReport, ProductSalesReport, CustomerAnalysisReport, GrowthTrendReport, ShirtDraft
 from website_management_app.models import Category
 from django.conf import settings
 
@@ -64,7 +89,8 @@ class ShirtImageSerializer(serializers.ModelSerializer):
 class SubCategoryInputField(serializers.Field):
     """
     Accepts sub_category as a list of SubCategory IDs (integers).
-    Validates IDs exist; stores as list of ints.
+    Validates IDs exist; the list is assigned to the many-to-many relation
+    named by `source`.
     """
     def to_internal_value(self, data):
         # Normalize to a list of integers
@@ -107,34 +133,21 @@ class SubCategoryInputField(serializers.Field):
                 return [cid]
         raise serializers.ValidationError("Sub category must be a list of IDs.")
 
+    def get_attribute(self, instance):
+        # Ids of the related subcategories; .all() reuses prefetched rows
+        value = super().get_attribute(instance)
+        if isinstance(value, models.manager.BaseManager):
+            return [sub.id for sub in value.all()]
+        return value
+
     def to_representation(self, value):
         """Return full SubCategory objects instead of just IDs"""
-        if value is None:
-            return []
-        
-        # Get list of subcategory IDs
-        subcategory_ids = []
-        if isinstance(value, list):
-            subcategory_ids = [int(item) if isinstance(item, str) and item.isdigit() else item for item in value if isinstance(item, (int, str)) and (isinstance(item, int) or item.isdigit())]
-        elif isinstance(value, (int, str)):
-            if isinstance(value, str) and value.isdigit():
-                subcategory_ids = [int(value)]
-            elif isinstance(value, int):
-                subcategory_ids = [value]
-        elif hasattr(value, 'id'):
-            subcategory_ids = [value.id]
-        else:
-            return []
-        
+        subcategory_ids = normalize_subcategory_ids(value)
         if not subcategory_ids:
             return []
         
-        # Fetch and serialize all SubCategory objects
-        try:
-            subcategories = SubCategory.objects.filter(id__in=subcategory_ids)
-            return SubCategorySerializer(subcategories, many=True).data
-        except Exception:
-            return []
+        # Resolved through the request's resolver (batch-loaded by TaxonomyListSerializer)
+        return get_resolver(self.context).subcategories(subcategory_ids)
 
 class CategoryInputField(serializers.Field):
     """
@@ -158,6 +171,14 @@ class CategoryInputField(serializers.Field):
                 raise serializers.ValidationError("Invalid category id")
         raise serializers.ValidationError("Category must be a valid integer id.")
     
+    def get_attribute(self, instance):
+        # Read the raw foreign key id so the Category is resolved through the
+        # resolver rather than lazily loaded once per row
+        attname = f'{self.source}_id'
+        if hasattr(instance, attname):
+            return getattr(instance, attname)
+        return super().get_attribute(instance)
+    
     def to_representation(self, value):
         """Return full Category object instead of just ID"""
         if value is None:
@@ -174,14 +195,7 @@ class CategoryInputField(serializers.Field):
         else:
             return None
         
-        # Fetch and serialize the Category object
-        try:
-            category = Category.objects.get(id=category_id)
-            # Use the CategorySerializer from website_management_app for full fields
-            from website_management_app.serializers import CategorySerializer as FullCategorySerializer
-            return FullCategorySerializer(category).data
-        except Category.DoesNotExist:
-            return None
+        return get_resolver(self.context).category(category_id)
 
 
 class ShirtDraftSerializer(serializers.ModelSerializer):
@@ -203,6 +217,19 @@ class ShirtDraftSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('id', 'created_at', 'updated_at')
 
+    def validate(self, attrs):
+        """Part ids must exist in the customizer's SVG part index"""
+        from django.core.exceptions import ValidationError as DjangoValidationError
+        from .svg_parts import validate_part_colors
+        customizer = attrs.get('customizer') or getattr(self.instance, 'customizer', None)
+        colors = attrs.get('svg_part_colors')
+        if customizer is not None and colors is not None:
+            try:
+                validate_part_colors(customizer, colors)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError({'svgPartColors': exc.messages})
+        return attrs
+
     def create(self, validated_data):
         return ShirtDraft.objects.create(**validated_data)
 
@@ -256,6 +283,7 @@ class ShirtSerializer(serializers.ModelSerializer):
             'updated_at'
         ]
         read_only_fields = ('id', 'created_at', 'updated_at')
+        list_serializer_class = TaxonomyListSerializer
         extra_kwargs = {
             'category': {'write_only': True},
             'sub_category': {'write_only': True},
@@ -361,8 +389,8 @@ class ShirtSerializer(serializers.ModelSerializer):
             # Create other images
             for image in other_images_upload:
                 ShirtImage.objects.create(shirt=shirt, image=image)
-        
-        return shirt
+
+            return shirt
         except IntegrityError as e:
             # Provide more helpful error message for foreign key constraint failures
             error_msg = str(e)
@@ -506,12 +534,12 @@ class UserShirtGETSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_is_favorite(self, obj):
+        # Use the favorite ids preloaded by the list view when available
+        favorite_ids = self.context.get('favorite_user_shirt_ids')
+        if favorite_ids is not None:
+            return obj.id in favorite_ids
         user = self.context.get('user')
-        shirt_obj = FavoriteShirt.objects.filter(user_shirt=obj, user=user).first()
-        if shirt_obj:
-            return True 
-        else:
-            return False
+        return FavoriteShirt.objects.filter(user_shirt=obj, user=user).exists()
         
 class ShirtListSerializer(serializers.ModelSerializer):
     user_shirts = serializers.SerializerMethodField()
@@ -539,17 +567,17 @@ class ShirtListSerializer(serializers.ModelSerializer):
         ]
     
     def get_is_favorite(self, obj):
+        # Use the favorite ids preloaded by the list view when available
+        favorite_ids = self.context.get('favorite_shirt_ids')
+        if favorite_ids is not None:
+            return obj.id in favorite_ids
         user = self.context.get('user')
-        shirt_obj = FavoriteShirt.objects.filter(shirt=obj, user=user).first()
-        if shirt_obj:
-            return True 
-        else:
-            return False
+        return FavoriteShirt.objects.filter(shirt=obj, user=user).exists()
     
     def get_user_shirts(self, obj):
-        user = self.context.get('user')
-        user_shirts = UserShirt.objects.filter(shirt=obj)
-        return UserShirtGETSerializer(user_shirts, many=True, context={'user':user}).data
+        # .all() reuses the prefetched user shirts when the queryset provides them
+        user_shirts = obj.usershirts_shirt.all()
+        return UserShirtGETSerializer(user_shirts, many=True, context=self.context).data
     
 
     
@@ -568,7 +596,9 @@ class FavoriteShirtSerializer(serializers.ModelSerializer):
 class CustomizerSerializer(serializers.ModelSerializer):
     """Serializer for Customizer"""
     category = CategoryInputField()
-    sub_category = SubCategoryInputField()
+    sub_category = SubCategoryInputField(source='sub_categories')
+    preview_sprite = serializers.SerializerMethodField()
+    svg_parts = serializers.SerializerMethodField()
     
     class Meta:
         model = Customizer
@@ -594,12 +624,79 @@ class CustomizerSerializer(serializers.ModelSerializer):
             'right_black_layer',
             'right_white_layer',
             'right_svg_layer',
+            'svg_parts',
+            'preview_sprite',
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'views', 'created_at', 'updated_at')
+        list_serializer_class = TaxonomyListSerializer
 
     # Password handling moved to Category API; no create override
+
+    def _media_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_preview_sprite(self, obj):
+        """Combined low-res preview of the four sides, with each side's offset"""
+        sprite = (obj.image_derivatives or {}).get('sprite')
+        if not sprite:
+            return None
+        return {
+            'url': self._media_url(sprite['path']),
+            'height': sprite['height'],
+            'frames': sprite['frames'],
+        }
+
+    def get_svg_parts(self, obj):
+        """Paintable parts per side: count and default fills, indexed by part number"""
+        return {
+            side: {'count': entry['count'], 'fills': entry['fills']}
+            for side, entry in (obj.svg_parts or {}).items()
+        }
+
+    def to_representation(self, instance):
+        """
+        SVG layers are served minified, with their data-part ids.
+
+        ?image_size=<width> swaps the layer URLs for the smallest derivative at
+        least that wide (the original when none is); ?image_format=webp picks
+        the WebP copies. WebP without a size gets the widest WebP copy, as
+        there is no WebP of the original.
+        """
+        representation = super().to_representation(instance)
+        for side, entry in (instance.svg_parts or {}).items():
+            field = f'{side}_svg_layer'
+            if entry.get('file') and entry.get('source') == getattr(instance, field).name:
+                representation[field] = self._media_url(entry['file'])
+
+        request = self.context.get('request')
+        if request is None:
+            return representation
+        variant = 'webp' if request.query_params.get('image_format') == 'webp' else 'src'
+        image_size = request.query_params.get('image_size')
+        if image_size is None and variant == 'webp':
+            wanted = None
+        else:
+            try:
+                wanted = int(image_size or '')
+            except ValueError:
+                return representation
+
+        layers = (instance.image_derivatives or {}).get('layers', {})
+        for field, layer in layers.items():
+            if field not in representation or layer.get('source') != getattr(instance, field).name:
+                continue
+            widths = sorted(int(width) for width in layer.get('sizes', {}))
+            if wanted is None:
+                chosen = widths[-1] if widths else None
+            else:
+                chosen = next((width for width in widths if width >= wanted), None)
+            if chosen is not None:
+                representation[field] = self._media_url(layer['sizes'][str(chosen)][variant])
+        return representation
     
 
 
@@ -804,10 +901,27 @@ class FontSerializer(serializers.ModelSerializer):
 
 
 
+class OrderItemSerializer(serializers.ModelSerializer):
+    """Serializer for one order line (a shirt or a customizer)"""
+    
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'shirt', 'customizer', 'quantity', 'unit_price']
+        read_only_fields = ('id',)
+    
+    def validate(self, attrs):
+        if bool(attrs.get('shirt')) == bool(attrs.get('customizer')):
+            raise serializers.ValidationError("Each item must reference either a shirt or a customizer.")
+        if attrs.get('quantity', 1) < 1:
+            raise serializers.ValidationError({"quantity": "Quantity must be at least 1"})
+        return attrs
+
+
 class OrderSerializer(serializers.ModelSerializer):
     """Serializer for Order"""
     customer_name = serializers.CharField(source='customer.username', read_only=True)
     customer_email = serializers.CharField(source='customer.email', read_only=True)
+    items = OrderItemSerializer(many=True, required=False)
     
     class Meta:
         model = Order
@@ -820,6 +934,7 @@ class OrderSerializer(serializers.ModelSerializer):
             'date',
             'total',
             'status',
+            'items',
             'created_at',
             'updated_at'
         ]
@@ -830,6 +945,23 @@ class OrderSerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("Total must be greater than 0")
         return value
+    
+    def create(self, validated_data):
+        items = validated_data.pop('items', [])
+        with transaction.atomic():
+            order = super().create(validated_data)
+            OrderItem.objects.bulk_create([OrderItem(order=order, **item) for item in items])
+        return order
+    
+    def update(self, instance, validated_data):
+        # A list of items replaces the order's lines; omitting it keeps them
+        items = validated_data.pop('items', None)
+        with transaction.atomic():
+            order = super().update(instance, validated_data)
+            if items is not None:
+                order.items.all().delete()
+                OrderItem.objects.bulk_create([OrderItem(order=order, **item) for item in items])
+        return order
 
 
 class InvoiceSerializer(serializers.ModelSerializer):
@@ -0,0 +1,194 @@
+"""
+Preprocessing of the Customizer SVG layers.
+
+On upload each side's SVG is parsed once:
+
+- minified (comments, metadata, editor-only markup and whitespace removed) and
+  stored next to the original as <name>.min.svg;
+- every paintable shape gets a stable part id, `data-part="<side>_<n>"`,
+  numbered in document order; these are the keys ShirtDraft.svg_part_colors
+  and UserCustomizer.customization_data use;
+- a compact part index is stored on Customizer.svg_parts:
+  {side: {'source', 'file', 'count', 'fills'}}.
+
+validate_part_colors() checks a color map against that index in O(parts).
+"""
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Customizer
+
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+SIDES = ('front', 'back', 'left', 'right')
+SHAPES = {'path', 'rect', 'circle', 'ellipse', 'polygon', 'polyline', 'line'}
+# Shapes inside these are templates/masks, not painted directly
+NON_RENDERED = {'defs', 'clipPath', 'mask', 'symbol', 'pattern', 'marker', 'linearGradient', 'radialGradient'}
+DROPPED = {'metadata', 'title', 'desc'}
+EDITOR_NAMESPACES = (
+    'http://www.inkscape.org/namespaces/inkscape',
+    'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+    'http://ns.adobe.com/',
+    'http://www.bohemiancoding.com/sketch/ns',
+)
+PART_KEY = re.compile(r'^(front|back|left|right)_(\d+)$')
+MAX_COLOR_LENGTH = 64
+
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+
+class SVGProcessingError(ValueError):
+    pass
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _is_editor_markup(name):
+    return name.startswith('{') and name[1:].startswith(EDITOR_NAMESPACES)
+
+
+def _significant(text):
+    """Drop whitespace-only text (indentation); keep real text content as-is"""
+    return text if text and text.strip() else None
+
+
+def _fill(element):
+    for declaration in element.get('style', '').split(';'):
+        prop, _, value = declaration.partition(':')
+        if prop.strip() == 'fill':
+            return value.strip()
+    return element.get('fill')
+
+
+def process_svg(content, side):
+    """Minify an SVG and number its paintable parts; returns (svg text, fills)"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if '<!ENTITY' in content:
+        raise SVGProcessingError('SVG files with entity declarations are not accepted.')
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError as exc:
+        raise SVGProcessingError(f'Invalid SVG: {exc}')
+    if _local(root.tag) != 'svg':
+        raise SVGProcessingError('Not an SVG document.')
+
+    fills = []
+
+    def walk(element, rendered):
+        for child in list(element):
+            name = _local(child.tag)
+            if not isinstance(child.tag, str) or name in DROPPED or _is_editor_markup(child.tag):
+                element.remove(child)
+                continue
+            for attribute in [key for key in child.attrib if _is_editor_markup(key)]:
+                del child.attrib[attribute]
+            child.text = _significant(child.text)
+            child.tail = _significant(child.tail)
+            if rendered and name in SHAPES:
+                child.set('data-part', f'{side}_{len(fills)}')
+                fills.append(_fill(child))
+            walk(child, rendered and name not in NON_RENDERED)
+
+    for attribute in [key for key in root.attrib if _is_editor_markup(key)]:
+        del root.attrib[attribute]
+    root.text = _significant(root.text)
+    walk(root, True)
+    return ET.tostring(root, encoding='unicode', short_empty_elements=True), fills
+
+
+def svg_sources(customizer):
+    """{side: stored file name} for the SVG layers a customizer has"""
+    return {
+        side: getattr(customizer, f'{side}_svg_layer').name
+        for side in SIDES
+        if getattr(customizer, f'{side}_svg_layer')
+    }
+
+
+def build_svg_index(sources, index=None, force=False):
+    """Bring a part index up to date with `sources` ({side: file name})"""
+    index = index or {}
+    result = {}
+    for side, source in sources.items():
+        previous = index.get(side)
+        if previous and previous.get('source') == source and not force:
+            result[side] = previous
+            continue
+        try:
+            with default_storage.open(source, 'rb') as handle:
+                svg, fills = process_svg(handle.read(), side)
+        except (OSError, UnicodeDecodeError, SVGProcessingError):
+            # Missing or unparseable upload: keep serving the original, without parts
+            result[side] = {'source': source, 'file': None, 'count': 0, 'fills': []}
+            continue
+        name = f'{os.path.splitext(source)[0]}.min.svg'
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        name = default_storage.save(name, ContentFile(svg.encode('utf-8')))
+        result[side] = {'source': source, 'file': name, 'count': len(fills), 'fills': fills}
+
+    for side, previous in index.items():
+        current = result.get(side)
+        if previous.get('file') and (not current or current.get('file') != previous['file']):
+            if default_storage.exists(previous['file']):
+                default_storage.delete(previous['file'])
+    return result
+
+
+def refresh_svg_index(customizer, force=False):
+    """Reprocess changed SVG layers of one customizer and store the index"""
+    sources = svg_sources(customizer)
+    index = customizer.svg_parts or {}
+    current = set(index) == set(sources) and all(index[side].get('source') == name for side, name in sources.items())
+    if current and not force:
+        return index
+    index = build_svg_index(sources, index, force=force)
+    Customizer.objects.filter(pk=customizer.pk).update(svg_parts=index, updated_at=timezone.now())
+    customizer.svg_parts = index
+    return index
+
+
+def validate_part_colors(customizer, colors):
+    """
+    Check a {'front_0': '#ff0000', ...} map against the customizer's part
+    index. Customizers that were never indexed are not checked.
+    Raises django.core.exceptions.ValidationError.
+    """
+    if not isinstance(colors, dict):
+        raise ValidationError('Part colors must be an object mapping part ids to colors.')
+    index = customizer.svg_parts or {}
+    if not index:
+        return
+    errors = []
+    for key, color in colors.items():
+        match = PART_KEY.match(key) if isinstance(key, str) else None
+        if match is None:
+            errors.append(f'"{key}" is not a part id.')
+            continue
+        side, number = match.group(1), int(match.group(2))
+        if number >= index.get(side, {}).get('count', 0):
+            errors.append(f'"{key}" does not exist in the {side} layer.')
+        elif not isinstance(color, str) or len(color) > MAX_COLOR_LENGTH:
+            errors.append(f'"{key}" must be a color string.')
+    if errors:
+        raise ValidationError(errors)
+
+
+@receiver(post_save, sender=Customizer)
+def _index_svgs_on_upload(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_svg_index(instance)
@@ -1,3 +1,1429 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+import io
+import shutil
+import tempfile
+import json
+import os
+import time
+from unittest import SkipTest, mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from django.utils.http import http_date
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from prosix.query_plans import QueryPlanAssertions
+from website_management_app.models import Category
+from .models import Shirt, MainShirtImage, ShirtImage, UserShirt, FavoriteShirt, Customizer, SubCategory, Order, OrderItem, Invoice, DailyRevenue, CustomerOrderStats, RevenueReport, GrowthTrendReport, Color, ShirtDraft, UserCustomizer
+
+
+class ShirtCatalogQueryCountTests(APITestCase):
+    """The shirt catalog endpoints must not issue per-row queries."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.other = User.objects.create_user(username='designer', password='secret123')
+        self.category = Category.objects.create(category_name='Jerseys')
+        self.client.force_authenticate(self.user)
+
+    def _add_shirts(self, count):
+        start = Shirt.objects.count()
+        for i in range(start, start + count):
+            shirt = Shirt.objects.create(title=f'Shirt {i}', category=self.category, price=10, sku=f'SKU-{i}')
+            MainShirtImage.objects.create(shirt=shirt, image=f'shirts/main_images/{i}.png')
+            ShirtImage.objects.create(shirt=shirt, image=f'shirts/other_images/{i}.png')
+            user_shirt = UserShirt.objects.create(user=self.other, shirt=shirt, colors=[{'color': '#000000'}])
+            if i % 2 == 0:
+                FavoriteShirt.objects.create(user=self.user, shirt=shirt)
+                FavoriteShirt.objects.create(user=self.user, user_shirt=user_shirt)
+
+    def _count_queries(self, url):
+        # Measure cold requests; category lookups are otherwise served from cache
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_user_shirt_list_query_count_is_constant(self):
+        self._add_shirts(3)
+        small, _ = self._count_queries('/api/usershirts/?limit=50')
+        self._add_shirts(12)
+        large, response = self._count_queries('/api/usershirts/?limit=50')
+
+        self.assertEqual(small, large)
+        data = response.data['response']['data']
+        self.assertEqual(data['count'], 15)
+        self.assertEqual(len(data['results']), 15)
+
+    def test_user_shirt_list_flags_favorites(self):
+        self._add_shirts(2)
+        response = self.client.get('/api/usershirts/')
+        results = {row['title']: row for row in response.data['response']['data']['results']}
+
+        self.assertTrue(results['Shirt 0']['is_favorite'])
+        self.assertTrue(results['Shirt 0']['user_shirts'][0]['is_favorite'])
+        self.assertFalse(results['Shirt 1']['is_favorite'])
+        self.assertFalse(results['Shirt 1']['user_shirts'][0]['is_favorite'])
+        self.assertEqual(len(results['Shirt 0']['main_images']), 1)
+
+    def test_user_shirt_list_is_paginated(self):
+        self._add_shirts(5)
+        response = self.client.get('/api/usershirts/?limit=2&offset=2')
+        data = response.data['response']['data']
+
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['results']), 2)
+
+    def test_shirt_list_query_count_is_constant(self):
+        self._add_shirts(3)
+        small, _ = self._count_queries('/api/shirts/?limit=50')
+        self._add_shirts(12)
+        large, _ = self._count_queries('/api/shirts/?limit=50')
+
+        self.assertEqual(small, large)
+
+
+class TaxonomyResolutionTests(APITestCase):
+    """Category and SubCategory references are batch-loaded and cached."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.client.force_authenticate(self.user)
+
+    def _add_customizers(self, count):
+        start = Customizer.objects.count()
+        for i in range(start, start + count):
+            category = Category.objects.create(category_name=f'Category {i}')
+            subs = [SubCategory.objects.create(category=category, name=f'Sub {i}-{j}') for j in range(2)]
+            customizer = Customizer.objects.create(title=f'Customizer {i}', category=category)
+            customizer.sub_categories.set(subs)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_customizer_list_query_count_is_constant(self):
+        self._add_customizers(2)
+        cache.clear()
+        small, _ = self._count_queries('/api/customizers/?limit=50')
+        self._add_customizers(8)
+        cache.clear()
+        large, response = self._count_queries('/api/customizers/?limit=50')
+
+        self.assertEqual(small, large)
+        rows = {row['title']: row for row in response.data['response']['data']['results']}
+        row = rows['Customizer 0']
+        self.assertEqual(row['category']['category_name'], 'Category 0')
+        self.assertEqual([sub['name'] for sub in row['sub_category']], ['Sub 0-0', 'Sub 0-1'])
+        self.assertEqual(row['sub_category'][0]['category']['category_name'], 'Category 0')
+
+    def test_second_request_is_served_from_cache(self):
+        self._add_customizers(3)
+        cold, first = self._count_queries('/api/customizers/?limit=50')
+        warm, second = self._count_queries('/api/customizers/?limit=50')
+
+        self.assertLess(warm, cold)
+        self.assertEqual(first.data, second.data)
+
+    def test_saving_category_invalidates_cache(self):
+        self._add_customizers(1)
+        self.client.get('/api/customizers/')
+        category = Category.objects.get()
+        category.category_name = 'Renamed'
+        category.save()
+
+        row = self.client.get('/api/customizers/').data['response']['data']['results'][0]
+        self.assertEqual(row['category']['category_name'], 'Renamed')
+        self.assertEqual(row['sub_category'][0]['category']['category_name'], 'Renamed')
+
+    def test_change_in_another_worker(self):
+        from django.core.cache import caches
+        from .resolvers import VERSION_KEY
+        self._add_customizers(1)
+        self.client.get('/api/customizers/')
+        # Another worker renamed it: only the shared stamp changes here, this worker's cache is untouched
+        Category.objects.update(category_name='Renamed elsewhere')
+        caches['shared'].set(VERSION_KEY, 'bumped-by-another-worker', None)
+
+        row = self.client.get('/api/customizers/').data['response']['data']['results'][0]
+        self.assertEqual(row['category']['category_name'], 'Renamed elsewhere')
+
+    def test_subcategory_list_resolves_categories(self):
+        self._add_customizers(2)
+        response = self.client.get('/api/subcategories/')
+        data = response.data
+        results = {row['name']: row for row in data['results']}
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results['Sub 0-1']['category']['category_name'], 'Category 0')
+        self.assertEqual(results['Sub 1-0']['category']['category_name'], 'Category 1')
+
+
+class CustomizerSubCategoryTests(APITestCase):
+    """Customizer subcategories are a relation but keep the id-list API."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(category_name='Jerseys')
+        self.home = SubCategory.objects.create(category=self.category, name='Home')
+        self.away = SubCategory.objects.create(category=self.category, name='Away')
+
+    def test_create_accepts_id_list(self):
+        response = self.client.post('/api/customizers/', {
+            'title': 'Classic',
+            'category': self.category.id,
+            'sub_category': [self.away.id, str(self.home.id)],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        data = response.data['response']['data']
+        self.assertEqual([sub['name'] for sub in data['sub_category']], ['Home', 'Away'])
+        self.assertEqual(set(Customizer.objects.get().sub_categories.values_list('id', flat=True)), {self.home.id, self.away.id})
+
+    def test_create_rejects_unknown_ids(self):
+        response = self.client.post('/api/customizers/', {
+            'title': 'Classic',
+            'category': self.category.id,
+            'sub_category': [self.home.id, 9999],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_replaces_subcategories(self):
+        customizer = Customizer.objects.create(title='Classic', category=self.category)
+        customizer.sub_categories.set([self.home])
+
+        response = self.client.patch(f'/api/customizers/{customizer.id}/', {'sub_category': [self.away.id]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(customizer.sub_categories.values_list('id', flat=True)), [self.away.id])
+
+    def test_browse_by_subcategory(self):
+        home_kit = Customizer.objects.create(title='Home kit', category=self.category)
+        home_kit.sub_categories.set([self.home])
+        away_kit = Customizer.objects.create(title='Away kit', category=self.category)
+        away_kit.sub_categories.set([self.away])
+
+        response = self.client.get(f'/api/customizers/category/{self.category.id}/?subcategory_id={self.home.id}')
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+
+        self.assertEqual([row['title'] for row in results], ['Home kit'])
+
+
+class OrderPaginationTests(APITestCase):
+    """Order lists are bounded and support keyset pagination."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.client.force_authenticate(self.user)
+
+    def _add_orders(self, count):
+        start = Order.objects.count()
+        Order.objects.bulk_create([
+            Order(order_id=f'ORD-{i}', customer=self.user, total=10)
+            for i in range(start, start + count)
+        ])
+        # Spread timestamps but keep ties, so the id tie-breaker is exercised
+        base = timezone.now()
+        for order in Order.objects.filter(id__gt=start):
+            Order.objects.filter(pk=order.pk).update(created_at=base - timedelta(minutes=order.pk // 3))
+
+    def _data(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data['response']['data']
+
+    def test_limit_is_capped(self):
+        self._add_orders(120)
+        data = self._data('/api/orders/?limit=100000')
+
+        self.assertEqual(data['count'], 120)
+        self.assertEqual(len(data['results']), 100)
+
+    def test_keyset_walks_every_row_once(self):
+        self._add_orders(25)
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        seen = []
+        url = '/api/orders/?pagination=cursor&limit=7'
+        pages = []
+        while url:
+            data = self._data(url)
+            pages.append(data)
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 4)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertEqual(pages[0]['count'], 25)
+
+        back = self._data(pages[2]['previous'])
+        self.assertEqual([row['id'] for row in back['results']], [row['id'] for row in pages[1]['results']])
+
+    def test_keyset_page_cost_does_not_depend_on_depth(self):
+        self._add_orders(60)
+        first = self._data('/api/orders/?pagination=cursor&limit=5')
+        with CaptureQueriesContext(connection) as shallow:
+            second = self._data(first['next'])
+        url = second['next']
+        for _ in range(8):
+            url = self._data(url)['next']
+        with CaptureQueriesContext(connection) as deep:
+            self._data(url)
+
+        self.assertEqual(len(shallow), len(deep))
+        self.assertFalse(any('COUNT' in query['sql'] for query in deep.captured_queries))
+        self.assertFalse(any('OFFSET' in query['sql'] for query in deep.captured_queries))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/orders/?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_counts_follow_writes_in_other_workers(self):
+        from prosix.pagination import _generation_key
+        self._add_orders(3)
+        self.assertEqual(self._data('/api/orders/')['count'], 3)
+
+        # bulk_create sends no signals: the cached count stays until the
+        # generation changes, e.g. after a save in another worker
+        self._add_orders(2)
+        self.assertEqual(self._data('/api/orders/')['count'], 3)
+        caches['shared'].set(_generation_key(Order), 'bumped-by-another-worker', None)
+        self.assertEqual(self._data('/api/orders/')['count'], 5)
+
+    def test_only_listed_models_retire_counts(self):
+        from prosix.pagination import _generation_key
+        shared = caches['shared']
+        shared.delete(_generation_key(DailyRevenue))
+        order_generation = shared.get(_generation_key(Order))
+        DailyRevenue.objects.create(source='order', status='completed', day=timezone.localdate())
+        self.assertIsNone(shared.get(_generation_key(DailyRevenue)))
+        self.assertEqual(shared.get(_generation_key(Order)), order_generation)
+
+        Order.objects.create(order_id='ORD-new', customer=self.user, total=10)
+        self.assertNotEqual(shared.get(_generation_key(Order)), order_generation)
+
+
+class DailyRevenueRollupTests(APITestCase):
+    """Report generators read the daily rollup kept in step with orders and invoices."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        # Noon on the last day of the previous month
+        last_month_end = self.today.replace(day=1) - timedelta(days=1)
+        self.last_month = timezone.make_aware(timezone.datetime.combine(last_month_end, timezone.datetime.min.time())) + timedelta(hours=12)
+
+    def _buckets(self):
+        return {
+            (row.source, row.status, row.day): (row.total, row.count)
+            for row in DailyRevenue.objects.exclude(count=0)
+        }
+
+    def _report(self, name):
+        response = self.client.get(f'/api/reports/{name}/generate/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['response']['data']
+
+    def test_rollup_follows_saves_and_deletes(self):
+        order = Order.objects.create(customer=self.user, total='40.00', status='pending')
+        Invoice.objects.create(customer=self.user, amount='15.50', status='paid', due_date=self.today)
+        order.status = 'completed'
+        order.total = '45.00'
+        order.save()
+        moved = Order.objects.create(customer=self.user, total='10.00', status='completed')
+        moved.date = self.last_month
+        moved.save()
+        Order.objects.create(customer=self.user, total='5.00', status='completed').delete()
+
+        self.assertEqual(self._buckets(), {
+            ('order', 'completed', self.today): (Decimal('45.00'), 1),
+            ('order', 'completed', self.last_month.date()): (Decimal('10.00'), 1),
+            ('invoice', 'paid', self.today): (Decimal('15.50'), 1),
+        })
+
+        # The rebuild command recomputes the same buckets from scratch
+        before = self._buckets()
+        DailyRevenue.objects.all().delete()
+        call_command('rebuild_revenue_rollup', stdout=io.StringIO())
+        self.assertEqual(self._buckets(), before)
+
+    def test_reports_use_the_rollup(self):
+        Order.objects.create(customer=self.user, total='100.00', status='completed')
+        Order.objects.create(customer=self.user, total='999.00', status='cancelled')
+        Invoice.objects.create(customer=self.user, amount='50.00', status='paid', due_date=self.today)
+        Invoice.objects.create(customer=self.user, amount='70.00', status='pending', due_date=self.today)
+        previous = Order.objects.create(customer=self.user, total='75.00', status='completed')
+        previous.date = self.last_month
+        previous.save()
+
+        revenue = self._report('revenue')
+        self.assertEqual(revenue['this_month_revenue'], 150.0)
+        self.assertEqual(revenue['last_month_revenue'], 75.0)
+        self.assertEqual(revenue['growth_percentage'], 100.0)
+        self.assertEqual(revenue['total_orders'], 1)
+
+        # The last day of the previous month counts towards it
+        growth = self._report('growth-trend')
+        self.assertEqual(growth['monthly_growth'], 100.0)
+
+    def test_report_cost_does_not_depend_on_order_count(self):
+        def queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self._report('revenue')
+                self._report('growth-trend')
+            return [query['sql'] for query in ctx.captured_queries]
+
+        Order.objects.create(customer=self.user, total='10.00', status='completed')
+        few = queries()
+        for i in range(30):
+            Order.objects.create(order_id=f'ORD-{i}', customer=self.user, total='10.00', status='completed')
+        many = queries()
+
+        self.assertEqual(len(few), len(many))
+        self.assertFalse(any('product_management_app_order' in sql for sql in many))
+
+
+class RevenueSeriesTests(APITestCase):
+    """Bucketed revenue series, with closed buckets served from the cache."""
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        self.this_month = self.today.replace(day=1)
+        self.last_month = (self.this_month - timedelta(days=1)).replace(day=1)
+
+    def _order(self, order_id, total, day=None, status='completed'):
+        order = Order.objects.create(order_id=order_id, customer=self.user, total=total, status=status)
+        if day:
+            order.date = timezone.make_aware(timezone.datetime.combine(day, timezone.datetime.min.time())) + timedelta(hours=12)
+            order.save()
+        return order
+
+    def _series(self, **params):
+        response = self.client.get('/api/reports/revenue/series/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['response']['data']['series']
+
+    def _rollup_queries(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            series = self._series(**params)
+        return series, [query['sql'] for query in ctx.captured_queries if 'dailyrevenue' in query['sql']]
+
+    def test_monthly_buckets(self):
+        self._order('ORD-1', '20.00', day=self.last_month)
+        self._order('ORD-2', '5.00', day=self.last_month, status='cancelled')
+        self._order('ORD-3', '30.00')
+        Invoice.objects.create(customer=self.user, amount='12.50', status='paid', due_date=self.today)
+
+        series = self._series(start=self.last_month.isoformat(), end=self.today.isoformat(), bucket='month')
+
+        self.assertEqual([row['period_start'] for row in series], [self.last_month, self.this_month])
+        self.assertEqual(series[0]['period_end'], self.this_month - timedelta(days=1))
+        self.assertEqual((series[0]['revenue'], series[0]['orders']), (20.0, 1))
+        self.assertEqual((series[1]['revenue'], series[1]['order_revenue'], series[1]['invoices']), (42.5, 30.0, 1))
+
+    def test_day_week_and_quarter_buckets_cover_the_range(self):
+        self._order('ORD-1', '10.00', day=self.last_month)
+        start, end = self.last_month, self.today
+
+        days = self._series(start=start.isoformat(), end=end.isoformat(), bucket='day')
+        weeks = self._series(start=start.isoformat(), end=end.isoformat(), bucket='week')
+        quarters = self._series(start=start.isoformat(), end=end.isoformat(), bucket='quarter')
+
+        self.assertEqual(len(days), (end - start).days + 1)
+        self.assertTrue(all(row['period_start'].weekday() == 0 for row in weeks))
+        self.assertIn(quarters[0]['period_start'].month, (1, 4, 7, 10))
+        for series in (days, weeks, quarters):
+            self.assertEqual(sum(row['revenue'] for row in series), 10.0)
+
+    def test_closed_buckets_are_cached_until_a_past_day_changes(self):
+        old = self._order('ORD-1', '20.00', day=self.last_month)
+        params = {'start': self.last_month.isoformat(), 'end': self.today.isoformat(), 'bucket': 'month'}
+        self._series(**params)
+
+        # Only the current month is recomputed
+        series, queries = self._rollup_queries(**params)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(series[0]['revenue'], 20.0)
+        series, queries = self._rollup_queries(start=self.last_month.isoformat(), end=(self.this_month - timedelta(days=1)).isoformat(), bucket='month')
+        self.assertEqual(queries, [])
+
+        old.total = '35.00'
+        old.save()
+        series, _ = self._rollup_queries(**params)
+        self.assertEqual(series[0]['revenue'], 35.0)
+
+    def test_invalid_parameters(self):
+        for params in ({'bucket': 'year'}, {'start': '2024-02-30'}, {'start': '2025-02-01', 'end': '2025-01-01'}):
+            response = self.client.get('/api/reports/revenue/series/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.data['success'])
+
+
+class ReportSnapshotTests(APITestCase):
+    """Stored report snapshots are idempotent per day and served when fresh enough."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.client.force_authenticate(self.user)
+
+    def _materialize(self):
+        call_command('materialize_reports', stdout=io.StringIO())
+
+    def test_materializing_twice_keeps_one_row_per_day(self):
+        Order.objects.create(order_id='ORD-1', customer=self.user, total='20.00', status='completed')
+        self._materialize()
+        Order.objects.create(order_id='ORD-2', customer=self.user, total='30.00', status='completed')
+        self._materialize()
+
+        self.assertEqual(RevenueReport.objects.count(), 1)
+        self.assertEqual(RevenueReport.objects.get().this_month_revenue, Decimal('50.00'))
+        self.assertEqual(RevenueReport.objects.get().total_orders, 2)
+        self.assertEqual(GrowthTrendReport.objects.count(), 1)
+        for name in ('product-sales', 'customer-analysis'):
+            self.assertEqual(len(self.client.get(f'/api/reports/{name}/').data['response']['data']['results']), 1)
+
+    def test_fresh_snapshot_is_one_read(self):
+        Order.objects.create(order_id='ORD-1', customer=self.user, total='20.00', status='completed')
+        self._materialize()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/reports/revenue/generate/', {'max_age': 600})
+        data = response.data['response']['data']
+
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(data['snapshot_id'], RevenueReport.objects.get().id)
+        self.assertEqual(data['this_month_revenue'], 20.0)
+
+    def test_stale_snapshot_is_recomputed(self):
+        self._materialize()
+        RevenueReport.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+        Order.objects.create(order_id='ORD-1', customer=self.user, total='20.00', status='completed')
+
+        data = self.client.get('/api/reports/revenue/generate/', {'max_age': 3600}).data['response']['data']
+
+        self.assertNotIn('snapshot_id', data)
+        self.assertEqual(data['this_month_revenue'], 20.0)
+
+    def test_reports_posted_through_the_api_are_not_snapshots(self):
+        self._materialize()
+        response = self.client.post('/api/reports/revenue/', {'this_month_revenue': '999.00', 'total_orders': 7})
+        self.assertEqual(response.status_code, 201)
+
+        data = self.client.get('/api/reports/revenue/generate/', {'max_age': 600}).data['response']['data']
+
+        self.assertEqual(data['snapshot_id'], RevenueReport.objects.get(materialized=True).id)
+        self.assertEqual(data['this_month_revenue'], 0.0)
+
+    def test_one_snapshot_per_day(self):
+        from django.db import IntegrityError, transaction
+        from .reports import materialize_reports
+        # Stored earlier today by another run (cron or the --loop worker)
+        RevenueReport.objects.create(materialized=True, total_orders=1)
+        materialize_reports()
+
+        self.assertEqual(RevenueReport.objects.filter(materialized=True).count(), 1)
+        self.assertEqual(RevenueReport.objects.get().total_orders, 0)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RevenueReport.objects.create(materialized=True)
+
+    def test_invalid_max_age(self):
+        response = self.client.get('/api/reports/growth-trend/generate/', {'max_age': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_product_sales_names_the_top_product(self):
+        category = Category.objects.create(category_name='Jerseys')
+        customizer = Customizer.objects.create(title='Team Kit', category=category)
+        shirt = Shirt.objects.create(title='Plain Tee', category=category, sku='TEE-1')
+        order = Order.objects.create(order_id='ORD-1', customer=self.user, total='70.00', status='completed')
+        OrderItem.objects.create(order=order, customizer=customizer, quantity=2, unit_price='30.00')
+        OrderItem.objects.create(order=order, shirt=shirt, quantity=1, unit_price='10.00')
+
+        data = self.client.get('/api/reports/product-sales/generate/').data['response']['data']
+
+        self.assertEqual(
+            (data['top_product_name'], data['top_product_units_sold'], data['top_product_revenue'], data['top_category']),
+            ('Team Kit', 2, 60.0, 'Jerseys'),
+        )
+
+
+class TopProductsTests(APITestCase):
+    """Order lines rank products by revenue or units in one grouped query."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.client.force_authenticate(self.user)
+        self.jerseys = Category.objects.create(category_name='Jerseys')
+        self.hoodies = Category.objects.create(category_name='Hoodies')
+        self.kit = Customizer.objects.create(title='Team Kit', category=self.jerseys)
+        self.tee = Shirt.objects.create(title='Plain Tee', category=self.jerseys, sku='TEE-1')
+        self.hoodie = Shirt.objects.create(title='Zip Hoodie', category=self.hoodies, sku='HOOD-1')
+
+    def _order(self, lines, status='completed'):
+        response = self.client.post('/api/orders/', {
+            'customer': self.user.id,
+            'total': '1.00',
+            'status': status,
+            'items': lines,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Order.objects.get(id=response.data['response']['data']['id'])
+
+    def _top(self, **params):
+        response = self.client.get('/api/reports/top-products/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['name'], row['units'], row['revenue']) for row in response.data['response']['data']]
+
+    def test_orders_are_created_with_their_items(self):
+        order = self._order([{'customizer': self.kit.id, 'quantity': 2, 'unit_price': '40.00'}])
+
+        self.assertEqual(list(order.items.values_list('customizer_id', 'quantity')), [(self.kit.id, 2)])
+        data = self.client.get(f'/api/orders/{order.id}/').data['response']['data']
+        self.assertEqual(data['items'][0]['unit_price'], '40.00')
+
+        response = self.client.post('/api/orders/', {
+            'customer': self.user.id, 'total': '1.00', 'items': [{'shirt': self.tee.id, 'customizer': self.kit.id, 'unit_price': '1.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_ranking_by_revenue_units_category_and_period(self):
+        self._order([
+            {'customizer': self.kit.id, 'quantity': 1, 'unit_price': '90.00'},
+            {'shirt': self.tee.id, 'quantity': 5, 'unit_price': '10.00'},
+        ])
+        self._order([{'shirt': self.hoodie.id, 'quantity': 2, 'unit_price': '35.00'}])
+        self._order([{'shirt': self.tee.id, 'quantity': 50, 'unit_price': '10.00'}], status='pending')
+        old = self._order([{'shirt': self.hoodie.id, 'quantity': 10, 'unit_price': '35.00'}])
+        old.date = timezone.now() - timedelta(days=400)
+        old.save()
+
+        today = timezone.localdate().isoformat()
+        recent = (timezone.localdate() - timedelta(days=30)).isoformat()
+        self.assertEqual(self._top(start=recent, end=today), [
+            ('Team Kit', 1, 90.0), ('Zip Hoodie', 2, 70.0), ('Plain Tee', 5, 50.0),
+        ])
+        self.assertEqual(self._top(start=recent, by='units', limit=1), [('Plain Tee', 5, 50.0)])
+        self.assertEqual(self._top(category=self.hoodies.id), [('Zip Hoodie', 12, 420.0)])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._top(by='units', category=self.jerseys.id)
+        self.assertEqual(len(ctx), 1)
+
+    def test_invalid_parameters(self):
+        for params in ({'by': 'margin'}, {'start': 'yesterday'}, {'limit': 0}):
+            self.assertEqual(self.client.get('/api/reports/top-products/', params).status_code, 400)
+
+
+class CustomerAnalysisReportTests(APITestCase):
+    """Customer analysis comes from per-customer aggregates with a fixed query count."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='secret123')
+        self.client.force_authenticate(self.admin)
+        self.last_month = timezone.now().replace(day=1) - timedelta(days=3)
+
+    def _customer(self, name, totals, first_order_last_month=False):
+        user = User.objects.create_user(username=name, password='secret123')
+        for index, total in enumerate(totals):
+            order = Order.objects.create(order_id=f'ORD-{name}-{index}', customer=user, total=total, status='completed')
+            if first_order_last_month and index == 0:
+                order.date = self.last_month
+                order.save()
+        return user
+
+    def _report(self):
+        response = self.client.get('/api/reports/customer-analysis/generate/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['response']['data']
+
+    def test_counts_and_average(self):
+        returning = self._customer('returning', ['30.00', '50.00'], first_order_last_month=True)
+        self._customer('fresh', ['40.00'])
+        Order.objects.create(order_id='ORD-returning-pending', customer=returning, total='500.00', status='pending')
+
+        data = self._report()
+
+        self.assertEqual(data['total_customers'], 2)
+        self.assertEqual(data['new_customers'], 1)
+        self.assertEqual(data['returning_customers'], 1)
+        self.assertEqual(data['average_order_value'], 40.0)
+
+        stats = CustomerOrderStats.objects.get(customer=returning)
+        self.assertEqual((stats.order_count, stats.completed_count, stats.total_spent), (3, 2, Decimal('80.00')))
+        self.assertEqual(stats.first_order_at, self.last_month)
+
+    def test_deleting_orders_updates_the_aggregates(self):
+        customer = self._customer('leaving', ['10.00', '20.00'], first_order_last_month=True)
+        customer.orders.order_by('date').first().delete()
+
+        stats = CustomerOrderStats.objects.get(customer=customer)
+        self.assertEqual((stats.order_count, stats.total_spent), (1, Decimal('20.00')))
+        self.assertGreaterEqual(stats.first_order_at, timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+
+        customer.orders.all().delete()
+        self.assertFalse(CustomerOrderStats.objects.filter(customer=customer).exists())
+
+        # The rebuild command agrees with the incremental rows
+        self._customer('kept', ['15.00', '25.00'])
+        before = list(CustomerOrderStats.objects.order_by('pk').values())
+        CustomerOrderStats.objects.all().delete()
+        call_command('rebuild_customer_stats', stdout=io.StringIO())
+        self.assertEqual(list(CustomerOrderStats.objects.order_by('pk').values()), before)
+
+    def test_query_count_does_not_depend_on_customers(self):
+        self._customer('first', ['10.00'])
+        with CaptureQueriesContext(connection) as few:
+            self._report()
+        for index in range(10):
+            self._customer(f'customer{index}', ['10.00', '12.00'])
+        with CaptureQueriesContext(connection) as many:
+            self._report()
+
+        self.assertEqual(len(few), len(many))
+
+
+class ConditionalGetTests(APITestCase):
+    """Catalog lists answer revalidation requests with 304 Not Modified."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='designer', password='secret123')
+        self.client.force_authenticate(self.user)
+        Color.objects.create(color_name='Black', color_code='#000000')
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        first = self.client.get('/api/colors/')
+        self.assertEqual(first.status_code, 200)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get('/api/colors/', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertFalse(any('"color_name"' in query['sql'] for query in ctx.captured_queries))
+
+    def test_lists_are_not_revalidated_by_date(self):
+        # Deleting a row other than the newest leaves MAX(updated_at) alone,
+        # so lists send no Last-Modified and ignore If-Modified-Since
+        older = Color.objects.get()
+        Color.objects.create(color_name='White', color_code='#FFFFFF')
+        first = self.client.get('/api/colors/')
+        self.assertNotIn('Last-Modified', first)
+
+        older.delete()
+        second = self.client.get('/api/colors/', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['response']['data']['count'], 1)
+
+    def test_changes_invalidate_etag(self):
+        etag = self.client.get('/api/colors/')['ETag']
+        Color.objects.create(color_name='White', color_code='#FFFFFF')
+        response = self.client.get('/api/colors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['response']['data']['count'], 2)
+
+        etag = response['ETag']
+        Color.objects.filter(color_name='White').delete()
+        response = self.client.get('/api/colors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_query_string(self):
+        etag = self.client.get('/api/colors/?limit=1')['ETag']
+        response = self.client.get('/api/colors/?limit=2', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_customizer_etag_follows_nested_subcategories(self):
+        category = Category.objects.create(category_name='Jerseys')
+        sub = SubCategory.objects.create(category=category, name='Home')
+        customizer = Customizer.objects.create(title='Classic', category=category)
+        customizer.sub_categories.set([sub])
+        etag = self.client.get('/api/customizers/')['ETag']
+
+        sub.name = 'Away'
+        sub.save()
+        response = self.client.get('/api/customizers/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['response']['data']['results'][0]['sub_category'][0]['name'], 'Away')
+
+
+def make_png(name, width=1200, height=600, color=(200, 30, 30, 255)):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class CustomizerDerivativeTests(APITestCase):
+    """Layer uploads get resized/WebP copies and a preview sprite."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='designer', password='secret123')
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        from . import view_counts
+        view_counts.discard()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _create(self, **layers):
+        return Customizer.objects.create(title='Classic', **layers)
+
+    def test_upload_generates_derivatives_and_sprite(self):
+        customizer = self._create(front_black_layer=make_png('front.png'), back_white_layer=make_png('back.png', 600, 300))
+        manifest = Customizer.objects.get(pk=customizer.pk).image_derivatives
+
+        front = manifest['layers']['front_black_layer']
+        self.assertEqual(sorted(front['sizes'], key=int), ['160', '480', '1024'])
+        # Never upscaled: the 600px wide back layer only gets the smaller widths
+        self.assertEqual(sorted(manifest['layers']['back_white_layer']['sizes'], key=int), ['160', '480'])
+        with default_storage.open(front['sizes']['480']['webp']) as handle:
+            self.assertEqual(Image.open(handle).size, (480, 240))
+        self.assertTrue(front['sizes']['480']['src'].startswith('customizer/front/'))
+
+        sprite = manifest['sprite']
+        self.assertEqual([frame['side'] for frame in sprite['frames']], ['front', 'back'])
+        with default_storage.open(sprite['path']) as handle:
+            self.assertEqual(Image.open(handle).size, (384, 96))
+
+    def test_size_selector(self):
+        customizer = self._create(front_black_layer=make_png('front.png'))
+
+        default = self.client.get(f'/api/customizers/{customizer.id}/').data['response']['data']
+        small = self.client.get(f'/api/customizers/{customizer.id}/?image_size=300').data['response']['data']
+        webp = self.client.get(f'/api/customizers/{customizer.id}/?image_size=300&image_format=webp').data['response']['data']
+        huge = self.client.get(f'/api/customizers/{customizer.id}/?image_size=5000').data['response']['data']
+        webp_only = self.client.get(f'/api/customizers/{customizer.id}/?image_format=webp').data['response']['data']
+
+        self.assertTrue(default['front_black_layer'].endswith('/front.png'))
+        self.assertTrue(small['front_black_layer'].endswith('/front__w480.png'))
+        self.assertTrue(webp['front_black_layer'].endswith('/front__w480.webp'))
+        self.assertEqual(huge['front_black_layer'], default['front_black_layer'])
+        self.assertTrue(webp_only['front_black_layer'].endswith('/front__w1024.webp'))
+        self.assertIsNone(small['back_black_layer'])
+        self.assertTrue(default['preview_sprite']['url'].startswith('http://testserver/media/customizer/sprites/'))
+
+    def test_replacing_a_layer_rebuilds_it(self):
+        customizer = self._create(front_black_layer=make_png('front.png'))
+        old = Customizer.objects.get(pk=customizer.pk).image_derivatives['layers']['front_black_layer']
+
+        customizer.front_black_layer = make_png('front_v2.png', 800, 400)
+        customizer.save()
+        new = Customizer.objects.get(pk=customizer.pk).image_derivatives['layers']['front_black_layer']
+
+        self.assertEqual(sorted(new['sizes'], key=int), ['160', '480'])
+        self.assertFalse(default_storage.exists(old['sizes']['1024']['webp']))
+
+
+class CustomizerDerivativeBackfillTests(TransactionTestCase):
+    """
+    The backfill command closes the database connections before forking its
+    workers, which a test transaction would not survive.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _create(self, **layers):
+        return Customizer.objects.create(title='Classic', **layers)
+
+    def test_backfill_command_uses_worker_processes(self):
+        with override_settings(CUSTOMIZER_DERIVATIVES_ON_SAVE=False):
+            first = self._create(front_black_layer=make_png('a.png'))
+            second = self._create(left_white_layer=make_png('b.png'))
+        self.assertEqual(Customizer.objects.get(pk=first.pk).image_derivatives, {})
+
+        out = io.StringIO()
+        call_command('build_customizer_derivatives', workers=2, stdout=out)
+
+        self.assertIn('Built derivatives for 2 customizer(s).', out.getvalue())
+        self.assertIn('1024', Customizer.objects.get(pk=first.pk).image_derivatives['layers']['front_black_layer']['sizes'])
+        self.assertEqual(Customizer.objects.get(pk=second.pk).image_derivatives['sprite']['frames'][0]['side'], 'left')
+
+        out = io.StringIO()
+        call_command('build_customizer_derivatives', workers=2, stdout=out)
+        self.assertIn('up to date', out.getvalue())
+
+
+SHIRT_SVG = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- Created with Inkscape -->
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="100" height="100" inkscape:version="1.2">
+  <metadata>editor data</metadata>
+  <defs>
+    <clipPath id="clip"><rect width="100" height="100"/></clipPath>
+  </defs>
+  <g inkscape:label="Layer 1">
+    <path d="M0 0h50v50H0z" fill="#ffffff"/>
+    <path d="M50 0h50v50H50z" style="stroke:none;fill:#000000"/>
+  </g>
+  <circle cx="50" cy="75" r="20"/>
+</svg>
+"""
+
+
+class CustomizerSVGPartTests(APITestCase):
+    """SVG layers are minified and indexed once; part colors are validated against the index."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='designer', password='secret123')
+        self.client.force_authenticate(self.user)
+        self.customizer = Customizer.objects.create(
+            title='Classic',
+            front_svg_layer=SimpleUploadedFile('front.svg', SHIRT_SVG, content_type='image/svg+xml'),
+        )
+        self.customizer.refresh_from_db()
+
+    def tearDown(self):
+        from . import view_counts
+        view_counts.discard()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_upload_builds_part_index_and_minified_file(self):
+        front = self.customizer.svg_parts['front']
+        self.assertEqual(front['count'], 3)
+        self.assertEqual(front['fills'], ['#ffffff', '#000000', None])
+
+        with default_storage.open(front['file']) as handle:
+            svg = handle.read().decode()
+        self.assertIn('data-part="front_2"', svg)
+        self.assertNotIn('inkscape', svg)
+        self.assertNotIn('metadata', svg)
+        self.assertNotIn('\n', svg)
+        self.assertLess(len(svg), len(SHIRT_SVG))
+
+    def test_serializer_serves_minified_svg_and_index(self):
+        data = self.client.get(f'/api/customizers/{self.customizer.id}/').data['response']['data']
+
+        self.assertTrue(data['front_svg_layer'].endswith('/front.min.svg'))
+        self.assertEqual(data['svg_parts'], {'front': {'count': 3, 'fills': ['#ffffff', '#000000', None]}})
+
+    def test_draft_part_colors_are_validated(self):
+        ok = self.client.post('/api/drafts/', {
+            'customizer': self.customizer.id,
+            'svgPartColors': {'front_0': '#FF0000', 'front_2': '#00FF00'},
+        }, format='json')
+        self.assertEqual(ok.status_code, 201)
+
+        bad = self.client.put(f'/api/drafts/{self.customizer.id}/', {
+            'customizer': self.customizer.id,
+            'svgPartColors': {'front_3': '#FF0000', 'back_0': '#FF0000', 'sleeve': '#FF0000'},
+        }, format='json')
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(len(bad.data['svgPartColors']), 3)
+        self.assertEqual(ShirtDraft.objects.get().svg_part_colors, {'front_0': '#FF0000', 'front_2': '#00FF00'})
+
+    def test_user_customization_data_is_validated(self):
+        customization = UserCustomizer(user=self.user, customizer=self.customizer, customization_data={'svgPartColors': {'front_1': '#123456'}})
+        customization.full_clean()
+
+        customization.customization_data = {'svgPartColors': {'front_9': '#123456'}}
+        with self.assertRaises(ValidationError):
+            customization.full_clean()
+
+    def test_index_command_backfills(self):
+        Customizer.objects.filter(pk=self.customizer.pk).update(svg_parts={})
+        out = io.StringIO()
+        call_command('index_customizer_svgs', stdout=out)
+
+        self.assertIn(f'Customizer {self.customizer.id}: front: 3', out.getvalue())
+        self.assertEqual(Customizer.objects.get(pk=self.customizer.pk).svg_parts['front']['count'], 3)
+
+
+PREVIEW_SVG = b"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">
+  <rect x="0" y="0" width="50" height="100"/>
+  <g transform="translate(50 0)">
+    <path d="M0 0 H50 V100 Q25 110 0 100 Z M20 40 h10 v10 h-10 z"/>
+  </g>
+</svg>
+"""
+
+
+class CustomizerPreviewTests(APITestCase):
+    """Previews composite the layers with recolored parts and are cached on disk."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.preview_dir = os.path.join(self.media_root, 'previews')
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, PREVIEW_CACHE_DIR=self.preview_dir)
+        self.settings_override.enable()
+        self.customizer = Customizer.objects.create(
+            title='Classic',
+            front_white_layer=make_png('white.png', 200, 200, (255, 255, 255, 255)),
+            front_black_layer=make_png('black.png', 200, 200, (0, 0, 0, 0)),
+            front_svg_layer=SimpleUploadedFile('front.svg', PREVIEW_SVG, content_type='image/svg+xml'),
+        )
+        self.customizer.refresh_from_db()
+
+    def tearDown(self):
+        from . import view_counts
+        view_counts.discard()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _preview(self, colors, **params):
+        query = {'view': 'front', 'width': 100, 'colors': json.dumps(colors), **params}
+        return self.client.get(f'/api/customizers/{self.customizer.id}/preview/', query)
+
+    def _image(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        return Image.open(io.BytesIO(response.content)).convert('RGBA')
+
+    def test_parts_are_recolored(self):
+        image = self._image(self._preview({'front_0': '#FF0000', 'front_1': 'blue'}))
+
+        self.assertEqual(image.size, (100, 100))
+        self.assertEqual(image.getpixel((25, 50)), (255, 0, 0, 255))
+        self.assertEqual(image.getpixel((90, 20)), (0, 0, 255, 255))
+        # The inner square of the second part is a hole
+        self.assertEqual(image.getpixel((75, 45)), (255, 255, 255, 255))
+
+    def test_uses_draft_colors_by_default(self):
+        ShirtDraft.objects.create(customizer=self.customizer, svg_part_colors={'front_1': '#00ff00'})
+        self.client.force_authenticate(User.objects.create_user(username='designer', password='secret123'))
+        response = self.client.get(f'/api/customizers/{self.customizer.id}/preview/?width=100')
+        image = self._image(response)
+
+        self.assertEqual(image.getpixel((25, 50)), (255, 255, 255, 255))
+        self.assertEqual(image.getpixel((90, 20)), (0, 255, 0, 255))
+        self.assertEqual(response['Cache-Control'], 'private, max-age=300')
+
+    def test_anonymous_callers_never_get_draft_colors(self):
+        ShirtDraft.objects.create(customizer=self.customizer, svg_part_colors={'front_1': '#00ff00'})
+        response = self.client.get(f'/api/customizers/{self.customizer.id}/preview/?width=100')
+        image = self._image(response)
+
+        self.assertEqual(image.getpixel((90, 20)), (255, 255, 255, 255))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+
+    def test_inactive_customizer_is_hidden_from_anonymous_callers(self):
+        Customizer.objects.filter(pk=self.customizer.pk).update(is_active=False)
+
+        response = self._preview({'front_0': '#ff0000'})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.data['success'])
+
+        self.client.force_authenticate(User.objects.create_user(username='designer', password='secret123'))
+        self._image(self._preview({'front_0': '#ff0000'}))
+
+    def test_equivalent_color_maps_share_a_cache_entry(self):
+        from . import previews
+        with mock.patch.object(previews, 'render_preview', wraps=previews.render_preview) as render:
+            first = self._preview({'front_0': '#F00'})
+            second = self._preview({'front_0': 'red'})
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(len(os.listdir(self.preview_dir)), 1)
+
+        not_modified = self.client.get(
+            f'/api/customizers/{self.customizer.id}/preview/',
+            {'width': 100, 'colors': json.dumps({'front_0': '#ff0000'})},
+            HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_invalid_parts_are_rejected(self):
+        response = self._preview({'front_7': '#ff0000'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self._preview({'front_0': 'not-a-color'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_least_recently_used_previews_are_evicted(self):
+        from . import previews
+        for color in ('#110000', '#220000', '#330000'):
+            self._preview({'front_0': color})
+        paths = sorted((os.path.join(self.preview_dir, name) for name in os.listdir(self.preview_dir)), key=os.path.getmtime)
+        for offset, path in enumerate(paths):
+            os.utime(path, (1000 + offset, 1000 + offset))
+        # Reading the oldest entry makes it the most recently used
+        oldest_key = os.path.basename(paths[0])[:-4]
+        previews.read_cached(oldest_key)
+
+        previews.evict(limit=os.path.getsize(paths[0]) + os.path.getsize(paths[2]))
+
+        self.assertEqual(sorted(os.listdir(self.preview_dir)), sorted(os.path.basename(p) for p in (paths[0], paths[2])))
+
+
+    def test_directory_is_scanned_only_past_the_limit(self):
+        from . import previews
+        self._preview({'front_0': '#110000'})
+        size = os.path.getsize(os.path.join(self.preview_dir, os.listdir(self.preview_dir)[0]))
+
+        with override_settings(PREVIEW_CACHE_MAX_BYTES=size * 2 + size // 2):
+            with mock.patch.object(previews, 'evict', wraps=previews.evict) as evict:
+                self._preview({'front_0': '#220000'})
+                self.assertEqual(evict.call_count, 0)
+                self._preview({'front_0': '#330000'})
+                self.assertEqual(evict.call_count, 1)
+
+        self.assertEqual(len(os.listdir(self.preview_dir)), 2)
+
+    def test_missing_layer_file(self):
+        layer = self.customizer.image_derivatives['layers']['front_white_layer']
+        for name in [self.customizer.front_white_layer.name] + [size['src'] for size in layer['sizes'].values()]:
+            default_storage.delete(name)
+        response = self._preview({'front_0': '#ff0000'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.data['success'])
+
+    @override_settings(PREVIEW_ANON_RATE='2/min')
+    def test_anonymous_callers_are_throttled(self):
+        for color in ('#110000', '#220000'):
+            self.assertEqual(self._preview({'front_0': color}).status_code, 200)
+        self.assertEqual(self._preview({'front_0': '#330000'}).status_code, 429)
+
+        self.client.force_authenticate(User.objects.create_user(username='designer', password='secret123'))
+        self.assertEqual(self._preview({'front_0': '#330000'}).status_code, 200)
+
+
+@override_settings(CUSTOMIZER_VIEW_FLUSH_INTERVAL=3600, CUSTOMIZER_VIEW_FLUSH_SIZE=1000)
+class CustomizerViewCountTests(APITestCase):
+    """Customizer detail views are counted in memory and written in batches."""
+
+    def setUp(self):
+        from . import view_counts
+        self.view_counts = view_counts
+        view_counts.discard()
+        self.addCleanup(view_counts.discard)
+        cache.clear()
+        self.user = User.objects.create_user(username='viewer', password='secret123')
+        self.client.force_authenticate(self.user)
+        self.kit = Customizer.objects.create(title='Kit')
+        self.hoodie = Customizer.objects.create(title='Hoodie')
+
+    def _view(self, customizer, times=1):
+        for _ in range(times):
+            self.assertEqual(self.client.get(f'/api/customizers/{customizer.id}/').status_code, 200)
+
+    def test_retrieve_does_not_write(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self._view(self.kit, 3)
+
+        self.assertFalse(any(query['sql'].startswith('UPDATE') for query in ctx.captured_queries))
+        self.assertEqual(self.view_counts.pending(), {self.kit.id: 3})
+        self.kit.refresh_from_db()
+        self.assertEqual(self.kit.views, 0)
+
+    def test_flush_batches_updates(self):
+        self._view(self.kit, 2)
+        self._view(self.hoodie, 2)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.view_counts.flush(), 4)
+
+        updates = [query['sql'] for query in ctx.captured_queries if 'product_management_app_customizer' in query['sql'] and query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(dict(Customizer.objects.values_list('title', 'views')), {'Kit': 2, 'Hoodie': 2})
+        self.assertEqual(self.view_counts.pending(), {})
+
+        stats = self.client.get('/api/customizers/statistics/').data['response']['data']
+        self.assertEqual(stats['total_views'], 4)
+        self.assertEqual(self.client.get('/api/dashboard/').data['response']['data']['customizer']['total_views'], 4)
+
+    def test_flush_runs_in_the_background(self):
+        self._view(self.kit, 1)
+        self.assertTrue(self.view_counts._worker.is_alive())
+
+    def test_pending_limit_wakes_the_flush_thread(self):
+        with override_settings(CUSTOMIZER_VIEW_FLUSH_SIZE=3), mock.patch.object(self.view_counts, 'wake') as wake:
+            self._view(self.kit, 2)
+            wake.assert_not_called()
+            self._view(self.kit, 1)
+
+        wake.assert_called_once_with()
+        # The request itself never writes
+        self.kit.refresh_from_db()
+        self.assertEqual(self.kit.views, 0)
+
+    def test_failed_flush_keeps_the_counts(self):
+        from django.db import OperationalError
+        self._view(self.kit, 2)
+        with mock.patch.object(self.view_counts.Customizer.objects, 'filter', side_effect=OperationalError('database is locked')):
+            with self.assertLogs('product_management_app.view_counts', 'WARNING'):
+                self.assertEqual(self.view_counts.flush(), 0)
+
+        self.assertEqual(self.view_counts.pending(), {self.kit.id: 2})
+        self.assertEqual(self.view_counts.flush(), 2)
+
+    def test_views_are_not_writable(self):
+        self._view(self.kit, 1)
+        self.view_counts.flush()
+        self.client.patch(f'/api/customizers/{self.kit.id}/', {'views': 500}, format='json')
+
+        self.kit.refresh_from_db()
+        self.assertEqual(self.kit.views, 1)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_customizer_views', iterations=3, stdout=out)
+
+        self.assertIn('buffered', out.getvalue())
+        self.kit.refresh_from_db()
+        self.assertEqual(self.kit.views, 3 + 1 + 3 + 1)
+
+
+class OrderIdAllocatorTests(APITestCase):
+    """Order and invoice numbers come from per-day sequences reserved in blocks (ids.py)."""
+
+    def setUp(self):
+        from .ids import forget_blocks
+        forget_blocks()
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+
+    def _number(self, value):
+        return int(value.rsplit('-', 1)[1])
+
+    def test_format_and_sequence(self):
+        first = Order.objects.create(customer=self.user, total=10)
+        second = Order.objects.create(customer=self.user, total=10)
+
+        today = timezone.localdate().strftime('%Y%m%d')
+        self.assertRegex(first.order_id, rf'^ORD-{today}-\d{{6}}$')
+        self.assertEqual(self._number(second.order_id), self._number(first.order_id) + 1)
+
+    def test_invoices_have_their_own_sequence(self):
+        order = Order.objects.create(customer=self.user, total=10)
+        invoice = Invoice.objects.create(customer=self.user, amount=10, due_date=timezone.localdate())
+
+        self.assertTrue(invoice.invoice_id.startswith('INV-'))
+        self.assertEqual(self._number(invoice.invoice_id), self._number(order.order_id))
+
+    @override_settings(ORDER_ID_BLOCK_SIZE=5)
+    def test_one_reservation_per_block(self):
+        from .models import IdSequence
+        with CaptureQueriesContext(connection) as ctx:
+            orders = [Order.objects.create(customer=self.user, total=10) for _ in range(10)]
+
+        reservations = [q for q in ctx.captured_queries if 'idsequence' in q['sql'].lower() and q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(reservations), 2)
+        self.assertEqual(len({order.order_id for order in orders}), 10)
+        self.assertEqual(IdSequence.objects.get(prefix='ORD').next_value, 11)
+
+    def test_rolled_back_block_is_not_reused(self):
+        from django.db import transaction
+        try:
+            with transaction.atomic():
+                Order.objects.create(customer=self.user, total=10)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with CaptureQueriesContext(connection) as ctx:
+            order = Order.objects.create(customer=self.user, total=10)
+
+        # The reservation was rolled back with the order: the block must be
+        # reserved again rather than handed out from memory
+        self.assertTrue(any('idsequence' in q['sql'].lower() for q in ctx.captured_queries))
+        self.assertEqual(self._number(order.order_id), 1)
+
+    def test_block_is_dropped_after_rollback_in_a_new_transaction(self):
+        from django.db import transaction
+        try:
+            with transaction.atomic():
+                Order.objects.create(customer=self.user, total=10)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with transaction.atomic():
+            first = Order.objects.create(customer=self.user, total=10)
+            # Reserved again in this transaction, then reused within it
+            with CaptureQueriesContext(connection) as ctx:
+                second = Order.objects.create(customer=self.user, total=10)
+
+        self.assertEqual(self._number(first.order_id), 1)
+        self.assertEqual(self._number(second.order_id), 2)
+        self.assertFalse(any('idsequence' in q['sql'].lower() for q in ctx.captured_queries))
+
+    def test_stress_command(self):
+        out = io.StringIO()
+        call_command('stress_order_ids', orders=120, processes=1, batch=50, stdout=out)
+
+        self.assertIn('No collisions', out.getvalue())
+        self.assertIn('120 stored, 120 distinct IDs', out.getvalue())
+        self.assertFalse(User.objects.filter(username='order-id-stress-test').exists())
+
+
+@override_settings(ORDER_ID_BLOCK_SIZE=20)
+class OrderIdStressTests(TransactionTestCase):
+    """Forked processes allocating order numbers at the same time never collide (stress_order_ids)."""
+
+    def setUp(self):
+        from .ids import forget_blocks
+        forget_blocks()
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Forked processes cannot share an in-memory SQLite database')
+
+    def test_processes_interleave_by_block(self):
+        out = io.StringIO()
+        call_command('stress_order_ids', orders=2000, processes=2, batch=20, keep=True, stdout=out)
+
+        self.assertIn('2000 orders from 2 processes', out.getvalue())
+        self.assertIn('2000 stored, 2000 distinct IDs', out.getvalue())
+        self.assertIn('interleaved blocks', out.getvalue())
+        numbers = [int(value.rsplit('-', 1)[1]) for value in Order.objects.order_by('id').values_list('order_id', flat=True)]
+        self.assertEqual(sorted(numbers), list(range(1, 2001)))
+        # Each bulk insert is one whole block of one process
+        for start in range(0, len(numbers), 20):
+            run = numbers[start:start + 20]
+            self.assertEqual(run[0] % 20, 1)
+            self.assertEqual(run, list(range(run[0], run[0] + 20)))
+
+
+class QueryPlanTests(QueryPlanAssertions, APITestCase):
+    """Hot queries must be answered through an index, not a table scan (see prosix/query_plans.py)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='secret123')
+        self.category = Category.objects.create(category_name='Jerseys')
+        self.shirt = Shirt.objects.create(title='Home', category=self.category, price=10, sku='SKU-1')
+        for i in range(20):
+            order = Order.objects.create(
+                order_id=f'ORD-{i}', customer=self.user, total=10,
+                status='completed' if i % 2 else 'pending',
+            )
+            OrderItem.objects.create(order=order, shirt=self.shirt, quantity=1, unit_price=10)
+        FavoriteShirt.objects.create(user=self.user, shirt=self.shirt)
+        for i in range(20):
+            Invoice.objects.create(
+                invoice_id=f'INV-{i}', customer=self.user, amount=10,
+                status='paid' if i % 2 else 'pending', due_date=timezone.localdate(),
+            )
+
+    def test_completed_orders_in_range(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertIndexed(Order.objects.filter(status='completed', date__gte=since))
+        self.assertIndexed(OrderItem.objects.filter(order__status='completed', order__date__gte=since).values('shirt_id'))
+
+    def test_customer_orders(self):
+        self.assertIndexed(Order.objects.filter(customer=self.user))
+
+    def test_favorite_lookups(self):
+        self.assertIndexed(FavoriteShirt.objects.filter(user=self.user, shirt=self.shirt))
+        self.assertIndexed(FavoriteShirt.objects.filter(user=self.user, user_shirt_id=1))
+        self.assertIndexed(FavoriteShirt.objects.filter(user=self.user).values_list('shirt_id', 'user_shirt_id'))
+
+    def test_export_by_status(self):
+        from prosix.query_plans import explain
+        from .views import InvoiceExportAPIView, OrderExportAPIView
+
+        today = timezone.localdate()
+        for view, status_filter in ((OrderExportAPIView, 'completed'), (InvoiceExportAPIView, 'paid')):
+            queryset = view().export_queryset(today - timedelta(days=30), today, status_filter)
+            queryset = queryset.values_list(*view.columns.values())
+            self.assertIndexed(queryset)
+            if connection.vendor == 'sqlite':
+                self.assertNotIn('TEMP B-TREE', explain(queryset))
+
+    def test_databases_without_a_plan_parser_are_skipped(self):
+        with mock.patch.dict('prosix.query_plans._SCAN_PATTERNS', clear=True), self.assertRaises(SkipTest):
+            self.assertIndexed(Order.objects.filter(customer=self.user))
+
+    def test_rollup_buckets(self):
+        today = timezone.localdate()
+        self.assertIndexed(DailyRevenue.objects.filter(source='order', status='completed', day=today))
+        self.assertIndexed(DailyRevenue.objects.filter(source='order', status='completed', day__gte=today))
+
+
+class ExportTests(APITestCase):
+    """Orders and invoices stream as CSV/NDJSON from a single query."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='secret123', email='buyer@example.com')
+        self.client.force_authenticate(self.user)
+        for i, order_status in enumerate(['pending', 'completed', 'completed']):
+            Order.objects.create(order_id=f'ORD-{i}', customer=self.user, total=10 + i, status=order_status)
+        Invoice.objects.create(invoice_id='INV-1', customer=self.user, amount=5, due_date=timezone.localdate())
+
+    def _content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response = self.client.get('/api/orders/export/')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="orders-', response['Content-Disposition'])
+        lines = self._content(response).splitlines()
+        self.assertEqual(lines[0], 'order_id,date,status,total,customer,customer_name,customer_email,created_at,updated_at')
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith('ORD-0,'))
+        self.assertIn(',pending,10.00,', lines[1])
+        self.assertIn('buyer,buyer@example.com', lines[1])
+
+    def test_ndjson_with_filters(self):
+        today = timezone.localdate().isoformat()
+        response = self.client.get(f'/api/orders/export/?export_format=ndjson&status=completed&start={today}&end={today}')
+
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([row['order_id'] for row in rows], ['ORD-1', 'ORD-2'])
+        self.assertEqual(rows[0]['total'], '11.00')
+        self.assertEqual(rows[0]['customer_email'], 'buyer@example.com')
+
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        response = self.client.get(f'/api/orders/export/?export_format=ndjson&end={yesterday}')
+        self.assertEqual(self._content(response), '')
+
+    def test_single_query(self):
+        response = self.client.get('/api/invoices/export/?export_format=ndjson')
+        with CaptureQueriesContext(connection) as ctx:
+            content = self._content(response)
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(json.loads(content)['invoice_id'], 'INV-1')
+
+    def test_invalid_params(self):
+        for query in ('export_format=xml', 'status=shipped', 'start=2026-13-01', 'start=2026-02-01&end=2026-01-01'):
+            response = self.client.get(f'/api/orders/export/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertFalse(response.data['success'])
@@ -0,0 +1,14 @@
+from django.conf import settings
+from rest_framework.throttling import AnonRateThrottle
+
+
+class PreviewThrottle(AnonRateThrottle):
+    """
+    Anonymous preview requests per IP (PREVIEW_ANON_RATE); every cache miss
+    renders a PNG, so unauthenticated callers must not be able to loop over
+    color maps. Counted in the default cache, i.e. per worker.
+    """
+    scope = 'preview'
+
+    def get_rate(self):
+        return getattr(settings, 'PREVIEW_ANON_RATE', '60/min')
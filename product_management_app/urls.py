@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import FavoriteShirtAPIView, ShirtListCreateView, ShirtRetrieveUpdateDestroyView, ShirtCategoryListCreateView, ShirtCategoryRetrieveUpdateDestroyView, ShirtSubCategoryListCreateView, ShirtSubCategoryRetrieveUpdateDestroyView, UserShirtCreateAPIView, UserShirtListAPIView, CustomizerListCreateView, CustomizerRetrieveUpdateDestroyView, CustomizerStatisticsAPIView, PatternListCreateView, PatternRetrieveUpdateDestroyView, ColorListCreateView, ColorRetrieveUpdateDestroyView, FontListCreateView, FontRetrieveUpdateDestroyView, OrderListCreateView, OrderRetrieveUpdateDestroyView, InvoiceListCreateView, InvoiceRetrieveDestroyView, RevenueReportListCreateView, RevenueReportRetrieveUpdateDestroyView, ProductSalesReportListCreateView, ProductSalesReportRetrieveUpdateDestroyView, CustomerAnalysisReportListCreateView, CustomerAnalysisReportRetrieveUpdateDestroyView, GrowthTrendReportListCreateView, GrowthTrendReportRetrieveUpdateDestroyView, GenerateRevenueReportAPIView, GenerateProductSalesReportAPIView, GenerateCustomerAnalysisReportAPIView, GenerateGrowthTrendReportAPIView, ShirtDraftViewSet, SubCategoryListCreateView, SubCategoryRetrieveUpdateDestroyView, SubCategoryPasswordVerifyView, CustomizerByCategoryListView
+from .views import FavoriteShirtAPIView, ShirtListCreateView, ShirtRetrieveUpdateDestroyView, ShirtCategoryListCreateView, ShirtCategoryRetrieveUpdateDestroyView, ShirtSubCategoryListCreateView, ShirtSubCategoryRetrieveUpdateDestroyView, UserShirtCreateAPIView, UserShirtListAPIView, CustomizerListCreateView, CustomizerRetrieveUpdateDestroyView, CustomizerStatisticsAPIView, PatternListCreateView, PatternRetrieveUpdateDestroyView, ColorListCreateView, ColorRetrieveUpdateDestroyView, FontListCreateView, FontRetrieveUpdateDestroyView, OrderListCreateView, OrderRetrieveUpdateDestroyView, OrderExportAPIView, InvoiceListCreateView, InvoiceRetrieveDestroyView, InvoiceExportAPIView, RevenueReportListCreateView, RevenueReportRetrieveUpdateDestroyView, ProductSalesReportListCreateView, ProductSalesReportRetrieveUpdateDestroyView, CustomerAnalysisReportListCreateView, CustomerAnalysisReportRetrieveUpdateDestroyView, GrowthTrendReportListCreateView, GrowthTrendReportRetrieveUpdateDestroyView, GenerateRevenueReportAPIView, RevenueSeriesAPIView, GenerateProductSalesReportAPIView, TopProductsAPIView, GenerateCustomerAnalysisReportAPIView, GenerateGrowthTrendReportAPIView, ShirtDraftViewSet, SubCategoryListCreateView, SubCategoryRetrieveUpdateDestroyView, SubCategoryPasswordVerifyView, CustomizerByCategoryListView, CustomizerPreviewAPIView
 
 urlpatterns = [
     
@@ -17,6 +17,7 @@ urlpatterns = [
     
     path('customizers/', CustomizerListCreateView.as_view()),
     path('customizers/<int:id>/', CustomizerRetrieveUpdateDestroyView.as_view()),
+    path('customizers/<int:id>/preview/', CustomizerPreviewAPIView.as_view()),
     path('customizers/statistics/', CustomizerStatisticsAPIView.as_view()),
     path('customizers/category/<int:category_id>/', CustomizerByCategoryListView.as_view()),
     
@@ -31,17 +32,21 @@ urlpatterns = [
     
     path('orders/', OrderListCreateView.as_view()),
     path('orders/<int:id>/', OrderRetrieveUpdateDestroyView.as_view()),
+    path('orders/export/', OrderExportAPIView.as_view()),
     
     path('invoices/', InvoiceListCreateView.as_view()),
     path('invoices/<int:id>/', InvoiceRetrieveDestroyView.as_view()),
+    path('invoices/export/', InvoiceExportAPIView.as_view()),
     
     path('reports/revenue/', RevenueReportListCreateView.as_view()),
     path('reports/revenue/<int:id>/', RevenueReportRetrieveUpdateDestroyView.as_view()),
     path('reports/revenue/generate/', GenerateRevenueReportAPIView.as_view()),
+    path('reports/revenue/series/', RevenueSeriesAPIView.as_view()),
     
     path('reports/product-sales/', ProductSalesReportListCreateView.as_view()),
     path('reports/product-sales/<int:id>/', ProductSalesReportRetrieveUpdateDestroyView.as_view()),
     path('reports/product-sales/generate/', GenerateProductSalesReportAPIView.as_view()),
+    path('reports/top-products/', TopProductsAPIView.as_view()),
     
     path('reports/customer-analysis/', CustomerAnalysisReportListCreateView.as_view()),
     path('reports/customer-analysis/<int:id>/', CustomerAnalysisReportRetrieveUpdateDestroyView.as_view()),
@@ -0,0 +1,133 @@
+"""
+Write-behind counting of Customizer.views.
+
+retrieve() calls record(), which only bumps a per-process counter; it never
+writes. The counts are written as batched `views = views + n` UPDATEs (one
+per distinct n) by flush(), which runs in one background thread per process
+(started by the first record()):
+
+- every CUSTOMIZER_VIEW_FLUSH_INTERVAL seconds,
+- as soon as CUSTOMIZER_VIEW_FLUSH_SIZE views are pending,
+- and when the process exits normally (atexit).
+
+A failed flush (e.g. a locked database) is logged and its counts are kept
+for the next one. A worker that is killed loses at most the views recorded
+since its last flush: one interval's worth, and never more than the size
+limit.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+
+from .models import Customizer
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = Counter()
+
+
+def flush_interval():
+    return getattr(settings, 'CUSTOMIZER_VIEW_FLUSH_INTERVAL', 10)
+
+
+def flush_size():
+    return getattr(settings, 'CUSTOMIZER_VIEW_FLUSH_SIZE', 1000)
+
+
+def pending():
+    """Views recorded in this process and not yet written, {customizer id: n}"""
+    with _lock:
+        return dict(_pending)
+
+
+def record(customizer_id):
+    """Count one view; writes happen later, in batches, in the background"""
+    with _lock:
+        _pending[customizer_id] += 1
+        full = sum(_pending.values()) >= flush_size()
+    _ensure_worker()
+    if full:
+        wake()
+
+
+def flush():
+    """Write the pending views; returns how many were written (0 when the write failed)"""
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+
+    by_increment = defaultdict(list)
+    for customizer_id, count in batch.items():
+        by_increment[count].append(customizer_id)
+    from website_management_app.counters import add_to_counter
+    total = 0
+    try:
+        with transaction.atomic():
+            for count, ids in by_increment.items():
+                # Customizers deleted meanwhile are skipped
+                total += count * Customizer.objects.filter(pk__in=ids).update(views=F('views') + count)
+            add_to_counter('customizer_views', total)
+    except DatabaseError:
+        logger.warning('Customizer view flush failed, keeping %s views for the next one', sum(batch.values()), exc_info=True)
+        with _lock:
+            _pending.update(batch)
+        return 0
+    return total
+
+
+_wake = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='customizer-view-counts', daemon=True)
+            _worker.start()
+
+
+def wake():
+    """Have this process's flush thread write the pending views now"""
+    _ensure_worker()
+    _wake.set()
+
+
+def _run():
+    while True:
+        _wake.wait(flush_interval())
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Customizer view flush error')
+        finally:
+            connections.close_all()
+
+
+def discard():
+    """Drop the pending views without writing them (tests)"""
+    with _lock:
+        _pending.clear()
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
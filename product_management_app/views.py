@@ -1,5 +1,5 @@
 from rest_framework import generics, viewsets
-from .models import Shirt, ShirtCategory, ShirtSubCategory, UserShirt, FavoriteShirt, Customizer, UserCustomizer, Pattern, Color, Font, Order, Invoice, RevenueReport, ProductSalesReport, CustomerAnalysisReport, GrowthTrendReport, ShirtDraft, SubCategory
+from .models import Shirt, ShirtCategory, ShirtSubCategory, UserShirt, FavoriteShirt, Customizer, UserCustomizer, Pattern, Color, Font, Order, Invoice, RevenueReport, ProductSalesReport, CustomerAnalysisReport, GrowthTrendReport, ShirtDraft, SubCategory, PatternImage, ORDER_STATUS_CHOICES, INVOICE_STATUS_CHOICES
 from website_management_app.models import Category
 from .serializers import ShirtListSerializer, ShirtSerializer, ShirtCategorySerializer, ShirtSubCategorySerializer, UserShirtSerializer, FavoriteShirtSerializer, CustomizerSerializer, PatternSerializer, ColorSerializer, FontSerializer, OrderSerializer, InvoiceSerializer, RevenueReportSerializer, ProductSalesReportSerializer, CustomerAnalysisReportSerializer, GrowthTrendReportSerializer, ShirtDraftSerializer, SubCategorySerializer
 from rest_framework.views import APIView
@@ -12,6 +12,8 @@ from django.contrib.auth.models import User
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
+from prosix.conditional import ConditionalGetMixin
+from .throttling import PreviewThrottle
 
 class ShirtCategoryListCreateView(generics.ListCreateAPIView):
     queryset = ShirtCategory.objects.all().order_by('-created_at')
@@ -30,7 +32,7 @@ class ShirtSubCategoryRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAP
     serializer_class = ShirtSubCategorySerializer
     
 class ShirtListCreateView(generics.ListCreateAPIView):
-    queryset = Shirt.objects.all()
+    queryset = Shirt.objects.prefetch_related('main_images', 'other_images').order_by('-created_at', '-id')
     serializer_class = ShirtSerializer
     def create(self, request, *args, **kwargs):
         # Normalize potential numeric strings for category (e.g., "1" or "\"1\"")
@@ -106,19 +108,39 @@ class UserShirtCreateAPIView(APIView):
         
 
 
-class UserShirtListAPIView(APIView):
-    def get(self, request, *args, **kwargs):
-            user = request.user
-            shirts = Shirt.objects.all()
-            serializer = ShirtListSerializer(shirts, many=True, context={'user': user})
-            
-            return Response({
-                'success': True,
-                'response': {
-                    'data': serializer.data,
-                    'message': 'All shirts (user has no saved shirts)'
-                }
-            }, status=status.HTTP_200_OK)
+class UserShirtListAPIView(generics.ListAPIView):
+    """
+    Paginated shirt catalog with user shirts and the caller's favorites.
+    Images and user shirts are prefetched and favorites are loaded once per
+    request, so the query count does not grow with the page size.
+    """
+    serializer_class = ShirtListSerializer
+    queryset = Shirt.objects.prefetch_related('main_images', 'other_images', 'usershirts_shirt').order_by('-created_at', '-id')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        user = self.request.user
+        favorite_shirt_ids = set()
+        favorite_user_shirt_ids = set()
+        for shirt_id, user_shirt_id in FavoriteShirt.objects.filter(user=user).values_list('shirt_id', 'user_shirt_id'):
+            if shirt_id is not None:
+                favorite_shirt_ids.add(shirt_id)
+            if user_shirt_id is not None:
+                favorite_user_shirt_ids.add(user_shirt_id)
+        context['user'] = user
+        context['favorite_shirt_ids'] = favorite_shirt_ids
+        context['favorite_user_shirt_ids'] = favorite_user_shirt_ids
+        return context
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        return Response({
+            'success': True,
+            'response': {
+                'data': response.data,
+                'message': 'All shirts (user has no saved shirts)'
+            }
+        }, status=status.HTTP_200_OK)
         
 
 
@@ -199,11 +221,12 @@ class FavoriteShirtAPIView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CustomizerListCreateView(generics.ListCreateAPIView):
+class CustomizerListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all customizers or create a new customizer"""
     queryset = Customizer.objects.all()
     serializer_class = CustomizerSerializer
     permission_classes = [IsAuthenticated]
+    conditional_models = (Customizer, Customizer.sub_categories.through, Category, SubCategory)
     
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
@@ -248,10 +271,8 @@ class CustomizerByCategoryListView(generics.ListAPIView):
         if subcategory_id:
             try:
                 subcategory_id_int = int(subcategory_id)
-                # sub_category is a JSONField storing a list of IDs (integers)
-                # Use __contains to check if the subcategory_id exists in the JSON array
-                # For JSONField, __contains checks if the value exists in the array
-                queryset = queryset.filter(sub_category__contains=subcategory_id_int)
+                # Indexed lookup through the customizer/subcategory join table
+                queryset = queryset.filter(sub_categories=subcategory_id_int)
             except (ValueError, TypeError):
                 # If subcategory_id is not a valid integer, return empty queryset
                 return Customizer.objects.none()
@@ -266,11 +287,15 @@ class CustomizerRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
     lookup_field = 'id'
     
     def retrieve(self, request, *args, **kwargs):
-        response = super().retrieve(request, *args, **kwargs)
+        from .view_counts import record
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        # Buffered; written in batches by view_counts.flush()
+        record(instance.id)
         return Response({
             'success': True,
             'response': {
-                'data': response.data
+                'data': serializer.data
             }
         }, status=status.HTTP_200_OK)
     
@@ -304,6 +329,74 @@ class CustomizerRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
         }, status=status.HTTP_200_OK)
 
 
+class CustomizerPreviewAPIView(APIView):
+    """
+    PNG preview of one customizer view with recolored parts
+    GET /api/customizers/<id>/preview/?view=front&width=512&colors={"front_0": "#ff0000"}
+    Anonymous callers only see active customizers and must pass `colors`;
+    for authenticated users the customizer's draft colors are the default.
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [PreviewThrottle]
+
+    def get(self, request, id, *args, **kwargs):
+        from django.core.exceptions import ValidationError as DjangoValidationError
+        from django.http import HttpResponse
+        from django.utils.cache import get_conditional_response, quote_etag
+        from .previews import DEFAULT_WIDTH, MAX_WIDTH, get_preview, normalize_colors, preview_key
+        authenticated = request.user.is_authenticated
+        customizers = Customizer.objects.all() if authenticated else Customizer.objects.filter(is_active=True)
+        try:
+            customizer = customizers.get(id=id)
+        except Customizer.DoesNotExist:
+            return Response({
+                'success': False,
+                'response': {
+                    'message': 'Customizer not found'
+                }
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        view = request.query_params.get('view', 'front')
+        try:
+            width = min(max(int(request.query_params.get('width', DEFAULT_WIDTH)), 16), MAX_WIDTH)
+            raw_colors = request.query_params.get('colors')
+            if raw_colors is not None:
+                colors = json.loads(raw_colors)
+            elif not authenticated:
+                colors = {}
+            else:
+                colors = ShirtDraft.objects.filter(customizer=customizer).values_list('svg_part_colors', flat=True).first() or {}
+            colors = normalize_colors(customizer, view, colors)
+            etag = quote_etag(preview_key(customizer, view, width, colors))
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+            content, key = get_preview(customizer, view, width, colors)
+        except (ValueError, DjangoValidationError) as e:
+            messages = e.messages if isinstance(e, DjangoValidationError) else [str(e)]
+            return Response({
+                'success': False,
+                'response': {
+                    'message': 'Invalid preview request',
+                    'errors': messages
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except OSError:
+            # A layer or SVG file is missing or unreadable in storage
+            return Response({
+                'success': False,
+                'response': {
+                    'message': 'Preview not available'
+                }
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        response = HttpResponse(content, content_type='image/png')
+        response['ETag'] = etag
+        # Authenticated previews may show draft colors or inactive customizers
+        response['Cache-Control'] = f'{"private" if authenticated else "public"}, max-age=300'
+        return response
+
+
 class CustomizerStatisticsAPIView(APIView):
     """Get customizer statistics"""
     permission_classes = [IsAuthenticated]
@@ -313,7 +406,7 @@ class CustomizerStatisticsAPIView(APIView):
         Returns customizer statistics:
         - total_models: Total number of customizer models
         - total_active_models: Total number of active customizer models
-        - total_views: Sum of all views across all models
+        - total_views: Sum of all views across all models (as flushed by view_counts.py)
         - total_customizations: Total number of user customizations
         """
         try:
@@ -323,9 +416,8 @@ class CustomizerStatisticsAPIView(APIView):
             # Count active models
             total_active_models = Customizer.objects.filter(is_active=True).count()
             
-            # Calculate total views: each model has 4 parts (front, back, left, right)
-            # So total views = total_models × 4
-            total_views = total_models * 4
+            # Total views recorded by the customizer detail endpoint
+            total_views = Customizer.objects.aggregate(total=Sum('views'))['total'] or 0
             
             # Count total customizations
             total_customizations = UserCustomizer.objects.count()
@@ -353,11 +445,12 @@ class CustomizerStatisticsAPIView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class PatternListCreateView(generics.ListCreateAPIView):
+class PatternListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all patterns or create a new pattern"""
     queryset = Pattern.objects.all()
     serializer_class = PatternSerializer
     permission_classes = [IsAuthenticated]
+    conditional_models = (Pattern, PatternImage)
     
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
@@ -430,11 +523,12 @@ class PatternRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         }, status=status.HTTP_200_OK)
 
 
-class ColorListCreateView(generics.ListCreateAPIView):
+class ColorListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all colors or create a new color"""
     queryset = Color.objects.all()
     serializer_class = ColorSerializer
     permission_classes = [IsAuthenticated]
+    conditional_models = (Color,)
     
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
@@ -504,11 +598,12 @@ class ColorRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         }, status=status.HTTP_200_OK)
 
 
-class FontListCreateView(generics.ListCreateAPIView):
+class FontListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all fonts or create a new font"""
     queryset = Font.objects.all()
     serializer_class = FontSerializer
     permission_classes = [IsAuthenticated]
+    conditional_models = (Font,)
     
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
@@ -580,7 +675,7 @@ class FontRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 class OrderListCreateView(generics.ListCreateAPIView):
     """List all orders or create a new order"""
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related('customer').prefetch_related('items')
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     
@@ -608,7 +703,7 @@ class OrderListCreateView(generics.ListCreateAPIView):
 
 class OrderRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete an order by ID"""
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related('customer').prefetch_related('items')
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id'
@@ -707,6 +802,90 @@ class InvoiceRetrieveDestroyView(generics.RetrieveDestroyAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class ExportAPIView(APIView):
+    """Base for the streaming CSV/NDJSON exports (see prosix/exports.py)"""
+    permission_classes = [IsAuthenticated]
+    model = None
+    export_name = None
+    status_choices = ()
+    # Column name: model field or lookup
+    columns = {}
+
+    def get(self, request, *args, **kwargs):
+        """
+        Query params:
+        - export_format: csv (default) or ndjson
+        - start / end: YYYY-MM-DD, inclusive, on the record's date
+        - status: one of the model's statuses
+        """
+        from prosix.exports import export_response, export_rows, parse_export_params
+
+        status_filter = request.query_params.get('status')
+        try:
+            export_format, start, end = parse_export_params(request.query_params)
+            valid_statuses = [value for value, _ in self.status_choices]
+            if status_filter and status_filter not in valid_statuses:
+                raise ValueError(f'status must be one of: {", ".join(valid_statuses)}.')
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'response': {
+                    'message': str(e)
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = export_rows(self.export_queryset(start, end, status_filter), self.columns)
+        return export_response(rows, list(self.columns), export_format, self.export_name)
+
+    def export_queryset(self, start=None, end=None, status_filter=None):
+        """The records to export, in the order they were created"""
+        from prosix.exports import date_range_filter
+
+        queryset = self.model.objects.filter(**date_range_filter('date', start, end))
+        if not status_filter:
+            return queryset.order_by('id')
+        # date is auto_now_add, so ('date', 'id') is creation order too; it
+        # follows the (status, date) index instead of sorting the range
+        return queryset.filter(status=status_filter).order_by('date', 'id')
+
+
+class OrderExportAPIView(ExportAPIView):
+    """Stream orders as CSV or NDJSON for accounting"""
+    model = Order
+    export_name = 'orders'
+    status_choices = ORDER_STATUS_CHOICES
+    columns = {
+        'order_id': 'order_id',
+        'date': 'date',
+        'status': 'status',
+        'total': 'total',
+        'customer': 'customer_id',
+        'customer_name': 'customer__username',
+        'customer_email': 'customer__email',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+
+
+class InvoiceExportAPIView(ExportAPIView):
+    """Stream invoices as CSV or NDJSON for accounting"""
+    model = Invoice
+    export_name = 'invoices'
+    status_choices = INVOICE_STATUS_CHOICES
+    columns = {
+        'invoice_id': 'invoice_id',
+        'date': 'date',
+        'status': 'status',
+        'amount': 'amount',
+        'due_date': 'due_date',
+        'customer': 'customer_id',
+        'customer_name': 'customer__username',
+        'customer_email': 'customer__email',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+
+
 # Revenue Report Views
 class RevenueReportListCreateView(generics.ListCreateAPIView):
     """List all revenue reports or create a new revenue report"""
@@ -1107,88 +1286,46 @@ class SubCategoryPasswordVerifyView(APIView):
 
 
 # Report Generation APIs
-class GenerateRevenueReportAPIView(APIView):
-    """Generate revenue report dynamically from Order and Invoice data"""
+class GenerateReportAPIView(APIView):
+    """
+    Base for the generate/ endpoints. Figures come from product_management_app/reports.py;
+    with ?max_age=<seconds> the newest stored snapshot is served when it is at least that fresh.
+    """
     permission_classes = [IsAuthenticated]
+    report_name = None
+    report_label = None
     
     def get(self, request, *args, **kwargs):
-        """
-        Generate revenue report with:
-        - This month revenue (from completed orders and paid invoices)
-        - Last month revenue
-        - Growth percentage
-        - Total orders count
-        """
+        from .reports import compute_reports, fresh_snapshot, report_data, snapshot_data
+
+        max_age = request.query_params.get('max_age')
+        if max_age is not None:
+            try:
+                max_age = int(max_age)
+                if max_age < 0:
+                    raise ValueError
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'response': {
+                        'message': 'max_age must be a non-negative number of seconds'
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            now = timezone.now()
-            current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            last_month_end = current_month_start - timedelta(days=1)
-            last_month_start = last_month_end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Calculate this month revenue from completed orders
-            this_month_orders = Order.objects.filter(
-                date__gte=current_month_start,
-                status='completed'
-            )
-            this_month_revenue_orders = this_month_orders.aggregate(
-                total=Sum('total')
-            )['total'] or Decimal('0.00')
-            
-            # Calculate this month revenue from paid invoices
-            this_month_invoices = Invoice.objects.filter(
-                date__gte=current_month_start,
-                status='paid'
-            )
-            this_month_revenue_invoices = this_month_invoices.aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-            
-            this_month_revenue = this_month_revenue_orders + this_month_revenue_invoices
-            
-            # Calculate last month revenue
-            last_month_orders = Order.objects.filter(
-                date__gte=last_month_start,
-                date__lt=current_month_start,
-                status='completed'
-            )
-            last_month_revenue_orders = last_month_orders.aggregate(
-                total=Sum('total')
-            )['total'] or Decimal('0.00')
-            
-            last_month_invoices = Invoice.objects.filter(
-                date__gte=last_month_start,
-                date__lt=current_month_start,
-                status='paid'
-            )
-            last_month_revenue_invoices = last_month_invoices.aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-            
-            last_month_revenue = last_month_revenue_orders + last_month_revenue_invoices
-            
-            # Calculate growth percentage
-            if last_month_revenue > 0:
-                growth_percentage = ((this_month_revenue - last_month_revenue) / last_month_revenue) * 100
+            snapshot = fresh_snapshot(self.report_name, max_age) if max_age is not None else None
+            if snapshot is not None:
+                data = snapshot_data(self.report_name, snapshot)
             else:
-                growth_percentage = Decimal('100.00') if this_month_revenue > 0 else Decimal('0.00')
-            
-            # Total orders count (this month)
-            total_orders = this_month_orders.count()
-            
-            report_data = {
-                'this_month_revenue': float(this_month_revenue),
-                'last_month_revenue': float(last_month_revenue),
-                'growth_percentage': float(growth_percentage),
-                'total_orders': total_orders,
-                'report_date': now.date(),
-                'generated_at': now.isoformat()
-            }
+                now = timezone.now()
+                values = compute_reports(now, only=[self.report_name])[self.report_name]
+                data = report_data(values, now.date(), now)
             
             return Response({
                 'success': True,
                 'response': {
-                    'data': report_data,
-                    'message': 'Revenue report generated successfully'
+                    'data': data,
+                    'message': f'{self.report_label} report generated successfully'
                 }
             }, status=status.HTTP_200_OK)
             
@@ -1196,269 +1333,162 @@ class GenerateRevenueReportAPIView(APIView):
             return Response({
                 'success': False,
                 'response': {
-                    'message': f'Error generating revenue report: {str(e)}'
+                    'message': f'Error generating {self.report_label.lower()} report: {str(e)}'
                 }
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class GenerateProductSalesReportAPIView(APIView):
-    """Generate product sales report dynamically from UserShirt and Customizer data"""
-    permission_classes = [IsAuthenticated]
-    
-    def get(self, request, *args, **kwargs):
-        """
-        Generate product sales report with:
-        - Top product name (most popular shirt or customizer)
-        - Top product revenue (from orders)
-        - Top product units sold (count of user shirts/customizers)
-        - Top category
-        """
-        try:
-            now = timezone.now()
-            current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Get top shirt by user count
-            top_shirt = Shirt.objects.annotate(
-                user_count=Count('usershirts_shirt')
-            ).order_by('-user_count').first()
-            
-            # Get top customizer by user count
-            top_customizer = Customizer.objects.annotate(
-                user_count=Count('usercustomizers_customizer')
-            ).order_by('-user_count').first()
-            
-            # Determine top product
-            if top_shirt and top_customizer:
-                if top_shirt.user_count >= top_customizer.user_count:
-                    top_product_name = top_shirt.title
-                    top_product_units_sold = top_shirt.user_count
-                    top_category = top_shirt.category.name if top_shirt.category else 'N/A'
-                else:
-                    top_product_name = top_customizer.title
-                    top_product_units_sold = top_customizer.user_count
-                    top_category = top_customizer.get_category_display()
-            elif top_shirt:
-                top_product_name = top_shirt.name
-                top_product_units_sold = top_shirt.user_count
-                top_category = top_shirt.category.name if top_shirt.category else 'N/A'
-            elif top_customizer:
-                top_product_name = top_customizer.title
-                top_product_units_sold = top_customizer.user_count
-                top_category = top_customizer.get_category_display()
-            else:
-                top_product_name = None
-                top_product_units_sold = 0
-                top_category = None
-            
-            # Calculate revenue from orders (this month) - approximate
-            # Since we don't have direct product-order relationship, we'll use average order value
-            this_month_orders = Order.objects.filter(
-                date__gte=current_month_start,
-                status='completed'
-            )
-            avg_order_value = this_month_orders.aggregate(
-                avg=Avg('total')
-            )['avg'] or Decimal('0.00')
-            
-            # Estimate top product revenue (units sold * average order value)
-            top_product_revenue = Decimal(str(top_product_units_sold)) * avg_order_value if top_product_units_sold > 0 else Decimal('0.00')
-            
-            report_data = {
-                'top_product_name': top_product_name,
-                'top_product_revenue': float(top_product_revenue),
-                'top_product_units_sold': top_product_units_sold,
-                'top_category': top_category,
-                'report_date': now.date(),
-                'generated_at': now.isoformat()
-            }
-            
-            return Response({
-                'success': True,
-                'response': {
-                    'data': report_data,
-                    'message': 'Product sales report generated successfully'
-                }
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            return Response({
-                'success': False,
-                'response': {
-                    'message': f'Error generating product sales report: {str(e)}'
-                }
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+class GenerateRevenueReportAPIView(GenerateReportAPIView):
+    """
+    Generate revenue report with:
+    - This month revenue (from completed orders and paid invoices)
+    - Last month revenue
+    - Growth percentage
+    - Total orders count (completed, this month)
+    """
+    report_name = 'revenue'
+    report_label = 'Revenue'
 
 
-class GenerateCustomerAnalysisReportAPIView(APIView):
-    """Generate customer analysis report dynamically from User and Order data"""
+class RevenueSeriesAPIView(APIView):
+    """Revenue per day/week/month/quarter for charts, from the daily revenue rollup"""
     permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
         """
-        Generate customer analysis report with:
-        - Total customers
-        - New customers (this month)
-        - Returning customers (customers with multiple orders)
-        - Average order value
+        Query params:
+        - start: YYYY-MM-DD (default: January 1st of the end date's year)
+        - end: YYYY-MM-DD (default: today)
+        - bucket: day, week, month or quarter (default: month)
         """
+        from datetime import date as date_type
+        from .rollups import SERIES_BUCKETS, revenue_series
+
+        bucket = request.query_params.get('bucket', 'month')
         try:
-            now = timezone.now()
-            current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Total customers (users who have placed at least one order)
-            total_customers = User.objects.filter(orders__isnull=False).distinct().count()
-            
-            # New customers (users who created their first order this month)
-            all_customers = User.objects.filter(orders__isnull=False).distinct()
-            new_customers = 0
-            for customer in all_customers:
-                first_order = customer.orders.order_by('date').first()
-                if first_order and first_order.date >= current_month_start:
-                    new_customers += 1
-            
-            # Returning customers (customers with more than one order)
-            returning_customers = User.objects.annotate(
-                order_count=Count('orders')
-            ).filter(order_count__gt=1).count()
-            
-            # Average order value
-            all_orders = Order.objects.filter(status='completed')
-            avg_order_value = all_orders.aggregate(
-                avg=Avg('total')
-            )['avg'] or Decimal('0.00')
-            
-            report_data = {
-                'total_customers': total_customers,
-                'new_customers': new_customers,
-                'returning_customers': returning_customers,
-                'average_order_value': float(avg_order_value),
-                'report_date': now.date(),
-                'generated_at': now.isoformat()
-            }
-            
-            return Response({
-                'success': True,
-                'response': {
-                    'data': report_data,
-                    'message': 'Customer analysis report generated successfully'
-                }
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
+            if bucket not in SERIES_BUCKETS:
+                raise ValueError(f'bucket must be one of: {", ".join(SERIES_BUCKETS)}.')
+            end = request.query_params.get('end')
+            end = date_type.fromisoformat(end) if end else timezone.localdate()
+            start = request.query_params.get('start')
+            start = date_type.fromisoformat(start) if start else end.replace(month=1, day=1)
+            if start > end:
+                raise ValueError('start must not be after end.')
+            series = revenue_series(start, end, bucket)
+        except ValueError as e:
             return Response({
                 'success': False,
                 'response': {
-                    'message': f'Error generating customer analysis report: {str(e)}'
+                    'message': str(e)
                 }
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = [
+            {
+                'period_start': row['period_start'],
+                'period_end': row['period_end'],
+                'revenue': float(row['revenue']),
+                'order_revenue': float(row['order_revenue']),
+                'invoice_revenue': float(row['invoice_revenue']),
+                'orders': row['orders'],
+                'invoices': row['invoices'],
+            }
+            for row in series
+        ]
+        return Response({
+            'success': True,
+            'response': {
+                'data': {
+                    'bucket': bucket,
+                    'start': start,
+                    'end': end,
+                    'series': data,
+                },
+                'message': 'Revenue series generated successfully'
+            }
+        }, status=status.HTTP_200_OK)
 
 
-class GenerateGrowthTrendReportAPIView(APIView):
-    """Generate growth trend report dynamically from historical Order and Invoice data"""
+class TopProductsAPIView(APIView):
+    """Best-selling shirts and customizers from completed order lines"""
     permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
         """
-        Generate growth trend report with:
-        - Monthly growth percentage
-        - Yearly growth percentage
-        - Quarterly growth percentage
-        - Market share (estimated)
+        Query params:
+        - by: revenue or units (default: revenue)
+        - start / end: YYYY-MM-DD, inclusive (default: all time)
+        - category: category ID
+        - limit: number of products (default 10, max 100)
         """
+        from datetime import date as date_type
+        from .reports import TOP_PRODUCT_ORDERINGS, top_products
+
+        by = request.query_params.get('by', 'revenue')
         try:
-            now = timezone.now()
-            current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            last_month_start = (current_month_start - timedelta(days=1)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Current quarter start
-            current_quarter = (now.month - 1) // 3
-            current_quarter_start = now.replace(month=current_quarter * 3 + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Last quarter calculation
-            if current_quarter == 0:
-                # If current quarter is Q1, last quarter is Q4 of previous year
-                last_quarter_start = now.replace(year=now.year - 1, month=10, day=1, hour=0, minute=0, second=0, microsecond=0)
-                last_quarter_end = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
-            else:
-                # Previous quarter of same year
-                last_quarter_month = (current_quarter - 1) * 3 + 1
-                last_quarter_start = now.replace(month=last_quarter_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-                last_quarter_end = current_quarter_start - timedelta(days=1)
-            
-            # Current year start
-            current_year_start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            last_year_start = current_year_start.replace(year=current_year_start.year - 1)
-            last_year_end = current_year_start - timedelta(days=1)
-            
-            # Monthly growth
-            this_month_revenue = self._calculate_revenue(current_month_start, now)
-            last_month_revenue = self._calculate_revenue(last_month_start, current_month_start - timedelta(days=1))
-            monthly_growth = self._calculate_growth_percentage(this_month_revenue, last_month_revenue)
-            
-            # Quarterly growth
-            this_quarter_revenue = self._calculate_revenue(current_quarter_start, now)
-            last_quarter_revenue = self._calculate_revenue(
-                last_quarter_start,
-                last_quarter_end
-            )
-            quarterly_growth = self._calculate_growth_percentage(this_quarter_revenue, last_quarter_revenue)
-            
-            # Yearly growth
-            this_year_revenue = self._calculate_revenue(current_year_start, now)
-            last_year_revenue = self._calculate_revenue(last_year_start, last_year_end)
-            yearly_growth = self._calculate_growth_percentage(this_year_revenue, last_year_revenue)
-            
-            # Market share (estimated as percentage of total revenue vs previous period)
-            # This is a simplified calculation
-            total_revenue_all_time = self._calculate_revenue(None, now)
-            market_share = Decimal('100.00')  # Placeholder - would need industry data for real calculation
-            
-            report_data = {
-                'monthly_growth': float(monthly_growth),
-                'yearly_growth': float(yearly_growth),
-                'quarterly_growth': float(quarterly_growth),
-                'market_share': float(market_share),
-                'report_date': now.date(),
-                'generated_at': now.isoformat()
-            }
-            
-            return Response({
-                'success': True,
-                'response': {
-                    'data': report_data,
-                    'message': 'Growth trend report generated successfully'
-                }
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
+            if by not in TOP_PRODUCT_ORDERINGS:
+                raise ValueError(f'by must be one of: {", ".join(TOP_PRODUCT_ORDERINGS)}.')
+            start = request.query_params.get('start')
+            start = date_type.fromisoformat(start) if start else None
+            end = request.query_params.get('end')
+            end = date_type.fromisoformat(end) if end else None
+            category = request.query_params.get('category')
+            category = int(category) if category else None
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+            if limit < 1:
+                raise ValueError('limit must be at least 1.')
+        except ValueError as e:
             return Response({
                 'success': False,
                 'response': {
-                    'message': f'Error generating growth trend report: {str(e)}'
+                    'message': str(e)
                 }
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    def _calculate_revenue(self, start_date, end_date):
-        """Helper method to calculate revenue from orders and invoices"""
-        orders_query = Order.objects.filter(status='completed')
-        invoices_query = Invoice.objects.filter(status='paid')
-        
-        if start_date:
-            orders_query = orders_query.filter(date__gte=start_date)
-            invoices_query = invoices_query.filter(date__gte=start_date)
-        
-        if end_date:
-            orders_query = orders_query.filter(date__lte=end_date)
-            invoices_query = invoices_query.filter(date__lte=end_date)
-        
-        orders_revenue = orders_query.aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        invoices_revenue = invoices_query.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        return orders_revenue + invoices_revenue
-    
-    def _calculate_growth_percentage(self, current, previous):
-        """Helper method to calculate growth percentage"""
-        if previous > 0:
-            return ((current - previous) / previous) * 100
-        else:
-            return Decimal('100.00') if current > 0 else Decimal('0.00')
+        products = top_products(start, end, category=category, by=by, limit=limit)
+        for product in products:
+            product['revenue'] = float(product['revenue'])
+        return Response({
+            'success': True,
+            'response': {
+                'data': products,
+                'message': 'Top products generated successfully'
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class GenerateProductSalesReportAPIView(GenerateReportAPIView):
+    """
+    Generate product sales report with:
+    - Top product name (this month's best-selling shirt or customizer by
+      revenue, from completed orders' line items)
+    - Top product revenue (sum of its order line totals)
+    - Top product units sold (sum of its order line quantities)
+    - Top category (the top product's category)
+    """
+    report_name = 'product_sales'
+    report_label = 'Product sales'
+
+
+class GenerateCustomerAnalysisReportAPIView(GenerateReportAPIView):
+    """
+    Generate customer analysis report with:
+    - Total customers
+    - New customers (this month)
+    - Returning customers (customers with multiple orders)
+    - Average order value
+    """
+    report_name = 'customer_analysis'
+    report_label = 'Customer analysis'
+
+
+class GenerateGrowthTrendReportAPIView(GenerateReportAPIView):
+    """
+    Generate growth trend report with:
+    - Monthly growth percentage
+    - Yearly growth percentage
+    - Quarterly growth percentage
+    - Market share (estimated)
+    """
+    report_name = 'growth_trend'
+    report_label = 'Growth trend'
@@ -0,0 +1,238 @@
+"""
+Default pagination for the API.
+
+Two modes, both capped at REST_FRAMEWORK['DEFAULT_MAX_PAGE_SIZE'] rows per page:
+
+- limit/offset (the default): ?limit=20&offset=40
+- keyset (opt-in): ?pagination=cursor, then follow the `next`/`previous` links
+  (?cursor=...). Rows are ordered newest first on (created_at, id) and each page
+  is a range scan from the last row seen, so deep pages cost the same as the
+  first one. Only available for models with a created_at field; other lists
+  fall back to limit/offset.
+
+Both modes return the usual {'count', 'next', 'previous', 'results'} payload.
+
+APIViews that build their own payload can use paginate_by_id(): forward-only
+keyset pages on the primary key, for models without created_at.
+Counts are cached for a short time (PAGINATION_COUNT_CACHE_TIMEOUT seconds)
+instead of running COUNT(*) on every page. Each listed model has a generation
+stamp in PAGINATION_CACHE_ALIAS that is part of the count's cache key; saving
+or deleting a row of a model registered with track_counts() replaces the
+stamp, which retires that model's counts in every worker.
+"""
+import base64
+import hashlib
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _max_page_size():
+    return getattr(settings, 'REST_FRAMEWORK', {}).get('DEFAULT_MAX_PAGE_SIZE', 100)
+
+
+def _generation_key(model):
+    return f'pagination:generation:{model._meta.label_lower}'
+
+
+def _stamps():
+    return caches[getattr(settings, 'PAGINATION_CACHE_ALIAS', 'default')]
+
+
+def _generation(model):
+    key = _generation_key(model)
+    generation = _stamps().get(key)
+    if generation is None:
+        _stamps().add(key, uuid.uuid4().hex, None)
+        generation = _stamps().get(key)
+    return generation
+
+
+def _bump(model):
+    _stamps().set(_generation_key(model), uuid.uuid4().hex, None)
+
+
+def retire_counts(*models, using=None):
+    """Drop the cached counts of these models' lists (for writes that skip signals, e.g. queryset.update())"""
+    for model in models:
+        _bump(model)
+        # Again once committed, so a count taken by another worker while the
+        # transaction was open does not outlive it
+        transaction.on_commit(partial(_bump, model), using=using)
+
+
+def _retire_on_write(sender, raw=False, using=None, **kwargs):
+    if not raw:
+        retire_counts(sender, using=using)
+
+
+def track_counts(*models):
+    """Retire these models' cached counts on every save and delete (called from AppConfig.ready)"""
+    for model in models:
+        uid = f'pagination-counts:{model._meta.label}'
+        post_save.connect(_retire_on_write, sender=model, dispatch_uid=uid)
+        post_delete.connect(_retire_on_write, sender=model, dispatch_uid=uid)
+
+
+def cached_count(queryset):
+    """COUNT(*) for a queryset, cached per SQL statement for a short time"""
+    if not hasattr(queryset, 'query'):
+        return len(queryset)
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    digest = hashlib.sha1(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+    key = f'pagination:count:{_generation(queryset.model)}:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+    return count
+
+
+class StandardPagination(LimitOffsetPagination):
+    """Bounded limit/offset pagination with opt-in keyset mode"""
+    max_limit = None
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    keyset_fields = ('created_at', 'id')
+
+    def __init__(self):
+        self.max_limit = _max_page_size()
+        self.keyset = False
+
+    # -- mode selection -------------------------------------------------
+
+    def supports_keyset(self, queryset):
+        if not hasattr(queryset, 'model'):
+            return False
+        try:
+            for name in self.keyset_fields:
+                queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def wants_keyset(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_keyset(request) and self.supports_keyset(queryset):
+            self.keyset = True
+            self.display_page_controls = False
+            return self.paginate_keyset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        return cached_count(queryset)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+    # -- keyset mode ----------------------------------------------------
+
+    def encode_cursor(self, direction, item):
+        raw = f'{direction}|{item.created_at.isoformat()}|{item.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            direction, created_at, pk = raw.split('|')
+            created_at = parse_datetime(created_at)
+            if direction not in ('n', 'p') or created_at is None:
+                raise ValueError(raw)
+            return direction, created_at, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+
+    def cursor_link(self, direction, item):
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(direction, item))
+
+    def paginate_keyset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit or self.max_limit
+        self.count = self.get_count(queryset)
+        cursor = self.decode_cursor(request)
+
+        if cursor and cursor[0] == 'p':
+            # Walk backwards from the first row of the page we came from
+            _, created_at, pk = cursor
+            rows = list(
+                queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+                .order_by('created_at', 'pk')[:self.limit + 1]
+            )
+            has_previous = len(rows) > self.limit
+            page = rows[:self.limit][::-1]
+            has_next = bool(page)
+        else:
+            if cursor:
+                _, created_at, pk = cursor
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+            rows = list(queryset.order_by('-created_at', '-pk')[:self.limit + 1])
+            has_next = len(rows) > self.limit
+            page = rows[:self.limit]
+            has_previous = cursor is not None and bool(page)
+
+        self.next_link = self.cursor_link('n', page[-1]) if has_next else None
+        self.previous_link = self.cursor_link('p', page[0]) if has_previous else None
+        return page
+
+
+def _id_cursor(pk):
+    return base64.urlsafe_b64encode(f'id|{pk}'.encode()).decode().rstrip('=')
+
+
+def paginate_by_id(queryset, request):
+    """
+    One page of `queryset` (instances, or values() rows including 'id'), highest id
+    first, as a range scan below ?cursor=. ?limit= works as for StandardPagination.
+    Returns (rows, next link or None); raises NotFound for an invalid cursor.
+    """
+    paginator = StandardPagination()
+    limit = paginator.get_limit(request) or paginator.max_limit
+    encoded = request.query_params.get(paginator.cursor_query_param)
+    if encoded:
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            prefix, pk = raw.split('|')
+            if prefix != 'id':
+                raise ValueError(raw)
+            queryset = queryset.filter(id__lt=int(pk))
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+
+    rows = list(queryset.order_by('-id')[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    last_id = last['id'] if isinstance(last, dict) else last.pk
+    url = remove_query_param(request.build_absolute_uri(), paginator.offset_query_param)
+    return rows, replace_query_param(url, paginator.cursor_query_param, _id_cursor(last_id))
@@ -0,0 +1,57 @@
+"""
+Query plan checks, used by the index regression tests.
+
+table_scans(queryset) runs EXPLAIN on a queryset and returns the tables the
+database would read in full; test cases mix in QueryPlanAssertions for
+assertIndexed(). Walking an index in order (SQLite "SCAN t USING
+INDEX", e.g. for ORDER BY ... LIMIT) does not count as a table scan.
+
+Test tables hold a handful of rows, where PostgreSQL prefers a sequential
+scan whatever the indexes; sequential scans are switched off for the EXPLAIN
+so the plan shows whether a usable index exists.
+"""
+import re
+
+from django.db import connections, transaction
+
+
+_SCAN_PATTERNS = {
+    # "SCAN product_management_app_order" / "SCAN U0" (no USING INDEX)
+    'sqlite': re.compile(r'\bSCAN (\S+)$'),
+    'postgresql': re.compile(r'\bSeq Scan on (\S+)'),
+}
+
+
+def explain(queryset):
+    """The database's plan for a queryset, as text"""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+def table_scans(queryset):
+    """Tables (or aliases) the plan reads in full; empty when every table is read through an index"""
+    vendor = connections[queryset.db].vendor
+    if vendor not in _SCAN_PATTERNS:
+        raise NotImplementedError(f'No query plan parser for {vendor}')
+    pattern = _SCAN_PATTERNS[vendor]
+    scans = []
+    for line in explain(queryset).splitlines():
+        match = pattern.search(line.strip())
+        if match:
+            scans.append(match.group(1))
+    return scans
+
+
+class QueryPlanAssertions:
+    """TestCase mixin: assertIndexed(queryset), skipped on databases without a plan parser"""
+
+    def assertIndexed(self, queryset):
+        try:
+            scans = table_scans(queryset)
+        except NotImplementedError as e:
+            self.skipTest(str(e))
+        self.assertEqual(scans, [], explain(queryset))
@@ -104,6 +104,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # File-backed test database, so forked worker processes in tests
+        # (stress_order_ids) see the same data; removed after the run
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -114,13 +117,99 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with resolved tokens cached per process (user_management_app/authentication.py)
+        'user_management_app.authentication.CachedTokenAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'prosix.pagination.StandardPagination',
     'PAGE_SIZE': 20,
-    'DEFAULT_MAX_PAGE_SIZE': 104857600,
+    # Hard cap on ?limit= for every paginated list (see prosix/pagination.py)
+    'DEFAULT_MAX_PAGE_SIZE': 100,
   }
 
+# Seconds a paginated list's total count is reused before COUNT(*) runs again
+PAGINATION_COUNT_CACHE_TIMEOUT = 30
+
+CACHES = {
+    # Per-process cache for serialized lookups and counts
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Seen by every gunicorn worker on this host; holds version stamps that
+    # all workers must agree on. Use Redis/Memcached when running on several hosts.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache', 'shared'),
+        'OPTIONS': {
+            # FileBasedCache lists the whole directory on every set() to decide whether
+            # to cull, so the keys here are kept to a fixed, small set: the auth stamp
+            # buckets (AUTH_STAMP_BUCKETS), the settings, taxonomy and list-count stamps.
+            # Above the limit it would cull live stamps and make every worker reload.
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
+# Cache alias holding the settings singletons' version stamps
+SETTINGS_CACHE_ALIAS = 'shared'
+
+# Cache alias holding the category/subcategory version stamp (product_management_app/resolvers.py)
+TAXONOMY_CACHE_ALIAS = 'shared'
+
+# Cache alias holding the paginated lists' count generations (prosix/pagination.py)
+PAGINATION_CACHE_ALIAS = 'shared'
+
+# Seconds the assembled /api/dashboard/ figures are reused by a worker
+DASHBOARD_CACHE_TIMEOUT = 10
+
+# Customizer views are counted in memory and written in batches by a background thread
+# (product_management_app/view_counts.py):
+# after this many seconds or this many pending views, whichever comes first
+CUSTOMIZER_VIEW_FLUSH_INTERVAL = 10
+CUSTOMIZER_VIEW_FLUSH_SIZE = 1000
+
+# Order/invoice numbers each worker reserves per database round trip (product_management_app/ids.py)
+ORDER_ID_BLOCK_SIZE = 50
+
+# Resolved API tokens each worker keeps in memory, and for how many seconds at most; the version
+# stamps that make every worker drop an entry when its user, profile or token changes live in
+# AUTH_CACHE_ALIAS, shared by users with the same id modulo AUTH_STAMP_BUCKETS
+# (user_management_app/authentication.py)
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+AUTH_CACHE_ALIAS = 'shared'
+AUTH_STAMP_BUCKETS = 256
+
+# Failed logins allowed per client IP and per username/e-mail within a sliding window of
+# LOGIN_THROTTLE_WINDOW seconds, counted in the database (user_management_app/throttling.py)
+LOGIN_THROTTLE_WINDOW = 15 * 60
+LOGIN_THROTTLE_IP_FAILURES = 50
+LOGIN_THROTTLE_IDENTITY_FAILURES = 5
+
+# Email outbox (user_management_app/outbox.py): emails sent per SMTP connection, tries per email
+# (retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubling each time), seconds a batch holds its
+# emails, and how often each process's outbox thread looks for due emails
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_LEASE = 5 * 60
+EMAIL_OUTBOX_POLL_INTERVAL = 30
+EMAIL_OUTBOX_IN_PROCESS = True
+
+# Rows fetched per database round trip by the streaming CSV/NDJSON exports (prosix/exports.py)
+EXPORT_CHUNK_SIZE = 2000
+
+# Cache alias for report results shared by all workers (closed revenue series buckets never expire)
+REPORT_CACHE_ALIAS = 'shared'
+
+# Seconds between report snapshots when `manage.py materialize_reports --loop` runs as a worker
+REPORT_SNAPSHOT_INTERVAL = 15 * 60
+
+# Rendered customizer previews (product_management_app/previews.py), LRU-evicted past the size limit
+PREVIEW_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'previews')
+PREVIEW_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Preview requests per IP for anonymous callers (product_management_app/throttling.py)
+PREVIEW_ANON_RATE = '60/min'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,114 @@
+"""
+A local SMTP server for tests (and for trying emails out without a mail account).
+
+    with LocalSMTPServer() as server, override_settings(**server.email_settings()):
+        ...  # send mail
+    server.messages     # [email.message.EmailMessage], in the order received
+    server.connections  # SMTP sessions opened so far
+    server.fail_next(2) # refuse the next two messages with a 451
+
+Speaks just enough SMTP for smtplib / Django's SMTP backend: no TLS, no AUTH.
+"""
+import email
+import email.policy
+import socketserver
+import threading
+
+
+class _Session(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply('220 localhost ESMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self._reply('250 localhost')
+            elif verb == 'MAIL':
+                with server.lock:
+                    refuse = server.failures > 0
+                    if refuse:
+                        server.failures -= 1
+                if refuse:
+                    self._reply('451 Temporary failure, try again later')
+                else:
+                    recipients = []
+                    self._reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip().strip('<>'))
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                message = email.message_from_bytes(b''.join(lines), policy=email.policy.default)
+                with server.lock:
+                    server.messages.append(message)
+                    server.envelopes.append(recipients)
+                self._reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Session)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.envelopes = []
+        self.connections = 0
+        self.failures = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def fail_next(self, count=1):
+        """Refuse the next `count` messages with a temporary error"""
+        with self.lock:
+            self.failures = count
+
+    def email_settings(self):
+        """Settings that point Django's SMTP backend at this server"""
+        return {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': self.server_address[0],
+            'EMAIL_PORT': self.port,
+            'EMAIL_USE_TLS': False,
+            'EMAIL_USE_SSL': False,
+            'EMAIL_HOST_USER': 'noreply@prosix.test',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='local-smtp', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
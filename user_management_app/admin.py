@@ -1,6 +1,14 @@
 from django.contrib import admin
 
-from user_management_app.models import UserProfile
+from user_management_app.models import UserProfile, OutboxEmail
 
 # Register your models here.
-admin.site.register(UserProfile)
\ No newline at end of file
+admin.site.register(UserProfile)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['template', 'recipient', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'template']
+    search_fields = ['recipient']
+    exclude = ['context']
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class UserManagementAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_management_app'
+
+    def ready(self):
+        # Connect the invalidation signals of the cached token authentication and profile creation
+        from . import authentication, profiles  # noqa: F401
+        # Retire the cached counts of the user and member lists (see prosix/pagination.py)
+        from django.contrib.auth.models import User
+        from prosix.pagination import track_counts
+        from .models import UserProfile
+        track_counts(User, UserProfile)
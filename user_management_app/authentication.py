@@ -0,0 +1,212 @@
+"""
+Token authentication with resolved tokens kept in process memory.
+
+DRF's TokenAuthentication looks the token and its user up on every request,
+and most views then load the user's profile separately. CachedTokenAuthentication
+loads token, user and profile in one query and keeps their values in a
+per-process LRU (AUTH_TOKEN_CACHE_SIZE entries, AUTH_TOKEN_CACHE_TIMEOUT
+seconds). request.user comes back with `profile` and `auth_token` already
+attached.
+
+Each entry carries a version stamp from the shared cache (AUTH_CACHE_ALIAS);
+a request checks it (one cache read, no database query). Saving or deleting
+the user, their profile or one of their tokens (logout, password change,
+accept/reject, profile edits) replaces the stamp, so every worker reloads the
+user's entries on their next request. Users share AUTH_STAMP_BUCKETS stamps
+(user id modulo the bucket count), which keeps the number of keys in the
+shared cache fixed whatever the number of users; a change also makes the
+other users of its bucket reload once.
+
+The stamp is always read before the rows. A token this process has not seen
+yet costs one extra query (token -> user id) to find its stamp.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+
+_lock = threading.Lock()
+# {token key: _Entry}, least recently used first
+_entries = OrderedDict()
+
+
+class _Entry:
+    __slots__ = ('user_id', 'version', 'expires', 'token', 'user', 'profile')
+
+    def __init__(self, user_id, version, expires, token, user, profile):
+        self.user_id = user_id
+        # Token's version stamp when the rows were read
+        self.version = version
+        self.expires = expires
+        # (field names, values) of each row; profile is None when the user has none
+        self.token = token
+        self.user = user
+        self.profile = profile
+
+
+def cache_size():
+    return getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000)
+
+
+def cache_timeout():
+    return getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300)
+
+
+def _stamps():
+    return caches[getattr(settings, 'AUTH_CACHE_ALIAS', 'default')]
+
+
+def stamp_buckets():
+    return getattr(settings, 'AUTH_STAMP_BUCKETS', 256)
+
+
+def _version_key(user_id):
+    return f'auth:bucket:{user_id % stamp_buckets()}:version'
+
+
+def current_version(user_id):
+    """Version stamp guarding a user's cached token resolutions, created on first use"""
+    version_key = _version_key(user_id)
+    version = _stamps().get(version_key)
+    if version is None:
+        _stamps().add(version_key, uuid.uuid4().hex, None)
+        version = _stamps().get(version_key)
+    return version
+
+
+def _bump(user_ids):
+    _stamps().set_many({key: uuid.uuid4().hex for key in {_version_key(user_id) for user_id in user_ids}}, None)
+
+
+def invalidate_users(user_ids, using=None):
+    """
+    Make every worker resolve these users' tokens from the database again;
+    also for writes that skip signals (queryset.update())
+    """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return
+    _bump(user_ids)
+    # Again once committed, so a worker that reloaded the old rows while
+    # this transaction was open does not keep them
+    transaction.on_commit(lambda: _bump(user_ids), using=using)
+
+
+def invalidate_user(user_id, using=None):
+    invalidate_users([user_id], using)
+
+
+def forget_cached():
+    """Drop this process's entries (tests roll the rows back underneath them)"""
+    with _lock:
+        _entries.clear()
+
+
+def _values(instance):
+    names = [field.attname for field in type(instance)._meta.concrete_fields]
+    return names, [getattr(instance, name) for name in names]
+
+
+def _instance(model, row):
+    names, values = row
+    # Fresh instances, so views can modify request.user freely
+    return model.from_db(router.db_for_read(model), names, copy.deepcopy(values))
+
+
+def _get(key):
+    """This process's entry for a token key, expired or not"""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+        return entry
+
+
+def _put(key, entry):
+    with _lock:
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > cache_size():
+            _entries.popitem(last=False)
+
+
+def _load(key):
+    """Entry for a token key from the database (one query), or None"""
+    token = Token.objects.select_related('user__profile').filter(key=key).first()
+    if token is None:
+        return None
+    user = token.user
+    try:
+        profile = _values(user.profile)
+    except UserProfile.DoesNotExist:
+        profile = None
+    return token, user, profile
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that serves resolved tokens from process memory"""
+
+    def authenticate_credentials(self, key):
+        entry = _get(key)
+        if entry is not None:
+            user_id = entry.user_id  # a token never changes user
+        else:
+            user_id = Token.objects.filter(key=key).values_list('user_id', flat=True).first()
+            if user_id is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        version = current_version(user_id)
+        if entry is None or entry.version != version or entry.expires <= time.monotonic():
+            # The stamp is read before the rows: a change from here on replaces it
+            loaded = _load(key)
+            if loaded is None:
+                with _lock:
+                    _entries.pop(key, None)
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            token, user, profile = loaded
+            entry = _Entry(user.pk, version, time.monotonic() + cache_timeout(), _values(token), _values(user), profile)
+            _put(key, entry)
+
+        user = _instance(User, entry.user)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        token = _instance(Token, entry.token)
+        token.user = user
+        User.auth_token.related.set_cached_value(user, token)
+        if entry.profile is None:
+            User.profile.related.set_cached_value(user, None)
+        else:
+            profile = _instance(UserProfile, entry.profile)
+            profile.user = user
+            User.profile.related.set_cached_value(user, profile)
+        return user, token
+
+
+@receiver([post_save, post_delete], sender=User, dispatch_uid='cached-token-auth:user')
+def _user_changed(sender, instance, using=None, created=False, **kwargs):
+    if not created:  # a new user has no tokens yet
+        invalidate_user(instance.pk, using)
+
+
+@receiver([post_save, post_delete], sender=UserProfile, dispatch_uid='cached-token-auth:profile')
+def _profile_changed(sender, instance, using=None, **kwargs):
+    invalidate_user(instance.user_id, using)
+
+
+@receiver([post_save, post_delete], sender=Token, dispatch_uid='cached-token-auth:token')
+def _token_changed(sender, instance, using=None, **kwargs):
+    invalidate_user(instance.user_id, using)
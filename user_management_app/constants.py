@@ -32,4 +32,9 @@ INTEREST_CHOICES = [
     ('baseball', 'Baseball'),
     ('soccer', 'Soccer'),
     ('custom', 'Custom'),
-]
\ No newline at end of file
+]
+OUTBOX_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('sent', 'Sent'),
+    ('failed', 'Failed'),
+]
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_management_app.outbox import poll_interval, queue_depth, send_all_due
+
+
+class Command(BaseCommand):
+    help = 'Send the due emails of the outbox (user_management_app/outbox.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, sending due emails every interval')
+        parser.add_argument('--interval', type=int, help='Seconds between runs with --loop (default: EMAIL_OUTBOX_POLL_INTERVAL)')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or poll_interval()
+        while True:
+            started = time.monotonic()
+            sent, failed = send_all_due()
+            depth = queue_depth()
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {sent}, failed {failed}; {depth['pending']} pending ({depth['due']} due, "
+                f"{depth['retrying']} retrying), {depth['failed']} given up"
+            ))
+            if not options['loop']:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management_app', '0005_userprofile_interests_userprofile_membership_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['user_status', 'role'], name='profile_status_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['membership_type', 'user_status'], name='profile_type_status_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Case-insensitive login lookups (LoginView): auth_user belongs to
+    django.contrib.auth, so its expression indexes are created here.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user_management_app', '0006_query_plan_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                'CREATE INDEX user_email_lower_idx ON auth_user (LOWER(email));',
+                'CREATE INDEX user_username_lower_idx ON auth_user (LOWER(username));',
+            ],
+            reverse_sql=[
+                'DROP INDEX user_email_lower_idx;',
+                'DROP INDEX user_username_lower_idx;',
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+from user_management_app.constants import INTEREST_CHOICES
+
+
+def backfill_interest_bits(apps, schema_editor):
+    """Set interest_bits from the interests JSON of the existing profiles (same as UserProfile.save)"""
+    UserProfile = apps.get_model('user_management_app', 'UserProfile')
+    bits = {interest: 1 << bit for bit, (interest, _) in enumerate(INTEREST_CHOICES)}
+    # {mask: [profile id]}: one UPDATE per distinct mask and 500 profiles
+    by_mask = {}
+    for pk, interests in UserProfile.objects.values_list('id', 'interests').iterator(chunk_size=2000):
+        mask = 0
+        for interest in interests if isinstance(interests, list) else []:
+            mask |= bits.get(interest, 0)
+        if mask:
+            by_mask.setdefault(mask, []).append(pk)
+    for mask, ids in by_mask.items():
+        for start in range(0, len(ids), 500):
+            UserProfile.objects.filter(id__in=ids[start:start + 500]).update(interest_bits=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management_app', '0008_email_outbox'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userprofile',
+            name='profile_status_role_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='userprofile',
+            name='profile_type_status_idx',
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='interest_bits',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_interest_bits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['user_status', 'id'], name='profile_status_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['membership_type', 'id'], name='profile_type_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['interest_bits', 'id'], name='profile_interests_idx'),
+        ),
+    ]
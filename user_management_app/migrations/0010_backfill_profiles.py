@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def backfill_profiles(apps, schema_editor):
+    """Give every user without a profile the one profiles.py now creates with each user"""
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('user_management_app', 'UserProfile')
+    missing = User.objects.exclude(id__in=UserProfile.objects.values('user_id')).values_list('id', flat=True)
+    created = UserProfile.objects.bulk_create(
+        (UserProfile(user_id=user_id, role='user') for user_id in missing.iterator(chunk_size=2000)),
+        batch_size=500,
+    )
+    if not created:
+        return
+
+    # bulk_create skips the dashboard counter signals: recount the member
+    # counters (same conditions as website_management_app/counters.py).
+    # Counters that were never stored are counted on first read anyway.
+    DashboardCounter = apps.get_model('website_management_app', 'DashboardCounter')
+    members = UserProfile.objects.exclude(role='admin')
+    counts = {
+        'members': members.count(),
+        'active_members': members.filter(user_status='accepted').count(),
+        'pending_members': members.filter(user_status='pending').count(),
+    }
+    for name, value in counts.items():
+        DashboardCounter.objects.filter(name=name).update(value=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user_management_app', '0009_member_interest_bits'),
+        ('website_management_app', '0023_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_profiles, migrations.RunPython.noop),
+    ]
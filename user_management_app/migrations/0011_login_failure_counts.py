@@ -0,0 +1,26 @@
+# Generated by Django 4.2.27 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management_app', '0010_backfill_profiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginFailureCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='scope:sha256(ident):bucket', max_length=100, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Login Failure Count',
+                'verbose_name_plural': 'Login Failure Counts',
+            },
+        ),
+    ]
@@ -1,13 +1,31 @@
 from django.db import models
+from django.utils import timezone
 from user_management_app.constants import (
     ROLE_CHOICES, 
     USER_STATUS_CHOICES, 
     MEMBERSHIP_STATUS_CHOICES,
-    MEMBERSHIP_TYPE_CHOICES
+    MEMBERSHIP_TYPE_CHOICES,
+    INTEREST_CHOICES,
+    OUTBOX_STATUS_CHOICES
 )
 # Create your models here.
 
 
+def interest_mask(interests):
+    """Bitmask of the known interests in a list (bit i: INTEREST_CHOICES[i]); unknown ones are ignored"""
+    mask = 0
+    for bit, (interest, _) in enumerate(INTEREST_CHOICES):
+        if interest in (interests or []):
+            mask |= 1 << bit
+    return mask
+
+
+def masks_with_any(interests):
+    """Every interest_bits value that has at least one of `interests`, for an indexed IN lookup"""
+    wanted = interest_mask(interests)
+    return [mask for mask in range(1 << len(INTEREST_CHOICES)) if mask & wanted]
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField('auth.User', on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=255, choices=ROLE_CHOICES)
@@ -21,11 +39,67 @@ class UserProfile(models.Model):
     membership_status = models.CharField(max_length=50, choices=MEMBERSHIP_STATUS_CHOICES, default='pending', blank=True, null=True)
     membership_type = models.CharField(max_length=50, choices=MEMBERSHIP_TYPE_CHOICES, blank=True, null=True)
     interests = models.JSONField(default=list, blank=True, help_text="Array of interests: football, basketball, hockey, baseball, soccer, custom")
-    
+    # interest_mask(interests), kept in step by save(); queryset.update(interests=...) must set it too
+    interest_bits = models.PositiveSmallIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
     class Meta:
         verbose_name = 'User Profile'
-        verbose_name_plural = 'User Profiles'
\ No newline at end of file
+        verbose_name_plural = 'User Profiles'
+        indexes = [
+            # Users and members by status, admins excluded (UsersListAPIView, dashboard counters);
+            # ending in id so MembersListAPIView's keyset pages are range scans in order
+            models.Index(fields=['user_status', 'id'], name='profile_status_id_idx'),
+            # Members by type (MembersListAPIView ?type=)
+            models.Index(fields=['membership_type', 'id'], name='profile_type_id_idx'),
+            # Members by interest (MembersListAPIView ?interests=, see masks_with_any)
+            models.Index(fields=['interest_bits', 'id'], name='profile_interests_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.interest_bits = interest_mask(self.interests)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'interests' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'interest_bits'}
+        super().save(*args, **kwargs)
+
+
+class OutboxEmail(models.Model):
+    """An email queued for the outbox worker, kept until sent or given up on (see outbox.py)"""
+    template = models.CharField(max_length=50, help_text="Key of outbox.EMAIL_TEMPLATES")
+    recipient = models.CharField(max_length=254)
+    context = models.JSONField(default=dict, blank=True, help_text="Template context; cleared once sent")
+    status = models.CharField(max_length=20, choices=OUTBOX_STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, blank=True, default='', help_text="Batch currently sending this email")
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Outbox Emails'
+        indexes = [
+            # Due emails, oldest first (outbox.send_due)
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.template} to {self.recipient} ({self.get_status_display()})"
+
+
+class LoginFailureCount(models.Model):
+    """Failed logins of one client IP or identity in one throttle window bucket (see throttling.py)"""
+    key = models.CharField(max_length=100, unique=True, help_text="scope:sha256(ident):bucket")
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Login Failure Count'
+        verbose_name_plural = 'Login Failure Counts'
+
+    def __str__(self):
+        return f"{self.key}: {self.count}"
@@ -0,0 +1,221 @@
+"""
+Durable email outbox.
+
+enqueue() (enqueue_many() for a batch) stores OutboxEmail rows in the
+caller's transaction: an email exists exactly when the change that
+triggered it is committed, and it is not lost if the process dies before
+sending. send_due() claims a batch of up to EMAIL_OUTBOX_BATCH_SIZE due
+emails, renders their templates and sends them over one SMTP connection
+(get_connection()). A failed email is retried after EMAIL_OUTBOX_RETRY_DELAY
+seconds, doubling with every attempt, and is marked failed after
+EMAIL_OUTBOX_MAX_ATTEMPTS attempts.
+
+send_due() runs in:
+- one background thread per process (EMAIL_OUTBOX_IN_PROCESS), started by
+  the first committed enqueue(), woken by later ones and otherwise polling
+  every EMAIL_OUTBOX_POLL_INTERVAL seconds;
+- `manage.py send_outbox --loop`, a dedicated worker that also picks up
+  emails left behind by processes that exited.
+
+Claims are leases: a batch moves its emails' next attempt
+EMAIL_OUTBOX_LEASE seconds ahead so no other worker sends them meanwhile;
+emails of a worker that dies mid-batch are retried once the lease runs out.
+"""
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.db.models import Count, Min, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+# key: (subject, template)
+EMAIL_TEMPLATES = {
+    'password_reset': ('Password Reset', 'emails/forget_password.html'),
+    'accept_reject': ('User Profile', 'emails/accept_reject_user.html'),
+}
+
+
+def batch_size():
+    return getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+
+
+def max_attempts():
+    return getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+
+
+def retry_delay(attempts):
+    """Seconds before the next try of an email that has failed `attempts` times"""
+    return getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60) * 2 ** (attempts - 1)
+
+
+def lease():
+    return getattr(settings, 'EMAIL_OUTBOX_LEASE', 5 * 60)
+
+
+def poll_interval():
+    return getattr(settings, 'EMAIL_OUTBOX_POLL_INTERVAL', 30)
+
+
+def enqueue(template, recipient, context=None, using=None):
+    """Queue an email; returns the OutboxEmail, or None without a recipient"""
+    if template not in EMAIL_TEMPLATES:
+        raise ValueError(f'Unknown email template: {template}')
+    if not recipient:
+        logger.warning('Email %s not queued: no recipient', template)
+        return None
+    email = OutboxEmail.objects.using(using).create(template=template, recipient=recipient, context=context or {})
+    if getattr(settings, 'EMAIL_OUTBOX_IN_PROCESS', True):
+        transaction.on_commit(wake, using=using)
+    return email
+
+
+def enqueue_many(template, messages, using=None):
+    """Queue one email per (recipient, context) with a single INSERT; returns the OutboxEmails"""
+    if template not in EMAIL_TEMPLATES:
+        raise ValueError(f'Unknown email template: {template}')
+    emails = OutboxEmail.objects.using(using).bulk_create([
+        OutboxEmail(template=template, recipient=recipient, context=context or {})
+        for recipient, context in messages if recipient
+    ], batch_size=500)
+    if emails and getattr(settings, 'EMAIL_OUTBOX_IN_PROCESS', True):
+        transaction.on_commit(wake, using=using)
+    return emails
+
+
+def render(email):
+    """The EmailMultiAlternatives for an outbox row"""
+    subject, template_name = EMAIL_TEMPLATES[email.template]
+    html = render_to_string(template_name, {'email': email.recipient, **email.context, 'year': timezone.now().year})
+    message = EmailMultiAlternatives(subject, strip_tags(html), f'"ProSix" <{settings.EMAIL_HOST_USER}>', [email.recipient])
+    message.attach_alternative(html, 'text/html')
+    return message
+
+
+def _claim(limit):
+    now = timezone.now()
+    due = OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at', 'id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    claim = uuid.uuid4().hex
+    # Rows another worker claimed in between no longer match `due`
+    due.filter(id__in=ids).update(claim=claim, next_attempt_at=now + timedelta(seconds=lease()))
+    return list(OutboxEmail.objects.filter(claim=claim).order_by('id'))
+
+
+def _sent(email):
+    OutboxEmail.objects.filter(pk=email.pk, claim=email.claim).update(
+        status='sent', sent_at=timezone.now(), attempts=email.attempts + 1, claim='', last_error='',
+        context={},  # may hold a password (password_reset)
+    )
+
+
+def _failed(email, error):
+    attempts = email.attempts + 1
+    changes = {'attempts': attempts, 'claim': '', 'last_error': f'{type(error).__name__}: {error}'}
+    if attempts >= max_attempts():
+        changes['status'] = 'failed'
+        changes['context'] = {}  # may hold a password (password_reset); never sent now
+        logger.error('Email #%s to %s failed %s times, giving up: %s', email.pk, email.recipient, attempts, error)
+    else:
+        changes['next_attempt_at'] = timezone.now() + timedelta(seconds=retry_delay(attempts))
+        logger.warning('Email #%s to %s failed (attempt %s), retrying: %s', email.pk, email.recipient, attempts, error)
+    OutboxEmail.objects.filter(pk=email.pk, claim=email.claim).update(**changes)
+
+
+def send_due(limit=None):
+    """Send one batch of due emails over one SMTP connection; returns (sent, failed)"""
+    batch = _claim(limit or batch_size())
+    if not batch:
+        return 0, 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            _failed(email, e)
+        return 0, len(batch)
+
+    sent = failed = 0
+    try:
+        for email in batch:
+            try:
+                message = render(email)
+                message.connection = connection
+                message.send()
+            except Exception as e:
+                _failed(email, e)
+                failed += 1
+                # The server may have dropped the connection: start the rest on a new one
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+            else:
+                _sent(email)
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_all_due():
+    """send_due() until no due emails are left; returns (sent, failed)"""
+    sent = failed = 0
+    while True:
+        batch_sent, batch_failed = send_due()
+        sent += batch_sent
+        failed += batch_failed
+        if batch_sent + batch_failed < batch_size():
+            return sent, failed
+
+
+def queue_depth():
+    """Counts of queued emails, and when the oldest pending one was queued"""
+    now = timezone.now()
+    return OutboxEmail.objects.exclude(status='sent').aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        due=Count('id', filter=Q(status='pending', next_attempt_at__lte=now)),
+        retrying=Count('id', filter=Q(status='pending', attempts__gt=0)),
+        failed=Count('id', filter=Q(status='failed')),
+        oldest_pending_at=Min('created_at', filter=Q(status='pending')),
+    )
+
+
+_wake = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def wake():
+    """Have this process's outbox thread send due emails now (starting it if needed)"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='email-outbox', daemon=True)
+            _worker.start()
+    _wake.set()
+
+
+def _run():
+    while True:
+        _wake.wait(poll_interval())
+        _wake.clear()
+        try:
+            send_all_due()
+        except Exception:
+            logger.exception('Email outbox worker error')
+        finally:
+            connections.close_all()
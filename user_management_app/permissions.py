@@ -0,0 +1,20 @@
+from rest_framework.permissions import BasePermission
+
+from .models import UserProfile
+
+
+class IsAdminMember(BasePermission):
+    """Staff users, or users whose profile role is admin"""
+    message = 'Only admins can do this.'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff:
+            return True
+        # request.user arrives with its profile attached (see authentication.py)
+        try:
+            return user.profile.role == 'admin'
+        except UserProfile.DoesNotExist:
+            return False
@@ -0,0 +1,25 @@
+"""
+Every user has a UserProfile.
+
+A profile (role 'user', pending) is created with each new user, in the same
+transaction, however the user is created (sign-up, admin, createsuperuser,
+shell). Readers can rely on user.profile and select_related('profile')
+without a fallback, and serializing a user never writes. Users created
+before this was in place got theirs from migration 0010_backfill_profiles.
+
+Code that creates a user and sets up its profile updates user.profile
+instead of creating a second one.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import UserProfile
+
+
+@receiver(post_save, sender=User, dispatch_uid='profiles:create')
+def _create_profile(sender, instance, created, raw=False, using=None, **kwargs):
+    if not created or raw:  # raw: fixtures bring their own profiles
+        return
+    profile, _ = UserProfile.objects.using(using).get_or_create(user=instance, defaults={'role': 'user'})
+    User.profile.related.set_cached_value(instance, profile)
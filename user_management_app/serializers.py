@@ -7,7 +7,7 @@ from django.conf import settings
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
-        fields ='__all__'
+        exclude = ['interest_bits']
     
     def to_representation(self, instance):
         """Override to return full URL for logo"""
@@ -29,8 +29,10 @@ class DefaulttUserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'user_profile', 'is_active', 'is_staff', 'is_superuser']
 
     def get_user_profile(self, instance):
-        exisiting_obj = UserProfile.objects.filter(user=instance).first()
-        if not exisiting_obj:
-            exisiting_obj = UserProfile.objects.create(user=instance, role='user')
-        
-        return UserProfileSerializer(exisiting_obj).data
+        # Every user has a profile (see profiles.py); lists load it with
+        # select_related('profile') and request.user arrives with it attached
+        try:
+            profile = instance.profile
+        except UserProfile.DoesNotExist:
+            return None
+        return UserProfileSerializer(profile).data
@@ -1,3 +1,632 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from prosix.query_plans import QueryPlanAssertions
+from prosix.smtp_stub import LocalSMTPServer
+from . import outbox
+from .models import UserProfile, OutboxEmail
+from .serializers import DefaulttUserSerializer
+
+
+class QueryPlanTests(QueryPlanAssertions, TestCase):
+    """Member and user lists filter profiles through an index (see prosix/query_plans.py)."""
+
+    def setUp(self):
+        for i, status in enumerate(['pending', 'accepted', 'rejected'] * 5):
+            user = User.objects.create_user(username=f'member{i}', password='secret123')
+            UserProfile.objects.update_or_create(user=user, defaults={'role': 'user', 'user_status': status, 'membership_type': 'team'})
+
+    def test_profiles_by_status(self):
+        profiles = UserProfile.objects.filter(user_status='pending').exclude(role='admin')
+        self.assertIndexed(profiles)
+        # UserStatusListView
+        self.assertIndexed(User.objects.filter(profile__user_status='pending').exclude(profile__role='admin').select_related('profile'))
+
+    def test_profiles_by_type(self):
+        self.assertIndexed(UserProfile.objects.filter(membership_type='team').exclude(role='admin'))
+        self.assertIndexed(UserProfile.objects.filter(membership_type='team', user_status='accepted'))
+
+    def test_profiles_by_interest(self):
+        from .models import masks_with_any
+        self.assertIndexed(UserProfile.objects.filter(interest_bits__in=masks_with_any(['hockey', 'soccer'])).exclude(role='admin'))
+
+    def test_login_lookup(self):
+        from django.db.models import Q
+        from django.db.models.functions import Lower
+        users = User.objects.alias(email_lower=Lower('email'), username_lower=Lower('username'))
+        self.assertIndexed(users.filter(Q(email_lower='member1') | Q(username_lower='member1')).select_related('profile', 'auth_token'))
+
+
+class UserListSerializationTests(TestCase):
+    """Users get their profile when created; listing them is one joined query and never writes."""
+
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_user(username='admin', password='secret123')
+        UserProfile.objects.filter(user=admin).update(role='admin', user_status='accepted')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        for i in range(30):
+            User.objects.create_user(username=f'member{i}', password='secret123')
+
+    def test_profile_created_with_user(self):
+        user = User.objects.create_user(username='new', password='secret123')
+
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual((profile.role, profile.user_status), ('user', 'pending'))
+        with self.assertNumQueries(0):
+            self.assertEqual(user.profile, profile)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for limit in (5, 25):
+            cache.clear()
+            # COUNT(*) and the page, joined with the profiles
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/api/UserStatusList/?status=pending&limit={limit}')
+            results = response.data['results']
+            self.assertEqual(len(results), limit)
+            self.assertEqual(response.data['count'], 30)
+            self.assertEqual(results[0]['username'], 'member29')
+            self.assertEqual(results[0]['user_profile']['user_status'], 'pending')
+
+    def test_admins_and_other_statuses_are_excluded(self):
+        UserProfile.objects.filter(user__username='member0').update(user_status='accepted')
+        response = self.client.get('/api/UserStatusList/?status=accepted')
+
+        self.assertEqual([user['username'] for user in response.data['results']], ['member0'])
+
+    def test_serializer_never_writes(self):
+        user = User.objects.get(username='member0')
+        UserProfile.objects.filter(user=user).delete()
+        user = User.objects.get(pk=user.pk)
+
+        data = DefaulttUserSerializer(user).data
+        self.assertIsNone(data['user_profile'])
+        self.assertFalse(UserProfile.objects.filter(user=user).exists())
+
+    def test_backfill_recounts_member_counters(self):
+        from importlib import import_module
+        from django.apps import apps
+        from website_management_app.counters import count, reconcile, stored_counters
+        reconcile()
+        # A user from before profiles were created with every user
+        UserProfile.objects.filter(user__username='member0').delete()
+
+        import_module('user_management_app.migrations.0010_backfill_profiles').backfill_profiles(apps, None)
+
+        self.assertTrue(UserProfile.objects.filter(user__username='member0').exists())
+        stored = stored_counters()
+        for name in ('members', 'active_members', 'pending_members'):
+            self.assertEqual(stored[name], count(name), name)
+
+
+class MembersExportTests(TestCase):
+    """The members export streams the same rows the members list returns."""
+
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', password='secret123')
+        UserProfile.objects.update_or_create(user=admin, defaults={'role': 'admin', 'user_status': 'accepted'})
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        for i, interests in enumerate([['football'], ['hockey', 'soccer'], []]):
+            user = User.objects.create_user(username=f'member{i}', password='secret123')
+            UserProfile.objects.update_or_create(user=user, defaults={'role': 'user', 'user_status': 'accepted', 'membership_type': 'team', 'interests': interests})
+
+    def test_csv_matches_list(self):
+        response = self.client.get('/api/Members/export/?interests=hockey,football')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+
+        listed = self.client.get('/api/Members/?interests=hockey,football').data['response']['data']
+        self.assertEqual([row['username'] for row in rows], [member['username'] for member in listed])
+        self.assertEqual([row['username'] for row in rows], ['member1', 'member0'])
+        self.assertEqual(rows[0]['interests'], 'hockey,soccer')
+
+    def test_ndjson(self):
+        response = self.client.get('/api/Members/export/?export_format=ndjson&type=team')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1]['username'], 'member0')
+        self.assertEqual(rows[-1]['interests'], ['football'])
+
+
+class MembersListTests(TestCase):
+    """Members are filtered in SQL and listed in keyset pages."""
+
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_user(username='admin', password='secret123')
+        UserProfile.objects.update_or_create(user=admin, defaults={'role': 'admin', 'user_status': 'accepted', 'interests': ['hockey']})
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        cycle = [['football'], ['hockey', 'soccer'], [], ['custom', 'unknown']]
+        for i in range(12):
+            user = User.objects.create_user(username=f'member{i}', password='secret123')
+            UserProfile.objects.update_or_create(user=user, defaults={
+                'role': 'user', 'user_status': 'accepted' if i % 3 else 'pending',
+                'membership_type': 'team', 'interests': cycle[i % 4],
+            })
+
+    def _data(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data['response']
+
+    def test_interest_bits_follow_interests(self):
+        profile = UserProfile.objects.get(user__username='member1')
+        self.assertEqual(profile.interest_bits, 0b10100)
+        profile.interests = ['custom']
+        profile.save(update_fields=['interests'])
+        profile.refresh_from_db()
+        self.assertEqual(profile.interest_bits, 0b100000)
+
+    def test_filters_run_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self._data('/api/Members/?interests=hockey,custom&status=accepted&limit=100')
+
+        expected = [f'member{i}' for i in (11, 7, 5, 1)]
+        self.assertEqual([member['username'] for member in data['data']], expected)
+        self.assertEqual(data['count'], 4)
+        self.assertIsNone(data['next'])
+        self.assertEqual(data['data'][0]['interests'], ['custom', 'unknown'])
+        page_query = queries.captured_queries[0]['sql']
+        self.assertIn('interest_bits', page_query)
+        self.assertIn('LIMIT 101', page_query)
+
+    def test_keyset_pages(self):
+        expected = [f'member{i}' for i in range(11, -1, -1)]
+        seen = []
+        url = '/api/Members/?type=team&limit=5'
+        pages = 0
+        while url:
+            data = self._data(url)
+            seen.extend(member['username'] for member in data['data'])
+            self.assertEqual(data['count'], 12)
+            url = data['next']
+            pages += 1
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+
+    def test_deep_pages_cost_the_same(self):
+        first = self._data('/api/Members/?limit=2')
+        with CaptureQueriesContext(connection) as shallow:
+            second = self._data(first['next'])
+        url = second['next']
+        for _ in range(3):
+            url = self._data(url)['next']
+        with CaptureQueriesContext(connection) as deep:
+            self._data(url)
+
+        self.assertEqual(len(shallow), len(deep))
+        self.assertFalse(any('OFFSET' in query['sql'] or 'COUNT' in query['sql'] for query in deep.captured_queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/Members/?cursor=bogus')
+        self.assertEqual(response.status_code, 400)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Resolved tokens are reused until the user, profile or token changes."""
+
+    def setUp(self):
+        from rest_framework.authtoken.models import Token
+        from .authentication import forget_cached
+        forget_cached()
+        self.user = User.objects.create_user(username='member', password='secret123')
+        UserProfile.objects.update_or_create(user=self.user, defaults={'role': 'user', 'user_status': 'accepted'})
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _profile(self, client=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = (client or self.client).get('/api/GetProfile')
+        return response, len(ctx.captured_queries)
+
+    def test_cached_request_runs_no_queries(self):
+        response, first = self._profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(first, 2)  # the token's user id (for its stamp), then token, user and profile in one query
+
+        response, second = self._profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(second, 0)
+        self.assertEqual(response.data['response']['data']['user_profile']['user_status'], 'accepted')
+
+    def test_logout(self):
+        self._profile()
+        response = self.client.post('/api/Logout/')
+        self.assertEqual(response.status_code, 200)
+
+        response, _ = self._profile()
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_change(self):
+        self._profile()
+        response = self.client.post('/api/ChangePassword/', {
+            'current_password': 'secret123', 'new_password': 'newsecret456', 'confirm_new_password': 'newsecret456',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        _, queries = self._profile()
+        self.assertEqual(queries, 1)
+
+    def test_deactivated_by_admin(self):
+        from rest_framework.authtoken.models import Token
+        admin = User.objects.create_user(username='admin', password='secret123')
+        UserProfile.objects.update_or_create(user=admin, defaults={'role': 'admin', 'user_status': 'accepted'})
+        admin_client = APIClient()
+        admin_client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin).key}')
+        self._profile()
+
+        response = admin_client.patch(f'/api/AcceptRejectUser/{self.user.id}/', {'is_active': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response, _ = self._profile()
+        self.assertEqual(response.status_code, 401)
+
+    def test_change_in_another_worker(self):
+        from .authentication import _bump
+        self._profile()
+        # Another process saved the user: only the shared stamp changes here
+        User.objects.filter(pk=self.user.pk).update(first_name='Changed')
+        _bump([self.user.pk])
+
+        response, queries = self._profile()
+        self.assertEqual(queries, 1)
+        self.assertEqual(response.data['response']['data']['first_name'], 'Changed')
+
+    def test_bounded_and_expiring(self):
+        from rest_framework.authtoken.models import Token
+        from . import authentication
+        clients = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'other{i}', password='secret123')
+            UserProfile.objects.update_or_create(user=user, defaults={'role': 'user', 'user_status': 'accepted'})
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+            clients.append(client)
+
+        with self.settings(AUTH_TOKEN_CACHE_SIZE=2):
+            for client in clients:
+                self._profile(client)
+            self.assertEqual(len(authentication._entries), 2)
+
+        with self.settings(AUTH_TOKEN_CACHE_TIMEOUT=0):
+            self._profile()
+            _, queries = self._profile()
+        self.assertEqual(queries, 1)
+
+
+    @override_settings(AUTH_STAMP_BUCKETS=2)
+    def test_stamps_are_bucketed(self):
+        from django.core.cache import caches
+        from rest_framework.authtoken.models import Token
+        clients = {}
+        for offset in (1, 2, 3):
+            other = User.objects.create_user(id=self.user.pk + offset, username=f'other{offset}', password='secret123')
+            clients[offset] = APIClient()
+            clients[offset].credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        caches['shared'].clear()
+        for _ in range(3):
+            self._profile()
+            for client in clients.values():
+                self._profile(client)
+
+        # One stamp per bucket, however many users
+        self.assertEqual(len(caches['shared']._list_cache_files()), 2)
+        # Changing a user of the other bucket leaves this user's entry alone
+        User.objects.get(pk=self.user.pk + 1).save()
+        self.assertEqual(self._profile()[1], 0)
+        self.assertEqual(self._profile(clients[1])[1], 1)
+        # A user of the same bucket reloads it once
+        User.objects.get(pk=self.user.pk + 2).save()
+        self.assertEqual(self._profile()[1], 1)
+        self.assertEqual(self._profile()[1], 0)
+
+
+class LoginTests(TestCase):
+    """Login looks users up case-insensitively in one query and throttles failures."""
+
+    def setUp(self):
+        from django.core.cache import caches
+        from rest_framework.authtoken.models import Token
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='Member', email='Member@Example.com', password='secret123')
+        UserProfile.objects.update_or_create(user=self.user, defaults={'role': 'user', 'user_status': 'accepted'})
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+
+    def _login(self, identity, password='secret123', **extra):
+        return self.client.post('/api/Login/', {'email': identity, 'password': password}, format='json', **extra)
+
+    def test_case_insensitive_single_query(self):
+        for identity in ('member', 'MEMBER', 'member@example.com', ' Member@Example.com '):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self._login(identity)
+            self.assertEqual(response.status_code, 200, identity)
+            self.assertEqual(response.data['response']['access_token'], self.token.key)
+            self.assertEqual(response.data['response']['data']['user_profile']['user_status'], 'accepted')
+            # The throttle counters, then the user with profile and token
+            self.assertEqual(len(ctx.captured_queries), 2, identity)
+            self.assertIn('auth_user', ctx.captured_queries[1]['sql'])
+
+    def test_prefers_exact_spelling(self):
+        other = User.objects.create_user(username='member', password='other123')
+        UserProfile.objects.update_or_create(user=other, defaults={'role': 'user', 'user_status': 'accepted'})
+
+        self.assertEqual(self._login('member', 'other123').status_code, 200)
+        self.assertEqual(self._login('Member').status_code, 200)
+
+    def test_identity_throttled_before_hashing(self):
+        from unittest import mock
+        with self.settings(LOGIN_THROTTLE_IDENTITY_FAILURES=3):
+            for _ in range(3):
+                self.assertEqual(self._login('member', 'wrong').status_code, 403)
+            with mock.patch.object(User, 'check_password') as check_password:
+                response = self._login('MEMBER')
+            check_password.assert_not_called()
+            self.assertEqual(response.status_code, 429)
+            self.assertGreater(int(response['Retry-After']), 0)
+
+            # Another identity from another address is unaffected
+            self.assertEqual(self._login('nobody', REMOTE_ADDR='10.0.0.2').status_code, 404)
+
+    def test_ip_throttled(self):
+        with self.settings(LOGIN_THROTTLE_IP_FAILURES=3):
+            for i in range(3):
+                self._login(f'nobody{i}')
+            self.assertEqual(self._login('member').status_code, 429)
+            self.assertEqual(self._login('member', REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_lockout_survives_other_failures(self):
+        from django.core.cache import caches
+        from .models import LoginFailureCount
+        with self.settings(LOGIN_THROTTLE_IDENTITY_FAILURES=3, LOGIN_THROTTLE_IP_FAILURES=1000):
+            for _ in range(3):
+                self._login('member', 'wrong')
+            # Failures for many other identities and addresses, and a full shared cache
+            for i in range(400):
+                self._login(f'nobody{i}', REMOTE_ADDR=f'10.0.{i // 250}.{i % 250}')
+            caches['shared'].set_many({f'filler:{i}': i for i in range(400)})
+
+            self.assertEqual(self._login('member').status_code, 429)
+            self.assertEqual(self._login('member', REMOTE_ADDR='10.9.9.9').status_code, 429)
+        self.assertEqual(sorted(LoginFailureCount.objects.filter(count__gt=1).values_list('count', flat=True)), [3, 3])  # the identity and its IP
+
+    def test_success_clears_identity_failures(self):
+        with self.settings(LOGIN_THROTTLE_IDENTITY_FAILURES=3):
+            for _ in range(2):
+                self._login('member', 'wrong')
+            self.assertEqual(self._login('member').status_code, 200)
+            for _ in range(2):
+                self._login('member', 'wrong')
+            self.assertEqual(self._login('member').status_code, 200)
+
+
+@override_settings(EMAIL_OUTBOX_RETRY_DELAY=60, EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_BATCH_SIZE=50)
+class EmailOutboxTests(TestCase):
+    """Emails are stored with the change that triggers them and sent in batches with retries."""
+
+    def setUp(self):
+        self.server = LocalSMTPServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        email_settings = override_settings(**self.server.email_settings())
+        email_settings.enable()
+        self.addCleanup(email_settings.disable)
+
+    def _queue(self, count):
+        return [
+            outbox.enqueue('accept_reject', f'member{i}@example.com', {'message': 'Welcome', 'status': 'Your profile is accepted'})
+            for i in range(count)
+        ]
+
+    def test_batch_over_one_connection(self):
+        self._queue(3)
+
+        self.assertEqual(outbox.send_due(), (3, 0))
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual([m['To'] for m in self.server.messages], [f'member{i}@example.com' for i in range(3)])
+        message = self.server.messages[0]
+        self.assertEqual(message['Subject'], 'User Profile')
+        self.assertIn('Your profile is accepted', message.get_body(('html',)).get_content())
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(outbox.send_due(), (0, 0))
+
+    def test_retry_with_backoff(self):
+        failing, ok = self._queue(2)
+        self.server.fail_next(1)
+
+        with self.assertLogs('user_management_app.outbox', 'WARNING') as logs:
+            self.assertEqual(outbox.send_due(), (1, 1))
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertIn(f'Email #{failing.pk} to member0@example.com failed (attempt 1), retrying', logs.output[0])
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('pending', 1))
+        self.assertIn('451', failing.last_error)
+        self.assertGreater(failing.next_attempt_at, timezone.now() + timedelta(seconds=55))
+        self.assertEqual(outbox.queue_depth()['retrying'], 1)
+        self.assertEqual(outbox.send_due(), (0, 0))  # not due yet
+
+        OutboxEmail.objects.filter(pk=failing.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.send_due(), (1, 0))
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts, failing.context), ('sent', 2, {}))
+
+    def test_gives_up(self):
+        email = outbox.enqueue('password_reset', 'member@example.com', {'password': 'Temp-1234'})
+        self.server.fail_next(10)
+        with self.assertLogs('user_management_app.outbox', 'WARNING') as logs:
+            for _ in range(3):
+                outbox.send_due()
+                OutboxEmail.objects.filter(pk=email.pk, status='pending').update(next_attempt_at=timezone.now())
+
+        self.assertEqual([r.levelname for r in logs.records], ['WARNING', 'WARNING', 'ERROR'])
+        self.assertIn(f'Email #{email.pk} to member@example.com failed (attempt 2), retrying', logs.output[1])
+        self.assertIn(f'Email #{email.pk} to member@example.com failed 3 times, giving up', logs.output[2])
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+        # The password is not kept once the email is given up on
+        self.assertEqual(email.context, {})
+        depth = outbox.queue_depth()
+        self.assertEqual((depth['pending'], depth['failed']), (0, 1))
+
+    def test_claimed_emails_are_not_sent_twice(self):
+        self._queue(2)
+        claimed = outbox._claim(10)
+
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(outbox.send_due(), (0, 0))
+
+    def test_forgot_password(self):
+        user = User.objects.create_user(username='member', email='member@example.com', password='secret123')
+        response = self.client.post('/api/ForgotPassword/', {'email': 'member@example.com'})
+        self.assertEqual(response.status_code, 200)
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.template, email.recipient), ('password_reset', 'member@example.com'))
+        user.refresh_from_db()
+        self.assertTrue(user.check_password(email.context['password']))
+
+        outbox.send_due()
+        self.assertIn(email.context['password'], self.server.messages[0].get_body(('html',)).get_content())
+
+    def test_signup_and_status(self):
+        with self.settings(EMAIL_HOST_USER='admin@prosix.test'):
+            response = self.client.post('/api/SignUp/', {
+                'first_name': 'New', 'email': 'new@example.com', 'username': 'new',
+                'password': 'secret123', 'confirm_password': 'secret123',
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(OutboxEmail.objects.values_list('recipient', flat=True)), ['admin@prosix.test', 'new@example.com'])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='new'))
+        data = client.get('/api/EmailOutbox/').data['response']['data']
+        self.assertEqual((data['pending'], data['due'], data['failed']), (2, 2, 0))
+
+
+class BulkAcceptRejectTests(TestCase):
+    """Bulk moderation updates every user with set-based queries and queues their emails together."""
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        self.admin = User.objects.create_user(username='admin', password='secret123')
+        UserProfile.objects.filter(user=self.admin).update(role='admin', user_status='accepted')
+        self.admin = User.objects.select_related('profile').get(pk=self.admin.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.pending = [
+            User.objects.create_user(username=f'member{i}', email=f'member{i}@example.com', password='secret123', is_active=False)
+            for i in range(3)
+        ]
+
+    def _moderate(self, user_ids, user_status='accepted', **extra):
+        return self.client.post('/api/AcceptRejectUser/bulk/', {'user_ids': user_ids, 'user_status': user_status, **extra}, format='json')
+
+    def test_results_per_id(self):
+        accepted = User.objects.create_user(username='accepted', password='secret123')
+        UserProfile.objects.filter(user=accepted).update(user_status='accepted')
+        ids = [self.pending[1].id, accepted.id, self.admin.id, 999999, self.pending[0].id, self.pending[1].id]
+
+        response = self._moderate(ids)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['response']['data'], [
+            {'id': self.pending[1].id, 'result': 'updated'},
+            {'id': accepted.id, 'result': 'unchanged'},
+            {'id': self.admin.id, 'result': 'skipped'},
+            {'id': 999999, 'result': 'not_found'},
+            {'id': self.pending[0].id, 'result': 'updated'},
+        ])
+        self.assertEqual(
+            set(UserProfile.objects.filter(user_status='accepted').values_list('user__username', flat=True)),
+            {'admin', 'accepted', 'member0', 'member1'},
+        )
+        self.assertEqual(set(User.objects.filter(is_active=True).values_list('username', flat=True)), {'admin', 'accepted', 'member0', 'member1'})
+        emails = OutboxEmail.objects.order_by('recipient')
+        self.assertEqual([email.recipient for email in emails], ['member0@example.com', 'member1@example.com'])
+        self.assertEqual(emails[0].context['status'], 'Your profile is accepted')
+
+        # Retrying the same call changes nothing and sends nothing
+        self._moderate(ids)
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    def test_reject_with_message(self):
+        User.objects.filter(pk=self.pending[0].pk).update(is_active=True)
+        self._moderate([self.pending[0].id], 'rejected', message='Please use your club email.')
+
+        self.assertFalse(User.objects.get(pk=self.pending[0].pk).is_active)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.context, {'message': 'Please use your club email.', 'status': 'Your profile is rejected'})
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        from website_management_app.counters import reconcile
+        reconcile()
+        with CaptureQueriesContext(connection) as small:
+            self._moderate([self.pending[0].id])
+        more = [User.objects.create_user(username=f'more{i}', email=f'more{i}@example.com').id for i in range(20)]
+        with CaptureQueriesContext(connection) as large:
+            self._moderate(more + [self.pending[1].id])
+
+        self.assertEqual(len(small), len(large))
+
+    def test_dashboard_counters_follow(self):
+        from website_management_app.counters import count, reconcile, stored_counters
+        reconcile()
+        self._moderate([user.id for user in self.pending[:2]])
+        self._moderate([self.pending[0].id], 'rejected')
+
+        stored = stored_counters()
+        for name in ('members', 'active_members', 'pending_members'):
+            self.assertEqual(stored[name], count(name), name)
+        self.assertEqual((stored['active_members'], stored['pending_members']), (1, 1))
+
+    def test_cached_tokens_are_refreshed(self):
+        from rest_framework.authtoken.models import Token
+        user = self.pending[0]
+        self._moderate([user.id])
+        token = Token.objects.create(user=user)
+        member = APIClient()
+        member.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(member.get('/api/GetProfile').status_code, 200)
+
+        self._moderate([user.id], 'rejected')
+        self.assertEqual(member.get('/api/GetProfile').status_code, 401)
+
+    def test_admins_only(self):
+        member = self.pending[2]
+        User.objects.filter(pk=member.pk).update(is_active=True)
+        UserProfile.objects.filter(user=member).update(user_status='accepted')
+        self.client.force_authenticate(User.objects.get(pk=member.pk))
+
+        response = self._moderate([user.id for user in self.pending[:2]])
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(UserProfile.objects.filter(user__in=self.pending[:2], user_status='accepted').exists())
+
+        staff = User.objects.create_user(username='staff', password='secret123', is_staff=True)
+        self.client.force_authenticate(staff)
+        self.assertEqual(self._moderate([self.pending[0].id]).status_code, 200)
+
+    def test_invalid_requests(self):
+        for body in (
+            {'user_ids': [1], 'user_status': 'pending'},
+            {'user_ids': [], 'user_status': 'accepted'},
+            {'user_ids': ['x'], 'user_status': 'accepted'},
+            {'user_ids': list(range(501)), 'user_status': 'accepted'},
+        ):
+            response = self.client.post('/api/AcceptRejectUser/bulk/', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
@@ -0,0 +1,97 @@
+"""
+Sliding-window limits on failed logins, per client IP and per identity.
+
+Counters are LoginFailureCount rows, so every worker sees the same numbers,
+nothing evicts them early (a culling cache would let an attacker flush a
+lockout by failing logins for other identities), and a failure is counted
+with one atomic `count = count + 1` UPDATE. Each scope keeps one counter per
+LOGIN_THROTTLE_WINDOW-second bucket; the current estimate is the current
+bucket plus the part of the previous one that still overlaps the window.
+Expired rows are deleted as new failures come in.
+
+LoginView checks the limits before it looks the user up, so a throttled
+attempt never reaches the password hasher.
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from .models import LoginFailureCount
+
+
+def window():
+    return getattr(settings, 'LOGIN_THROTTLE_WINDOW', 15 * 60)
+
+
+def limits():
+    """{scope: failed attempts allowed per window}"""
+    return {
+        'ip': getattr(settings, 'LOGIN_THROTTLE_IP_FAILURES', 50),
+        'identity': getattr(settings, 'LOGIN_THROTTLE_IDENTITY_FAILURES', 5),
+    }
+
+
+def _increment(key):
+    counters = LoginFailureCount.objects.filter(key=key)
+    if counters.update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            # Kept for two windows: the next bucket still counts part of this one
+            LoginFailureCount.objects.create(key=key, count=1, expires_at=timezone.now() + timedelta(seconds=2 * window()))
+    except IntegrityError:
+        # Another request created it first
+        counters.update(count=F('count') + 1)
+
+
+class LoginThrottle:
+    """Failed-login counters for one request's client IP and the identity it logs in as"""
+
+    def __init__(self, request, identity):
+        self.idents = {
+            # Hashed: identities are e-mail addresses, and both fit the key column
+            'ip': hashlib.sha256(BaseThrottle().get_ident(request).encode()).hexdigest(),
+            'identity': hashlib.sha256(identity.encode()).hexdigest(),
+        }
+        # Counter keys retry_after() found, so succeeded() only writes when there is something to clear
+        self._found = set()
+
+    def _key(self, scope, bucket):
+        return f'{scope}:{self.idents[scope]}:{bucket}'
+
+    def retry_after(self):
+        """Seconds to wait when a limit is reached, else 0"""
+        now = time.time()
+        size = window()
+        bucket, elapsed = divmod(now, size)
+        bucket = int(bucket)
+        keys = {scope: (self._key(scope, bucket - 1), self._key(scope, bucket)) for scope in self.idents}
+        counts = dict(
+            LoginFailureCount.objects.filter(key__in=[key for pair in keys.values() for key in pair])
+            .values_list('key', 'count')
+        )
+        self._found = set(counts)
+        for scope, limit in limits().items():
+            previous, current = (counts.get(key, 0) for key in keys[scope])
+            if previous * (1 - elapsed / size) + current >= limit:
+                return max(1, int(size - elapsed))
+        return 0
+
+    def failed(self):
+        bucket = int(time.time() // window())
+        for scope in self.idents:
+            _increment(self._key(scope, bucket))
+        LoginFailureCount.objects.filter(expires_at__lt=timezone.now()).delete()
+
+    def succeeded(self):
+        """A successful login clears the identity's failures (not the IP's)"""
+        bucket = int(time.time() // window())
+        keys = [self._key('identity', bucket - 1), self._key('identity', bucket)]
+        if self._found.intersection(keys):
+            LoginFailureCount.objects.filter(key__in=keys).delete()
@@ -1,8 +1,9 @@
 from django.urls import path
 from .views import (
-    AcceptRejectUserView, AssignUserPermissionView, UserAPIView, GetUserAPIView, 
+    AcceptRejectUserView, BulkAcceptRejectUserView, AssignUserPermissionView, UserAPIView, GetUserAPIView, 
     LoginView, LogoutApiView, ForgotPasswordView, ChangePasswordView, UserListView, UserStatusListView, 
-    StatisticsAPIView, MembershipStatsAPIView, MembersListAPIView
+    StatisticsAPIView, MembershipStatsAPIView, MembersListAPIView, MembersExportAPIView,
+    EmailOutboxStatusAPIView
 )
 
 urlpatterns = [
@@ -18,7 +19,10 @@ urlpatterns = [
     path('Statistics/', StatisticsAPIView.as_view()),
     path('MembershipStats/', MembershipStatsAPIView.as_view()),
     path('Members/', MembersListAPIView.as_view()),
+    path('Members/export/', MembersExportAPIView.as_view()),
+    path('EmailOutbox/', EmailOutboxStatusAPIView.as_view()),
 
     path('AcceptRejectUser/<int:id>/', AcceptRejectUserView.as_view()),
+    path('AcceptRejectUser/bulk/', BulkAcceptRejectUserView.as_view()),
     path('UserStatusList/', UserStatusListView.as_view()),
 ]
\ No newline at end of file
@@ -1,25 +1,30 @@
+from collections import Counter
 from django.contrib.auth.models import User
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from user_management_app.models import UserProfile
-from user_management_app.threads import accept_reject_email, send_password_reset_email
+from user_management_app import outbox
+from user_management_app.authentication import invalidate_users
+from user_management_app.permissions import IsAdminMember
 from .serializers import DefaulttUserSerializer, UserSerializer
+from .throttling import LoginThrottle
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate
 from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-import threading
-import threading
 from django.utils.crypto import get_random_string
 from django.core.exceptions import ValidationError
 from rest_framework.generics import ListAPIView
 from rest_framework import filters
 from django.conf import settings
+from django.db import DatabaseError, transaction
 from product_management_app.models import Shirt, ShirtCategory, ShirtSubCategory
 from website_management_app.models import WebsiteSettings, Banner, Blog
+from website_management_app.counters import add_to_counter
+from prosix.pagination import retire_counts
 
 User = get_user_model()
 
@@ -75,9 +80,7 @@ class GetUserAPIView(APIView):
 
             if not role:
                 role = 'user'
-            profile = UserProfile.objects.filter(user=user).first()
-            if not profile:
-                profile = UserProfile.objects.create(user=user, role=role)
+            profile = user.profile
 
             if address:
                 profile.address = address
@@ -194,7 +197,9 @@ class UserAPIView(APIView):
                 is_active=user_is_active
             )
 
-            profile = UserProfile.objects.create(user=user, role=role)
+            # Created with the user (see profiles.py)
+            profile = user.profile
+            profile.role = role
             if address:
                 profile.address = address
             if phone_number:
@@ -206,49 +211,17 @@ class UserAPIView(APIView):
                 profile.save()
 
                 message = 'Congratulations! Your request has been successfully approved. You may now log in to your account and begin using our services.'
-
-                try:
-                    email_thread = threading.Thread(
-                        target=accept_reject_email,
-                        args=(user.email, message, 'Your profile is accepted')
-                    )
-                    email_thread.start()
-                except:
-                    return Response(
-                        {'success': False, 'response': {'message': 'Failed to send email. Please try again later.'}},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
+                outbox.enqueue('accept_reject', user.email, {'message': message, 'status': 'Your profile is accepted'})
             
             profile.save()
 
             if not is_admin:
 
                 message = 'Your request is currently under review by our team. Please wait for approval. We appreciate your patience.'
-                
-                try:
-                    email_thread = threading.Thread(
-                        target=accept_reject_email,
-                        args=(user.email, message, 'Your profile is currently under review')
-                    )
-                    email_thread.start()
-                except:
-                    return Response(
-                        {'success': False, 'response': {'message': 'Failed to send email. Please try again later.'}},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
+                outbox.enqueue('accept_reject', user.email, {'message': message, 'status': 'Your profile is currently under review'})
                 
                 message = 'You have received a new user request – please review and take necessary action.'
-                try:
-                    email_thread = threading.Thread(
-                        target=accept_reject_email,
-                        args=(settings.EMAIL_HOST_USER, message, 'You have received new user request')
-                    )
-                    email_thread.start()
-                except:
-                    return Response(
-                        {'success': False, 'response': {'message': 'Failed to send email. Please try again later.'}},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
+                outbox.enqueue('accept_reject', settings.EMAIL_HOST_USER, {'message': message, 'status': 'You have received new user request'})
 
             serializer = UserSerializer(user)
             
@@ -272,7 +245,8 @@ class LoginView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
-        email = request.data.get('email', '').lower().strip()
+        identity = request.data.get('email', '').strip()
+        email = identity.lower()
         password = request.data.get('password')
 
         if not email:
@@ -286,9 +260,30 @@ class LoginView(APIView):
                 {"success": False, 'response': {'message': 'Password is required!'}},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        # Checked before the lookup, so throttled attempts never reach the password hasher
+        throttle = LoginThrottle(request, email)
+        retry_after = throttle.retry_after()
+        if retry_after:
+            response = Response(
+                {"success": False, 'response': {'message': f'Too many failed login attempts. Please try again in {retry_after} seconds.'}},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(retry_after)
+            return response
         
-        check_user = User.objects.filter(Q(email=email) | Q(username=email)).first()
+        # Case-insensitive, through the LOWER() indexes; profile and token come with the user
+        candidates = list(
+            User.objects.alias(email_lower=Lower('email'), username_lower=Lower('username'))
+            .filter(Q(email_lower=email) | Q(username_lower=email))
+            .select_related('profile', 'auth_token')
+            .order_by('id')[:10]
+        )
+        # Several accounts can differ only by case: prefer the exact spelling
+        candidates.sort(key=lambda user: (user.username != identity, user.email != identity))
+        check_user = candidates[0] if candidates else None
         if not check_user:
+            throttle.failed()
             return Response(
                 {"success": False, 'response': {'message': 'The entered username/email or password is incorrect. Please try again!'}},
                 status=status.HTTP_404_NOT_FOUND
@@ -302,7 +297,10 @@ class LoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        profile = UserProfile.objects.filter(user=check_user).first()
+        try:
+            profile = check_user.profile
+        except UserProfile.DoesNotExist:
+            profile = None
 
         
         if profile: 
@@ -317,17 +315,23 @@ class LoginView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        user = authenticate(username=check_user.username, password=password)
-        
-        if not user:
+        # The user is already loaded: check the password on it instead of
+        # authenticate(), which would fetch the user again (ModelBackend is the only backend)
+        if not check_user.check_password(password):
+            throttle.failed()
             return Response(
                 {"success": False, 'response': {'message': 'Incorrect Email or password'}},
                 status=status.HTTP_403_FORBIDDEN
             )
+        throttle.succeeded()
+        user = check_user
             
 
-        # Create or get token
-        token, created = Token.objects.get_or_create(user=user)
+        # Reuse the token loaded with the user, or create one
+        try:
+            token = user.auth_token
+        except Token.DoesNotExist:
+            token, created = Token.objects.get_or_create(user=user)
         access_token = token.key
         serializer = DefaulttUserSerializer(user)
 
@@ -359,17 +363,13 @@ class ForgotPasswordView(APIView):
         
         # Generating a new password - fixed line
         new_password = get_random_string(10)
-        user.set_password(new_password)
-        user.save()
-
-        # Start a new thread to send the email
+        # The new password and the email that carries it are committed together
         try:
-            email_thread = threading.Thread(
-                target=send_password_reset_email,
-                args=(email, new_password)
-            )
-            email_thread.start()
-        except:
+            with transaction.atomic():
+                user.set_password(new_password)
+                user.save()
+                outbox.enqueue('password_reset', email, {'password': new_password})
+        except DatabaseError:
             return Response(
                 {'success': False, 'response': {'message': 'Failed to send email. Please try again later.'}},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -536,12 +536,25 @@ class UserStatusListView(ListAPIView):
         if status not in valid_statuses:
             status = 'pending'
         
-        profile_ids = UserProfile.objects.filter(user_status=status).exclude(role='admin').order_by('-id').values_list('user')
-        queryset = User.objects.filter(id__in=profile_ids).order_by('-date_joined').distinct()
-        
+        # One joined query: every user has exactly one profile
+        queryset = User.objects.filter(profile__user_status=status).exclude(profile__role='admin').select_related('profile').order_by('-date_joined', '-id')
+
         return queryset
 
     
+# user_status: (status line, message) of the email telling the user
+DECISION_EMAILS = {
+    'accepted': (
+        'Your profile is accepted',
+        'Congratulations! Your request has been successfully approved. You may now log in to your account and begin using our services.',
+    ),
+    'rejected': (
+        'Your profile is rejected',
+        'Your request has been declined due to an issue during review. For further clarification or assistance, please contact our support team.',
+    ),
+}
+
+
 class AcceptRejectUserView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -601,32 +614,108 @@ class AcceptRejectUserView(APIView):
         user.save()
         profile.save()
         if user_status:
-            if user_status == 'accepted':
-                message = 'Congratulations! Your request has been successfully approved. You may now log in to your account and begin using our services.'
-                prifle_status = 'Your profile is accepted'
-            elif user_status == 'rejected':
-                prifle_status = 'Your profile is rejected'
-                message = 'Your request has been declined due to an issue during review. For further clarification or assistance, please contact our support team.'
-            else:
-                prifle_status = ''
-                message = ''
+            prifle_status, message = DECISION_EMAILS.get(user_status, ('', ''))
+            outbox.enqueue('accept_reject', user.email, {'message': message, 'status': prifle_status})
 
-            try:
-                email_thread = threading.Thread(
-                    target=accept_reject_email,
-                    args=(user.email, message, prifle_status)
-                )
-                email_thread.start()
-            except:
-                return Response(
-                    {'success': False, 'response': {'message': 'Failed to send email. Please try again later.'}},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        return Response({
+            'success': True,
+            'response': {
+                'message': 'User updated successfully',
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class BulkAcceptRejectUserView(APIView):
+    """
+    Accept or reject many users in one call: one UPDATE for the profiles and
+    one for the users, in one transaction, and the notification emails queued
+    with one INSERT. Users already at the requested status are left alone
+    (and not emailed again), so a retried call is harmless.
+    """
+    permission_classes = [IsAuthenticated, IsAdminMember]
+    max_users = 500
+
+    def post(self, request, *args, **kwargs):
+        """
+        Body:
+        - user_ids: list of user IDs (at most max_users)
+        - user_status: accepted or rejected
+        - message: optional, replaces the default email message
+        Returns one result per ID: updated, unchanged, not_found or skipped (admins)
+        """
+        user_ids = request.data.get('user_ids')
+        user_status = request.data.get('user_status')
+        message = request.data.get('message')
+
+        if user_status not in ('accepted', 'rejected'):
+            return Response({
+                'success': False,
+                'response': {'message': 'user_status must be accepted or rejected'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(user_ids, list) or not user_ids:
+            return Response({
+                'success': False,
+                'response': {'message': 'user_ids should be a non-empty list'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Requested order, duplicates dropped
+            user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+        except (TypeError, ValueError):
+            return Response({
+                'success': False,
+                'response': {'message': 'user_ids should only contain user IDs'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(user_ids) > self.max_users:
+            return Response({
+                'success': False,
+                'response': {'message': f'At most {self.max_users} users can be updated at once'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        status_line, default_message = DECISION_EMAILS[user_status]
+        message = message or default_message
+        results = {user_id: {'id': user_id, 'result': 'not_found'} for user_id in user_ids}
+        try:
+            with transaction.atomic():
+                rows = (
+                    UserProfile.objects.select_for_update()
+                    .filter(user_id__in=user_ids)
+                    .values_list('user_id', 'role', 'user_status', 'user__email')
                 )
+                changed = {}  # user id: (previous status, email)
+                for user_id, role, previous, email in rows:
+                    if role == 'admin':
+                        results[user_id]['result'] = 'skipped'
+                    elif previous == user_status:
+                        results[user_id]['result'] = 'unchanged'
+                    else:
+                        results[user_id]['result'] = 'updated'
+                        changed[user_id] = (previous, email)
+
+                if changed:
+                    UserProfile.objects.filter(user_id__in=changed).update(user_status=user_status)
+                    User.objects.filter(id__in=changed).update(is_active=(user_status == 'accepted'))
+
+                    # The UPDATEs skip the save signals these caches follow
+                    invalidate_users(changed)
+                    before = Counter(previous for previous, _ in changed.values())
+                    add_to_counter('active_members', (len(changed) if user_status == 'accepted' else 0) - before['accepted'])
+                    add_to_counter('pending_members', -before['pending'])
+                    retire_counts(User, UserProfile)
+
+                    outbox.enqueue_many('accept_reject', [
+                        (email, {'message': message, 'status': status_line}) for _, email in changed.values()
+                    ])
+        except DatabaseError as e:
+            return Response({
+                'success': False,
+                'response': {'message': f'Error updating users: {str(e)}'}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return Response({
             'success': True,
             'response': {
-                'message': 'User updated successfully',
+                'message': f'{len(changed)} users updated',
+                'data': [results[user_id] for user_id in user_ids],
             }
         }, status=status.HTTP_200_OK)
 
@@ -740,80 +829,119 @@ class MembershipStatsAPIView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+
+class EmailOutboxStatusAPIView(APIView):
+    """Queue depth of the email outbox (see outbox.py)"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns:
+        - pending: emails not sent yet (due: ready to send, retrying: failed at least once)
+        - failed: emails given up on after EMAIL_OUTBOX_MAX_ATTEMPTS tries
+        - oldest_pending_at: when the oldest pending email was queued
+        """
+        return Response({
+            'success': True,
+            'response': {
+                'data': outbox.queue_depth()
+            }
+        }, status=status.HTTP_200_OK)
+
+def _member_filters(params):
+    """Members queryset (admins excluded) filtered in SQL by the status/type/interests query params"""
+    from user_management_app.models import masks_with_any
+
+    queryset = UserProfile.objects.exclude(role='admin')
+
+    # Filter by user status
+    user_status = params.get('status')
+    if user_status:
+        valid_statuses = ['pending', 'accepted', 'rejected']
+        if user_status in valid_statuses:
+            queryset = queryset.filter(user_status=user_status)
+
+    # Filter by membership type
+    membership_type = params.get('type')
+    if membership_type:
+        valid_types = ['individual', 'team', 'organization', 'enterprise']
+        if membership_type in valid_types:
+            queryset = queryset.filter(membership_type=membership_type)
+
+    interests = params.get('interests')
+    if interests:
+        valid_interests = ['football', 'basketball', 'hockey', 'baseball', 'soccer', 'custom']
+        # Split comma-separated interests if multiple provided
+        interest_list = [i.strip() for i in interests.split(',') if i.strip() in valid_interests]
+        if interest_list:
+            # Any of them: the indexed interest_bits values that have one of their bits
+            queryset = queryset.filter(interest_bits__in=masks_with_any(interest_list))
+    return queryset
+
+
 class MembersListAPIView(APIView):
     """Get list of all members with filters"""
     permission_classes = [IsAuthenticated]
+    # Response key: UserProfile field or lookup
+    columns = {
+        'id': 'user_id',
+        'username': 'user__username',
+        'email': 'user__email',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'phone_number': 'phone_number',
+        'address': 'address',
+        'role': 'role',
+        'user_status': 'user_status',
+        'membership_type': 'membership_type',
+        'interests': 'interests',
+        'is_active': 'user__is_active',
+        'date_joined': 'user__date_joined',
+    }
 
     def get(self, request, *args, **kwargs):
         """
-        Returns list of members with optional filters:
-        - status: pending, active, expired, cancelled
+        Returns a page of members, newest first, with optional filters:
+        - status: pending, accepted, rejected
         - type: individual, team, organization, enterprise
         - interests: football, basketball, hockey, baseball, soccer, custom
+        - limit: page size (default PAGE_SIZE, at most DEFAULT_MAX_PAGE_SIZE)
+        - cursor: from `next`, the link to the following page
         """
+        from rest_framework.exceptions import NotFound
+        from prosix.pagination import cached_count, paginate_by_id
+
         try:
-            # Start with all user profiles excluding admins
-            queryset = UserProfile.objects.exclude(role='admin').select_related('user')
-            
-            # Filter by user status
-            user_status = request.query_params.get('status')
-            if user_status:
-                valid_statuses = ['pending', 'accepted', 'rejected']
-                if user_status in valid_statuses:
-                    queryset = queryset.filter(user_status=user_status)
-            
-            # Filter by membership type
-            membership_type = request.query_params.get('type')
-            if membership_type:
-                valid_types = ['individual', 'team', 'organization', 'enterprise']
-                if membership_type in valid_types:
-                    queryset = queryset.filter(membership_type=membership_type)
-            
-            # Get all matching profiles first
-            profiles = queryset.order_by('-id')
-            
-            # Filter by interests (interests is a JSONField array) - filter in Python for SQLite compatibility
-            interests = request.query_params.get('interests')
-            if interests:
-                valid_interests = ['football', 'basketball', 'hockey', 'baseball', 'soccer', 'custom']
-                # Split comma-separated interests if multiple provided
-                interest_list = [i.strip() for i in interests.split(',') if i.strip() in valid_interests]
-                if interest_list:
-                    # Filter profiles where interests JSONField contains any of the specified interests
-                    filtered_profiles = []
-                    for profile in profiles:
-                        profile_interests = profile.interests or []
-                        # Check if any of the requested interests exist in the profile's interests
-                        if any(interest in profile_interests for interest in interest_list):
-                            filtered_profiles.append(profile)
-                    profiles = filtered_profiles
-            
-            # Serialize the data
+            queryset = _member_filters(request.query_params)
+            lookups = list(self.columns.values())
+            try:
+                rows, next_link = paginate_by_id(queryset.values('id', *lookups), request)
+            except NotFound as e:
+                return Response({
+                    'success': False,
+                    'response': {
+                        'message': str(e.detail)
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+
             members_data = []
-            for profile in profiles:
-                user = profile.user
-                members_data.append({
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name or '',
-                    'phone_number': profile.phone_number or '',
-                    'address': profile.address or '',
-                    'role': profile.role,
-                    'user_status': profile.user_status,
-                    'membership_type': profile.membership_type or '',
-                    'interests': profile.interests or [],
-                    'is_active': user.is_active,
-                    'date_joined': user.date_joined.isoformat() if user.date_joined else None,
-                    'created_at': profile.created_at.isoformat() if hasattr(profile, 'created_at') else None
-                })
-            
+            for row in rows:
+                member = {name: row[lookup] for name, lookup in self.columns.items()}
+                member['last_name'] = member['last_name'] or ''
+                member['phone_number'] = member['phone_number'] or ''
+                member['address'] = member['address'] or ''
+                member['membership_type'] = member['membership_type'] or ''
+                member['interests'] = member['interests'] or []
+                member['date_joined'] = member['date_joined'].isoformat() if member['date_joined'] else None
+                member['created_at'] = None  # UserProfile has no created_at
+                members_data.append(member)
+
             return Response({
                 'success': True,
                 'response': {
                     'data': members_data,
-                    'count': len(members_data)
+                    'count': cached_count(queryset),
+                    'next': next_link,
                 }
             }, status=status.HTTP_200_OK)
 
@@ -823,4 +951,34 @@ class MembersListAPIView(APIView):
                 'response': {
                     'message': f'Error retrieving members list: {str(e)}'
                 }
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MembersExportAPIView(APIView):
+    """Stream the members list as CSV or NDJSON (see prosix/exports.py)"""
+    permission_classes = [IsAuthenticated]
+    # Column name: UserProfile field or lookup
+    columns = MembersListAPIView.columns
+
+    def get(self, request, *args, **kwargs):
+        """
+        Query params: the MembersListAPIView filters (status, type, interests), and
+        - export_format: csv (default) or ndjson
+        - start / end: YYYY-MM-DD, inclusive, on the date the user joined
+        """
+        from prosix.exports import date_range_filter, export_response, export_rows, parse_export_params
+
+        try:
+            export_format, start, end = parse_export_params(request.query_params)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'response': {
+                    'message': str(e)
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = _member_filters(request.query_params)
+        queryset = queryset.filter(**date_range_filter('user__date_joined', start, end)).order_by('-id')
+        rows = export_rows(queryset, self.columns)
+        return export_response(rows, list(self.columns), export_format, 'members')
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class WebsiteManagementAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'website_management_app'
+
+    def ready(self):
+        # Keep the dashboard counters in step with the counted models
+        from . import counters
+        counters.connect()
+        # Retire the cached counts of the paginated lists (see prosix/pagination.py)
+        from prosix.pagination import track_counts
+        from . import models
+        track_counts(
+            models.Banner, models.Blog, models.Testimonial, models.Product, models.Category,
+            models.ShippingMethod, models.Notification, models.ArtworkRequest, models.MembershipRequest,
+            models.MediaLibrary,
+        )
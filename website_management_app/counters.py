@@ -0,0 +1,215 @@
+"""
+Admin dashboard counters.
+
+Each counter in COUNTERS is the number of rows of one model matching a
+simple condition. DashboardCounter stores the current values; save/delete
+signals of the counted models add or subtract one right after the write
+(inside the caller's transaction when there is one), so the dashboard reads
+a dozen small rows instead of running a COUNT(*) per figure.
+
+TOTALS are sums of a column rather than row counts (customizer views); the
+code that increments the column adjusts them through add_to_counter().
+
+Writes that skip signals (queryset.update(), bulk_create(), raw SQL) are not
+tracked; `manage.py reconcile_dashboard_counters` recounts everything and is
+meant to run periodically (cron) to correct any drift.
+
+dashboard_data() assembles the counters (and total revenue from the daily
+revenue rollup) and keeps the result in the per-process cache for
+DASHBOARD_CACHE_TIMEOUT seconds.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .models import DashboardCounter
+
+
+# name: (model label, fields that must match, fields that must not match)
+COUNTERS = {
+    'shirts': ('product_management_app.Shirt', {}, {}),
+    'shirt_categories': ('product_management_app.ShirtCategory', {}, {}),
+    'shirt_subcategories': ('product_management_app.ShirtSubCategory', {}, {}),
+    'customizers': ('product_management_app.Customizer', {}, {}),
+    'active_customizers': ('product_management_app.Customizer', {'is_active': True}, {}),
+    'customizations': ('product_management_app.UserCustomizer', {}, {}),
+    'orders': ('product_management_app.Order', {}, {}),
+    'products': ('website_management_app.Product', {}, {}),
+    'blog_posts': ('website_management_app.Blog', {}, {}),
+    'banners': ('website_management_app.Banner', {}, {}),
+    'members': ('user_management_app.UserProfile', {}, {'role': 'admin'}),
+    'active_members': ('user_management_app.UserProfile', {'user_status': 'accepted'}, {'role': 'admin'}),
+    'pending_members': ('user_management_app.UserProfile', {'user_status': 'pending'}, {'role': 'admin'}),
+}
+# name: (model label, summed field); flushes add to these, deletes subtract the row's value
+TOTALS = {
+    'customizer_views': ('product_management_app.Customizer', 'views'),
+}
+CACHE_KEY = 'dashboard:data'
+
+
+def _counters_for(model):
+    label = model._meta.label
+    return {name: spec for name, spec in COUNTERS.items() if spec[0] == label}
+
+
+def _condition_fields(counters):
+    return sorted({field for _, include, exclude in counters.values() for field in (*include, *exclude)})
+
+
+def _matches(values, include, exclude):
+    """Python equivalent of .filter(**include).exclude(**exclude) for one row"""
+    if any(values.get(field) != value for field, value in include.items()):
+        return False
+    return not any(values.get(field) == value for field, value in exclude.items())
+
+
+def count(name, using=None):
+    if name in TOTALS:
+        label, field = TOTALS[name]
+        return apps.get_model(label).objects.using(using).aggregate(total=Sum(field))['total'] or 0
+    label, include, exclude = COUNTERS[name]
+    return apps.get_model(label).objects.using(using).filter(**include).exclude(**exclude).count()
+
+
+def add_to_counter(name, delta, using=None):
+    """Adjust a counter from code that writes without signals (e.g. queryset.update())"""
+    if delta:
+        _add(name, delta, using)
+
+
+def _add(name, delta, using=None):
+    with transaction.atomic(using=using):
+        updated = DashboardCounter.objects.using(using).filter(name=name).update(
+            value=F('value') + delta, updated_at=timezone.now(),
+        )
+        if not updated:
+            # First change since the counter existed: start from a full count,
+            # which already includes this write
+            DashboardCounter.objects.using(using).update_or_create(name=name, defaults={'value': count(name, using)})
+    cache.delete(CACHE_KEY)
+
+
+def reconcile(using=None):
+    """Recount every counter from its table; returns {name: value}"""
+    values = {name: count(name, using) for name in (*COUNTERS, *TOTALS)}
+    with transaction.atomic(using=using):
+        for name, value in values.items():
+            DashboardCounter.objects.using(using).update_or_create(name=name, defaults={'value': value})
+        DashboardCounter.objects.using(using).exclude(name__in=[*COUNTERS, *TOTALS]).delete()
+    cache.delete(CACHE_KEY)
+    return values
+
+
+def stored_counters(using=None):
+    """{name: value} for every counter, recounting once if some were never stored"""
+    names = [*COUNTERS, *TOTALS]
+    stored = dict(DashboardCounter.objects.using(using).filter(name__in=names).values_list('name', 'value'))
+    if any(name not in stored for name in names):
+        # Never reconciled (fresh install): count once and store
+        stored.update(reconcile(using))
+    return {name: stored[name] for name in names}
+
+
+def dashboard_data():
+    """
+    Everything the admin dashboard shows, grouped like the statistics
+    endpoints it replaces. Served from the per-process cache for
+    DASHBOARD_CACHE_TIMEOUT seconds; a counted write in this process drops it.
+    """
+    data = cache.get(CACHE_KEY)
+    if data is not None:
+        return data
+
+    from product_management_app.rollups import revenue_totals
+    counters = stored_counters()
+    revenue = float(revenue_totals({'all': (None, None)})['all']['revenue'])
+    data = {
+        'website_statistics': {
+            'total_products': counters['shirts'],
+            'total_orders': counters['orders'],
+            'total_customers': counters['members'],
+            'total_revenue': revenue,
+        },
+        'customizer_stats': {
+            'models': counters['shirt_subcategories'],
+            'patterns': counters['shirt_categories'],
+            'templates': counters['shirts'],
+        },
+        'content_management': {
+            'pages': 0,
+            'blog_post': counters['blog_posts'],
+            'banners': counters['banners'],
+        },
+        'membership': {
+            'total_members': counters['members'],
+            'active_members': counters['active_members'],
+            'pending_members': counters['pending_members'],
+            'total_revenue': revenue,
+        },
+        'customizer': {
+            'total_models': counters['customizers'],
+            'total_active_models': counters['active_customizers'],
+            'total_views': counters['customizer_views'],
+            'total_customizations': counters['customizations'],
+        },
+        'inventory': {
+            'total_products': counters['products'],
+            'low_stock_items': 0,
+            'out_of_stock': 0,
+            'total_inventory_cost': 0,
+        },
+    }
+    cache.set(CACHE_KEY, data, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 10))
+    return data
+
+
+def _remember_row(sender, instance, raw=False, using=None, **kwargs):
+    counters = _counters_for(sender)
+    fields = _condition_fields(counters)
+    instance._counter_previous = None
+    if raw or not fields or instance.pk is None:
+        return
+    instance._counter_previous = sender.objects.using(using).filter(pk=instance.pk).values(*fields).first()
+
+
+def _count_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    counters = _counters_for(sender)
+    current = {field: getattr(instance, field) for field in _condition_fields(counters)}
+    previous = getattr(instance, '_counter_previous', None)
+    for name, (_, include, exclude) in counters.items():
+        if created:
+            delta = int(_matches(current, include, exclude))
+        elif (include or exclude) and previous is not None:
+            delta = int(_matches(current, include, exclude)) - int(_matches(previous, include, exclude))
+        else:
+            continue
+        if delta:
+            _add(name, delta, using)
+
+
+def _count_delete(sender, instance, using=None, **kwargs):
+    counters = _counters_for(sender)
+    current = {field: getattr(instance, field) for field in _condition_fields(counters)}
+    for name, (_, include, exclude) in counters.items():
+        if _matches(current, include, exclude):
+            _add(name, -1, using)
+    for name, (label, field) in TOTALS.items():
+        if label == sender._meta.label:
+            add_to_counter(name, -(getattr(instance, field) or 0), using)
+
+
+def connect():
+    """Connect the signals of every counted model (called from AppConfig.ready)"""
+    for label in {spec[0] for spec in (*COUNTERS.values(), *TOTALS.values())}:
+        model = apps.get_model(label)
+        uid = f'dashboard-counters:{label}'
+        pre_save.connect(_remember_row, sender=model, dispatch_uid=uid)
+        post_save.connect(_count_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_count_delete, sender=model, dispatch_uid=uid)
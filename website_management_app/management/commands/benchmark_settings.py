@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from website_management_app.models import WebsiteSettings, PaymentSettings, TaxConfiguration, GeneralSettings, NotificationSettings
+
+
+class Command(BaseCommand):
+    help = 'Compare cached get_settings() reads with the previous get_or_create(pk=1) on every read'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000, help='Reads per model and strategy')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        models = [WebsiteSettings, PaymentSettings, TaxConfiguration, GeneralSettings, NotificationSettings]
+
+        self.stdout.write(f'{"model":<24}{"strategy":<16}{"us/read":>10}{"queries/read":>14}')
+        for model in models:
+            model.get_settings()  # make sure the row exists and the cache is warm
+            strategies = [
+                ('get_or_create', lambda: model.objects.get_or_create(pk=1)),
+                ('cached', model.get_settings),
+            ]
+            for name, read in strategies:
+                with CaptureQueriesContext(connection) as ctx:
+                    read()
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    read()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'{model.__name__:<24}{name:<16}{elapsed / iterations * 1e6:>10.1f}{len(ctx):>14}'
+                )
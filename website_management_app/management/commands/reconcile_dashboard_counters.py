@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from website_management_app.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount every dashboard counter from its table (run periodically to correct drift)'
+
+    def handle(self, *args, **options):
+        for name, value in reconcile().items():
+            self.stdout.write(f'{name:<24}{value:>10}')
+        self.stdout.write(self.style.SUCCESS('Dashboard counters reconciled.'))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website_management_app', '0021_remove_category_icon_color'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medialibrary',
+            index=models.Index(fields=['-created_at', '-id'], name='medialibrary_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-created_at', '-id'], name='notification_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website_management_app', '0023_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-date', '-created_at'], name='notification_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['is_read'], name='notification_unread_idx'),
+        ),
+    ]
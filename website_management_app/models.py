@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .singletons import SingletonModel
 
 # Create your models here.
 
@@ -126,7 +127,7 @@ class Category(models.Model):
     def __str__(self):
         return self.category_name
 
-class WebsiteSettings(models.Model):
+class WebsiteSettings(SingletonModel):
     """
     General website settings - singleton pattern (only one instance)
     """
@@ -155,17 +156,6 @@ class WebsiteSettings(models.Model):
     def __str__(self):
         return f"Website Settings - {self.website_name}"
     
-    def save(self, *args, **kwargs):
-        # Ensure only one instance exists (singleton pattern)
-        self.pk = 1
-        super().save(*args, **kwargs)
-    
-    @classmethod
-    def get_settings(cls):
-        """Get or create the single website settings instance"""
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
-
 
 # Payment Settings Choices
 CURRENCY_CHOICES = [
@@ -176,7 +166,7 @@ CURRENCY_CHOICES = [
 ]
 
 
-class PaymentSettings(models.Model):
+class PaymentSettings(SingletonModel):
     """
     Payment settings - singleton pattern (only one instance)
     Includes payment methods, configuration, security, and notification settings
@@ -239,17 +229,6 @@ class PaymentSettings(models.Model):
     def __str__(self):
         return f"Payment Settings - {self.get_default_currency_display()}"
     
-    def save(self, *args, **kwargs):
-        # Ensure only one instance exists (singleton pattern)
-        self.pk = 1
-        super().save(*args, **kwargs)
-    
-    @classmethod
-    def get_settings(cls):
-        """Get or create the single payment settings instance"""
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
-
 
 # Shipping Method Choices
 SHIPPING_PROVIDER_CHOICES = [
@@ -314,7 +293,7 @@ TAX_TYPE_CHOICES = [
 ]
 
 
-class TaxConfiguration(models.Model):
+class TaxConfiguration(SingletonModel):
     """
     Tax configuration settings - singleton pattern (only one instance)
     Includes tax settings, business information, and tax exemption settings
@@ -376,17 +355,6 @@ class TaxConfiguration(models.Model):
     def __str__(self):
         return f"Tax Configuration - {self.business_name or 'Not Set'}"
     
-    def save(self, *args, **kwargs):
-        # Ensure only one instance exists (singleton pattern)
-        self.pk = 1
-        super().save(*args, **kwargs)
-    
-    @classmethod
-    def get_settings(cls):
-        """Get or create the single tax configuration instance"""
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
-
 
 # General Settings Choices
 LANGUAGE_CHOICES = [
@@ -404,7 +372,7 @@ GENERAL_CURRENCY_CHOICES = [
 ]
 
 
-class GeneralSettings(models.Model):
+class GeneralSettings(SingletonModel):
     """
     General settings - singleton pattern (only one instance)
     Includes website settings, currency/pricing, system settings, and contact information
@@ -484,17 +452,6 @@ class GeneralSettings(models.Model):
     def __str__(self):
         return f"General Settings - {self.site_title}"
     
-    def save(self, *args, **kwargs):
-        # Ensure only one instance exists (singleton pattern)
-        self.pk = 1
-        super().save(*args, **kwargs)
-    
-    @classmethod
-    def get_settings(cls):
-        """Get or create the single general settings instance"""
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
-    
     @classmethod
     def reset_to_default(cls):
         """Reset settings to default values"""
@@ -546,12 +503,20 @@ class Notification(models.Model):
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Keyset pagination (see prosix/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='notification_created_id_idx'),
+            # Default list ordering (Meta.ordering)
+            models.Index(fields=['-date', '-created_at'], name='notification_date_idx'),
+            # Unread notifications only (mark all as read); stays small as they are read
+            models.Index(fields=['is_read'], name='notification_unread_idx', condition=models.Q(is_read=False)),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.date}"
 
 
-class NotificationSettings(models.Model):
+class NotificationSettings(SingletonModel):
     """
     Notification settings - singleton pattern (only one instance)
     Includes email, push, and SMS notification preferences
@@ -615,17 +580,6 @@ class NotificationSettings(models.Model):
     def __str__(self):
         return "Notification Settings"
     
-    def save(self, *args, **kwargs):
-        # Ensure only one instance exists (singleton pattern)
-        self.pk = 1
-        super().save(*args, **kwargs)
-    
-    @classmethod
-    def get_settings(cls):
-        """Get or create the single notification settings instance"""
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
-
 
 # Artwork Request Choices
 USER_TYPE_CHOICES = [
@@ -807,6 +761,10 @@ class MediaLibrary(models.Model):
         verbose_name = 'Media Library'
         verbose_name_plural = 'Media Library'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see prosix/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='medialibrary_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.file_name} ({self.get_file_size_display()})"
@@ -849,3 +807,21 @@ class MediaLibrary(models.Model):
             else:
                 self.file_size = 0
         super().save(*args, **kwargs)
+
+
+class DashboardCounter(models.Model):
+    """
+    Row counts shown on the admin dashboard, kept current by
+    website_management_app/counters.py
+    """
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Dashboard Counter'
+        verbose_name_plural = 'Dashboard Counters'
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,90 @@
+"""
+Singleton settings models served from process memory.
+
+Every settings model (website, payment, tax, general, notification) has a
+single row with pk=1. get_settings() keeps a copy of that row's values in
+process memory and checks a version stamp in the shared cache (one cache
+read, no database query). save() and delete() replace the stamp, so every
+worker reloads the row on its next read.
+"""
+import copy
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, router, transaction
+
+
+# {model label: (version stamp, field names, field values)}
+_loaded = {}
+
+
+def _stamps():
+    return caches[getattr(settings, 'SETTINGS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    return f'singleton:{model._meta.label_lower}:version'
+
+
+def current_version(model):
+    """Version stamp of a singleton's row, created on first use"""
+    key = _version_key(model)
+    version = _stamps().get(key)
+    if version is None:
+        _stamps().add(key, uuid.uuid4().hex, None)
+        version = _stamps().get(key)
+    return version
+
+
+def bump_version(model):
+    """Make every worker reload the singleton on its next read"""
+    _stamps().set(_version_key(model), uuid.uuid4().hex, None)
+
+
+def forget_loaded():
+    """Drop the in-memory copies (tests roll the rows back underneath them)"""
+    _loaded.clear()
+
+
+class SingletonModel(models.Model):
+    """Base class for settings models that only ever have one row (pk=1)"""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Ensure only one instance exists (singleton pattern)
+        self.pk = 1
+        super().save(*args, **kwargs)
+        self._changed()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._changed()
+        return result
+
+    def _changed(self):
+        model = type(self)
+        bump_version(model)
+        # Bump again once committed, so a worker that reloaded the old row
+        # while this transaction was open does not keep it
+        transaction.on_commit(lambda: bump_version(model), using=router.db_for_write(model))
+
+    @classmethod
+    def get_settings(cls):
+        """Get or create the single settings instance (served from memory when current)"""
+        label = cls._meta.label_lower
+        version = current_version(cls)
+        entry = _loaded.get(label)
+        if entry is None or entry[0] != version:
+            obj, created = cls.objects.get_or_create(pk=1)
+            if created:
+                # Creating the row bumped the stamp; this copy is the current one
+                version = current_version(cls)
+            names = [field.attname for field in cls._meta.concrete_fields]
+            entry = (version, names, [getattr(obj, name) for name in names])
+            _loaded[label] = entry
+        _, names, values = entry
+        # Hand out a fresh instance so callers can modify it freely
+        return cls.from_db(router.db_for_read(cls), names, copy.deepcopy(values))
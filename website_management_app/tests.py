@@ -1,3 +1,188 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from prosix.query_plans import QueryPlanAssertions
+
+from product_management_app.models import Customizer, Order
+from user_management_app.models import UserProfile
+from .models import WebsiteSettings, Category, PaymentSettings, GeneralSettings, Banner, Blog, Product, DashboardCounter, Notification
+from .singletons import forget_loaded, bump_version, _loaded
+
+
+class ConditionalGetTests(APITestCase):
+    """Settings and category lists support ETag / Last-Modified revalidation."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='secret123')
+        self.client.force_authenticate(self.user)
+        forget_loaded()
+        WebsiteSettings.get_settings()
+
+    def test_website_settings_not_modified(self):
+        first = self.client.get('/api/website-settings/')
+        self.assertEqual(first.status_code, 200)
+
+        second = self.client.get('/api/website-settings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+    def test_website_settings_if_modified_since(self):
+        first = self.client.get('/api/website-settings/')
+        second = self.client.get('/api/website-settings/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        self.assertEqual(second.status_code, 304)
+
+    def test_website_settings_update_changes_etag(self):
+        etag = self.client.get('/api/website-settings/')['ETag']
+        self.client.patch('/api/website-settings/', {'website_name': 'Prosix'}, format='json')
+
+        response = self.client.get('/api/website-settings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['response']['data']['website_name'], 'Prosix')
+
+    def test_categories_not_modified(self):
+        Category.objects.create(category_name='Jerseys')
+        first = self.client.get('/api/categories/')
+
+        second = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+        Category.objects.create(category_name='Hoodies')
+        third = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, 200)
+
+
+class SingletonSettingsCacheTests(TestCase):
+    """Settings singletons are read from memory until a save bumps their version."""
+
+    def setUp(self):
+        forget_loaded()
+
+    def test_steady_state_reads_run_no_queries(self):
+        WebsiteSettings.get_settings()
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                settings = WebsiteSettings.get_settings()
+        self.assertEqual(settings.pk, 1)
+        self.assertEqual(settings.website_name, 'ProSix')
+
+    def test_save_is_visible_on_next_read(self):
+        settings = PaymentSettings.get_settings()
+        settings.default_currency = 'EUR'
+        settings.save()
+
+        self.assertEqual(PaymentSettings.get_settings().default_currency, 'EUR')
+
+    def test_other_worker_save_invalidates(self):
+        # Simulate a save in another process: the row changes and the stamp moves on
+        WebsiteSettings.get_settings()
+        WebsiteSettings.objects.filter(pk=1).update(website_name='Changed elsewhere')
+        self.assertEqual(WebsiteSettings.get_settings().website_name, 'ProSix')
+
+        bump_version(WebsiteSettings)
+        self.assertEqual(WebsiteSettings.get_settings().website_name, 'Changed elsewhere')
+
+    def test_returned_instances_are_independent(self):
+        settings = WebsiteSettings.get_settings()
+        settings.navigation_menu.append({'id': 1, 'label': 'Shop'})
+        settings.website_name = 'Unsaved'
+
+        fresh = WebsiteSettings.get_settings()
+        self.assertEqual(fresh.navigation_menu, [])
+        self.assertEqual(fresh.website_name, 'ProSix')
+
+    def test_reset_to_default_goes_through_cache(self):
+        settings = GeneralSettings.get_settings()
+        settings.site_title = 'Custom'
+        settings.save()
+
+        GeneralSettings.reset_to_default()
+        self.assertEqual(GeneralSettings.get_settings().site_title, 'ProSix')
+        self.assertIn('website_management_app.generalsettings', _loaded)
+
+
+class DashboardCountersTests(APITestCase):
+    """/api/dashboard/ reads maintained counters instead of counting tables."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='secret123')
+        UserProfile.objects.update_or_create(user=self.admin, defaults={'role': 'admin', 'user_status': 'accepted'})
+        self.client.force_authenticate(self.admin)
+
+    def _dashboard(self):
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['response']['data']
+
+    def _member(self, name, user_status='pending'):
+        user = User.objects.create_user(username=name, password='secret123')
+        return UserProfile.objects.update_or_create(user=user, defaults={'role': 'user', 'user_status': user_status})[0]
+
+    def test_counters_follow_writes(self):
+        self._dashboard()
+        pending = self._member('pending')
+        self._member('active', user_status='accepted')
+        Customizer.objects.create(title='Kit', is_active=False)
+        Banner.objects.create(title='Hero')
+        Blog.objects.create(title='News', excerpt='-', content='-', category='news')
+        Product.objects.create(name='Cap', price=5, sku='CAP-1', category='accessories')
+        Order.objects.create(order_id='ORD-1', customer=self.admin, total='12.00', status='completed')
+
+        pending.user_status = 'accepted'
+        pending.save()
+        Blog.objects.all().delete()
+
+        data = self._dashboard()
+        self.assertEqual(data['membership'], {'total_members': 2, 'active_members': 2, 'pending_members': 0, 'total_revenue': 12.0})
+        self.assertEqual(data['customizer']['total_models'], 1)
+        self.assertEqual(data['customizer']['total_active_models'], 0)
+        self.assertEqual(data['content_management']['banners'], 1)
+        self.assertEqual(data['content_management']['blog_post'], 0)
+        self.assertEqual(data['inventory']['total_products'], 1)
+        self.assertEqual(data['website_statistics']['total_orders'], 1)
+
+    def test_cached_dashboard_runs_no_queries(self):
+        self._dashboard()
+        with CaptureQueriesContext(connection) as ctx:
+            self._dashboard()
+        self.assertEqual(len(ctx), 0)
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            self._dashboard()
+        self.assertFalse(any('COUNT' in query['sql'] for query in ctx.captured_queries))
+
+    def test_reconcile_corrects_drift(self):
+        self._dashboard()
+        # bulk_create skips the signals
+        Banner.objects.bulk_create([Banner(title=f'Banner {i}') for i in range(3)])
+        call_command('reconcile_dashboard_counters', stdout=io.StringIO())
+
+        self.assertEqual(DashboardCounter.objects.get(name='banners').value, 3)
+        self.assertEqual(self._dashboard()['content_management']['banners'], 3)
+
+
+
+class QueryPlanTests(QueryPlanAssertions, TestCase):
+    """Notification queries go through an index (see prosix/query_plans.py)."""
+
+    def setUp(self):
+        Notification.objects.bulk_create([
+            Notification(title=f'Notice {i}', body='...', is_read=i % 3 == 0) for i in range(20)
+        ])
+
+    def test_unread(self):
+        # NotificationMarkAllAsReadView updates these
+        self.assertIndexed(Notification.objects.filter(is_read=False).values('id'))
+
+    def test_default_list(self):
+        self.assertIndexed(Notification.objects.all()[:20])
 
-# Create your tests here.
+    def test_counters(self):
+        self.assertIndexed(DashboardCounter.objects.filter(name='orders'))
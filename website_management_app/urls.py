@@ -14,6 +14,7 @@ from .views import (
     CategoryListCreateView,
     CategoryRetrieveUpdateDestroyView,
     InventoryStatsAPIView,
+    DashboardAPIView,
     PaymentSettingsView,
     ShippingMethodListCreateView,
     ShippingMethodRetrieveUpdateDestroyView,
@@ -50,6 +51,7 @@ urlpatterns = [
     path('categories/', CategoryListCreateView.as_view()),
     path('categories/<int:id>/', CategoryRetrieveUpdateDestroyView.as_view()),
     path('inventory/stats/', InventoryStatsAPIView.as_view()),
+    path('dashboard/', DashboardAPIView.as_view()),
     path('settings/payment/', PaymentSettingsView.as_view()),
     path('settings/tax/', TaxConfigurationView.as_view()),
     path('settings/general/', GeneralSettingsView.as_view()),
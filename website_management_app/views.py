@@ -6,12 +6,17 @@ from rest_framework import generics
 from .models import WebsiteSettings, Banner, Blog, Testimonial, Product, Category, PaymentSettings, ShippingMethod, TaxConfiguration, GeneralSettings, Notification, NotificationSettings, ArtworkRequest, MembershipRequest, MediaLibrary
 from .serializers import WebsiteSettingsSerializer, BannerSerializer, BlogSerializer, TestimonialSerializer, ProductSerializer, CategorySerializer, PaymentSettingsSerializer, ShippingMethodSerializer, TaxConfigurationSerializer, GeneralSettingsSerializer, NotificationSerializer, NotificationSettingsSerializer, ArtworkRequestSerializer, MembershipRequestSerializer, MediaLibrarySerializer
 from django.core.exceptions import ValidationError
+from prosix.conditional import ConditionalGetMixin, conditional_get
 
 
 class WebsiteSettingsView(APIView):
     """Get and Update Website Settings"""
     permission_classes = [IsAuthenticated]
+    conditional_models = (WebsiteSettings,)
+    # A single row: its updated_at is a valid Last-Modified
+    conditional_last_modified = True
     
+    @conditional_get
     def get(self, request):
         """Get current website settings"""
         try:
@@ -672,11 +677,12 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         }, status=status.HTTP_200_OK)
 
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all categories or create a new category"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    conditional_models = (Category,)
     
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
@@ -790,6 +796,33 @@ class InventoryStatsAPIView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class DashboardAPIView(APIView):
+    """All admin dashboard figures in one request"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the website, customizer, content, membership and inventory
+        statistics from the maintained dashboard counters (see counters.py)
+        """
+        try:
+            from .counters import dashboard_data
+            return Response({
+                'success': True,
+                'response': {
+                    'data': dashboard_data()
+                }
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'success': False,
+                'response': {
+                    'message': f'Error retrieving dashboard statistics: {str(e)}'
+                }
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class PaymentSettingsView(APIView):
     """Get and Update Payment Settings"""
     permission_classes = [IsAuthenticated]